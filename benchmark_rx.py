@@ -0,0 +1,290 @@
+'''
+RX pipeline benchmark. Needs no display or hardware (Linux/macOS only).
+
+Each case streams timestamped lines from a virtual device (sk_virtual_port) through a real
+session in a hidden MainWindow: reader -> ring buffer -> terminal, SK_Logger and Plot_Widget.
+Every case runs in a fresh process, so peak RSS and CPU are its own.
+
+Reported per case:
+    bytes_per_sec, lines_per_sec    sustained throughput delivered to the pipeline
+    offered_bytes_per_sec           what the device sent (the line rate for the baud)
+    latency_ms                      device write -> terminal and plot done, log drain woken. Taken from
+                                    the oldest line of each batch, so it is the worst line of that batch
+    cpu_s_per_mb                    process CPU time per MB received, excluding the device thread
+A case whose measured window was cut short, or saw no batch at all, is reported as an error.
+    peak_rss_mb
+
+Usage:
+    python benchmark_rx.py [options] > results.json
+'''
+
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BAUD_MAX = 0  # Send as fast as the port accepts
+DEFAULT_BAUDS = [115200, 921600, BAUD_MAX]
+DEFAULT_LINE_LENGTHS = [16, 64, 256]
+DEFAULT_PLOTS = ["off", "kv", "sa"]  # Plot_Widget off, Key-Value or Single-Array
+DEFAULT_DURATION = 3  # Seconds per case
+DEFAULT_WARMUP = .5   # Seconds streamed before measuring
+BITS_PER_BYTE = 10    # 8N1: start + 8 data + stop
+MAX_SENDS_PER_SEC = 500  # Faster line rates are sent a few lines at a time
+CASE_TIMEOUT_FACTOR = 3  # A case taking this many times longer than planned has stalled
+MIN_MEASURED_FRACTION = .5  # A window shorter than this part of the duration means the GUI stalled, timers fired late
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_case(case: dict) -> dict:
+    '''Run one case in this process. Returns its results'''
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    import sk_main_window
+    from serial_handler import get_ports
+    from sk_virtual_port import PATTERN_ARRAY, PATTERN_KV, VirtualDevice
+
+    class BenchDevice(VirtualDevice):
+        '''Lines of a fixed length, each starting with the time it was generated: "t:<us> ..."'''
+
+        def __init__(self, line_length: int, pattern: str, rate: float) -> None:
+            if rate:
+                self.lines_per_send = math.ceil(rate / MAX_SENDS_PER_SEC)  # Keep the device thread's loop rate sane
+            else:
+                self.lines_per_send = max(1, 4096 // line_length)
+            super().__init__(pattern, rate / self.lines_per_send, values=max(1, line_length // 8))
+            self.line_length = line_length
+
+        def thread_cpu(self) -> float:
+            '''CPU time of the device thread so far, read from any thread'''
+            return time.clock_gettime(time.pthread_getcpuclockid(self.thread.ident))
+
+        def generate(self) -> bytes:
+            out = bytearray()
+            for i in range(self.lines_per_send):
+                sep = b" " if self.pattern == PATTERN_KV else b","
+                line = b"t:%d" % (time.perf_counter_ns() // 1000) + sep + super().generate()
+                out += line[:self.line_length - 1].ljust(self.line_length - 1) + b'\n'
+            return bytes(out)
+
+    folder = tempfile.mkdtemp(prefix="sk_bench_")
+    sk_main_window.SETTINGS_FILE = folder + "/user_settings.json"  # Leave the user's settings and logs alone
+    sk_main_window.DEFAULT_LOG_FOLDER = folder + "/"
+
+    app = QApplication(sys.argv[:1])
+    window = sk_main_window.MainWindow()
+    window.ui.lineEdit_log_folder.setText(folder + "/")
+    window.start_logger()
+
+    line_length = case['line_length']
+    rate = case['baud'] / BITS_PER_BYTE / line_length if case['baud'] else 0
+    device = BenchDevice(line_length, PATTERN_ARRAY if case['plot'] == "sa" else PATTERN_KV, rate)
+    device.start()
+    window.update_ports(get_ports())
+    window.handle_connect(device.name, **{'--rx': case['rx'], '--backend': case['backend']})
+    if not window.is_connected:
+        device.stop()
+        return dict(case, error=f"could not connect to {device.name}")
+    if case['plot'] != "off":
+        window.handle_plot_command(case['plot'])
+
+    latencies = []
+    bench_cursor = window.session.ring.cursor("benchmark")
+    tail = bytearray()
+    measuring = False
+    emits = 0
+    pipeline_rx_ready = window.rx_ready
+
+    def rx_ready(count: int = 0):
+        nonlocal tail, emits
+        pipeline_rx_ready(count)
+        now = time.perf_counter_ns() // 1000
+        tail += b"".join(bench_cursor.read())
+        start = tail.find(b"t:")
+        if start >= 0 and measuring:
+            emits += 1
+            end = start + 2
+            while end < len(tail) and 48 <= tail[end] <= 57:  # Digits
+                end += 1
+            if end < len(tail):
+                latencies.append((now - int(tail[start + 2:end])) / 1000)
+        tail = tail[tail.rfind(b'\n') + 1:]
+
+    window.session.worker.out.disconnect(pipeline_rx_ready)
+    window.session.worker.out.connect(rx_ready)
+
+    start = {}
+
+    def begin():
+        nonlocal measuring
+        measuring = True
+        start.update(time=time.perf_counter(), cpu=time.process_time(), device_cpu=device.thread_cpu(),
+                     rx=window.session.rx_bytes, reads=window.session.rx_reads, tx=device.tx_bytes)
+
+    QTimer.singleShot(int(case['warmup'] * 1000), begin)
+    QTimer.singleShot(int((case['warmup'] + case['duration']) * 1000), app.quit)
+    app.exec_()
+
+    elapsed = time.perf_counter() - start['time']
+    cpu = time.process_time() - start['cpu'] - (device.thread_cpu() - start['device_cpu'])
+    rx_bytes = window.session.rx_bytes - start['rx']
+    offered = device.tx_bytes - start['tx']
+    reads = window.session.rx_reads - start['reads']
+    window.close_session()
+    device.stop()
+    shutil.rmtree(folder, ignore_errors=True)
+    cpu = max(cpu, 0.0)
+    if elapsed < case['duration'] * MIN_MEASURED_FRACTION:
+        return dict(case, error=f"measured {elapsed:.2f} s of {case['duration']} s. The GUI thread stalled")
+    if not emits:
+        return dict(case, error="no batch was received while measuring")
+
+    return dict(
+        case,
+        elapsed=round(elapsed, 3),
+        rx_bytes=rx_bytes,
+        bytes_per_sec=round(rx_bytes / elapsed),
+        lines_per_sec=round(rx_bytes / line_length / elapsed),
+        offered_bytes_per_sec=round(offered / elapsed),
+        device_dropped_bytes=device.dropped_bytes,
+        reads=reads,
+        avg_read_bytes=round(rx_bytes / reads) if reads else 0,
+        emits=emits,
+        latency_ms={"p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+                    "p99": percentile(latencies, 99), "max": max(latencies, default=None)},
+        cpu_s=round(cpu, 3),
+        cpu_s_per_mb=round(cpu / (rx_bytes / 1e6), 4) if rx_bytes else None,
+        peak_rss_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # ru_maxrss is KiB on Linux
+    )
+
+
+def run_matrix(bauds: list, line_lengths: list, plots: list, rx: str, backend: str, duration: float, warmup: float) -> dict:
+    '''Run every case in its own process. Progress goes to stderr'''
+    results = []
+    for baud in bauds:
+        for line_length in line_lengths:
+            for plot in plots:
+                case = dict(baud=baud, line_length=line_length, plot=plot, rx=rx, backend=backend,
+                            duration=duration, warmup=warmup)
+                try:
+                    process = subprocess.run([sys.executable, os.path.realpath(__file__), "--case", json.dumps(case)],
+                                             capture_output=True, text=True, cwd=os.path.dirname(os.path.realpath(__file__)),
+                                             timeout=CASE_TIMEOUT_FACTOR * (warmup + duration) + 10)
+                    result = json.loads(process.stdout.strip().splitlines()[-1])
+                except subprocess.TimeoutExpired:
+                    result = dict(case, error="timed out. The GUI thread could not keep up")
+                except (IndexError, ValueError):
+                    result = dict(case, error=process.stderr.strip()[-500:] or "no result")
+                results.append(result)
+                print_result(result)
+    return {
+        'benchmark': "rx_pipeline",
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': results,
+    }
+
+
+def print_result(result: dict):
+    baud = result['baud'] or "max"
+    if 'error' in result:
+        print(f"{baud:>7} {result['line_length']:>5} {result['plot']:>4}  ERROR: {result['error']}", file=sys.stderr)
+        return
+    latency = result['latency_ms']
+    print(f"{baud:>7} {result['line_length']:>5} {result['plot']:>4}  "
+          f"{result['bytes_per_sec'] / 1e3:9.1f} kB/s  "
+          f"p50 {latency['p50'] or 0:7.2f} ms  p99 {latency['p99'] or 0:7.2f} ms  "
+          f"{result['cpu_s_per_mb'] or 0:6.3f} cpu s/MB  {result['peak_rss_mb']:6.1f} MB", file=sys.stderr)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def show_help():
+    help_str = f'''\
+Usage:
+    python benchmark_rx.py [options] > results.json
+
+Options:
+  -h, --help              show this help message
+  -b <bauds>              baud rates, comma separated. 0 = as fast as possible   default: {",".join(map(str, DEFAULT_BAUDS))}
+  -l <lengths>            line lengths in bytes, comma separated                 default: {",".join(map(str, DEFAULT_LINE_LENGTHS))}
+  -p <plots>              plot modes: off, kv, sa, comma separated               default: {",".join(DEFAULT_PLOTS)}
+  -d <seconds>            measured time per case                                 default: {DEFAULT_DURATION}
+  -w <seconds>            warmup time per case                                   default: {DEFAULT_WARMUP}
+  -o <file>               write the results to <file> instead of stdout
+  --rx <mode>             receive mode: poll, block                              default: poll
+  --backend <backend>     thread, async                                          default: thread
+  '''
+    print(help_str)
+    quit()
+
+
+def execute():
+    bauds = DEFAULT_BAUDS
+    line_lengths = DEFAULT_LINE_LENGTHS
+    plots = DEFAULT_PLOTS
+    duration = DEFAULT_DURATION
+    warmup = DEFAULT_WARMUP
+    rx = "poll"
+    backend = "thread"
+    out_file = None
+    input_args = sys.argv[1:]
+    while input_args:
+        arg = input_args.pop(0)
+        if arg == '--case':
+            print(json.dumps(run_case(json.loads(input_args.pop(0)))))
+            return
+        elif arg == '-b':
+            bauds = [int(x) for x in input_args.pop(0).split(",")]
+        elif arg == '-l':
+            line_lengths = [int(x) for x in input_args.pop(0).split(",")]
+        elif arg == '-p':
+            plots = input_args.pop(0).split(",")
+        elif arg == '-d':
+            duration = float(input_args.pop(0))
+        elif arg == '-w':
+            warmup = float(input_args.pop(0))
+        elif arg == '-o':
+            out_file = input_args.pop(0)
+        elif arg == '--rx':
+            rx = input_args.pop(0)
+        elif arg == '--backend':
+            backend = input_args.pop(0)
+        elif arg == '-h' or arg == '--help':
+            show_help()
+        else:
+            print(f"-----\nWARNING: ARGUMENT {arg} NOT RECOGNIZED\n------")
+            show_help()
+
+    results = run_matrix(bauds, line_lengths, plots, rx, backend, duration, warmup)
+    if out_file:
+        with open(out_file, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    execute()
@@ -200,17 +200,29 @@ class Ui_MainWindow(object):
         self.checkBox_autoscroll.setObjectName("checkBox_autoscroll")
         self.gridLayout_4.addWidget(self.checkBox_autoscroll, 1, 0, 1, 1)
         spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
-        self.gridLayout_4.addItem(spacerItem, 1, 2, 1, 1)
+        self.gridLayout_4.addItem(spacerItem, 1, 5, 1, 1)
         self.checkBox_timestamp = QtWidgets.QCheckBox(self.terminal)
-        self.checkBox_timestamp.setEnabled(False)
         self.checkBox_timestamp.setObjectName("checkBox_timestamp")
         self.gridLayout_4.addWidget(self.checkBox_timestamp, 1, 1, 1, 1)
+        self.checkBox_ansi = QtWidgets.QCheckBox(self.terminal)
+        self.checkBox_ansi.setChecked(True)
+        self.checkBox_ansi.setObjectName("checkBox_ansi")
+        self.gridLayout_4.addWidget(self.checkBox_ansi, 1, 2, 1, 1)
         self.pushButton_clear = QtWidgets.QPushButton(self.terminal)
         self.pushButton_clear.setMinimumSize(QtCore.QSize(120, 0))
         self.pushButton_clear.setMaximumSize(QtCore.QSize(80, 16777215))
         self.pushButton_clear.setObjectName("pushButton_clear")
-        self.gridLayout_4.addWidget(self.pushButton_clear, 1, 3, 1, 1)
-        self.textEdit_terminal = QtWidgets.QTextEdit(self.terminal)
+        self.gridLayout_4.addWidget(self.pushButton_clear, 1, 6, 1, 1)
+        self.comboBox_view = QtWidgets.QComboBox(self.terminal)
+        self.comboBox_view.setObjectName("comboBox_view")
+        self.comboBox_view.addItem("")
+        self.comboBox_view.addItem("")
+        self.gridLayout_4.addWidget(self.comboBox_view, 1, 3, 1, 1)
+        self.lineEdit_hex_width = QtWidgets.QLineEdit(self.terminal)
+        self.lineEdit_hex_width.setMaximumSize(QtCore.QSize(40, 16777215))
+        self.lineEdit_hex_width.setObjectName("lineEdit_hex_width")
+        self.gridLayout_4.addWidget(self.lineEdit_hex_width, 1, 4, 1, 1)
+        self.textEdit_terminal = Terminal(self.terminal)
         font = QtGui.QFont()
         font.setFamily("Courier New")
         font.setPointSize(10)
@@ -227,10 +239,30 @@ class Ui_MainWindow(object):
         self.textEdit_terminal.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
         self.textEdit_terminal.setReadOnly(True)
         self.textEdit_terminal.setOverwriteMode(True)
-        self.textEdit_terminal.setAcceptRichText(False)
         self.textEdit_terminal.setTextInteractionFlags(QtCore.Qt.LinksAccessibleByKeyboard|QtCore.Qt.LinksAccessibleByMouse|QtCore.Qt.TextBrowserInteraction|QtCore.Qt.TextSelectableByKeyboard|QtCore.Qt.TextSelectableByMouse)
         self.textEdit_terminal.setObjectName("textEdit_terminal")
-        self.gridLayout_4.addWidget(self.textEdit_terminal, 0, 0, 1, 4)
+        self.gridLayout_4.addWidget(self.textEdit_terminal, 0, 0, 1, 7)
+        self.textEdit_hex = Terminal(self.terminal)
+        font = QtGui.QFont()
+        font.setFamily("Courier New")
+        font.setPointSize(10)
+        font.setBold(False)
+        font.setItalic(False)
+        self.textEdit_hex.setFont(font)
+        self.textEdit_hex.viewport().setProperty("cursor", QtGui.QCursor(QtCore.Qt.IBeamCursor))
+        self.textEdit_hex.setMouseTracking(False)
+        self.textEdit_hex.setAcceptDrops(False)
+        self.textEdit_hex.setStyleSheet("background-color: rgb(79, 79, 79);\n"
+"color: rgb(255, 255, 255);\n"
+"font: 10pt \"Courier New\";")
+        self.textEdit_hex.setFrameShape(QtWidgets.QFrame.StyledPanel)
+        self.textEdit_hex.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
+        self.textEdit_hex.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.textEdit_hex.setReadOnly(True)
+        self.textEdit_hex.setOverwriteMode(True)
+        self.textEdit_hex.setTextInteractionFlags(QtCore.Qt.LinksAccessibleByKeyboard|QtCore.Qt.LinksAccessibleByMouse|QtCore.Qt.TextBrowserInteraction|QtCore.Qt.TextSelectableByKeyboard|QtCore.Qt.TextSelectableByMouse)
+        self.textEdit_hex.setObjectName("textEdit_hex")
+        self.gridLayout_4.addWidget(self.textEdit_hex, 0, 0, 1, 7)
         self.tabWidget.addTab(self.terminal, "")
         self.script = QtWidgets.QWidget()
         self.script.setObjectName("script")
@@ -552,6 +584,26 @@ class Ui_MainWindow(object):
         self.label_12 = QtWidgets.QLabel(self.page_terminal_settings)
         self.label_12.setObjectName("label_12")
         self.gridLayout_6.addWidget(self.label_12, 7, 1, 1, 5)
+        self.label_scrollback = QtWidgets.QLabel(self.page_terminal_settings)
+        self.label_scrollback.setAlignment(QtCore.Qt.AlignRight|QtCore.Qt.AlignTrailing|QtCore.Qt.AlignVCenter)
+        self.label_scrollback.setObjectName("label_scrollback")
+        self.gridLayout_6.addWidget(self.label_scrollback, 8, 0, 1, 1)
+        self.lineEdit_scrollback_lines = QtWidgets.QLineEdit(self.page_terminal_settings)
+        self.lineEdit_scrollback_lines.setMaximumSize(QtCore.QSize(100, 100))
+        self.lineEdit_scrollback_lines.setAlignment(QtCore.Qt.AlignCenter)
+        self.lineEdit_scrollback_lines.setObjectName("lineEdit_scrollback_lines")
+        self.gridLayout_6.addWidget(self.lineEdit_scrollback_lines, 8, 1, 1, 1)
+        self.label_scrollback_lines = QtWidgets.QLabel(self.page_terminal_settings)
+        self.label_scrollback_lines.setObjectName("label_scrollback_lines")
+        self.gridLayout_6.addWidget(self.label_scrollback_lines, 8, 2, 1, 1)
+        self.lineEdit_scrollback_kb = QtWidgets.QLineEdit(self.page_terminal_settings)
+        self.lineEdit_scrollback_kb.setMaximumSize(QtCore.QSize(100, 100))
+        self.lineEdit_scrollback_kb.setAlignment(QtCore.Qt.AlignCenter)
+        self.lineEdit_scrollback_kb.setObjectName("lineEdit_scrollback_kb")
+        self.gridLayout_6.addWidget(self.lineEdit_scrollback_kb, 8, 3, 1, 1)
+        self.label_scrollback_kb = QtWidgets.QLabel(self.page_terminal_settings)
+        self.label_scrollback_kb.setObjectName("label_scrollback_kb")
+        self.gridLayout_6.addWidget(self.label_scrollback_kb, 8, 4, 1, 1)
         self.toolBox.addItem(self.page_terminal_settings, "")
         self.page_log_settings = QtWidgets.QWidget()
         self.page_log_settings.setGeometry(QtCore.QRect(0, 0, 496, 250))
@@ -722,7 +774,10 @@ class Ui_MainWindow(object):
         MainWindow.setTabOrder(self.checkBox_xonxoff, self.checkBox_dsrdtr)
         MainWindow.setTabOrder(self.checkBox_dsrdtr, self.checkBox_autoscroll)
         MainWindow.setTabOrder(self.checkBox_autoscroll, self.checkBox_timestamp)
-        MainWindow.setTabOrder(self.checkBox_timestamp, self.pushButton_clear)
+        MainWindow.setTabOrder(self.checkBox_timestamp, self.checkBox_ansi)
+        MainWindow.setTabOrder(self.checkBox_ansi, self.comboBox_view)
+        MainWindow.setTabOrder(self.comboBox_view, self.lineEdit_hex_width)
+        MainWindow.setTabOrder(self.lineEdit_hex_width, self.pushButton_clear)
         MainWindow.setTabOrder(self.pushButton_clear, self.textEdit_terminal)
         MainWindow.setTabOrder(self.textEdit_terminal, self.checkBox_rtscts)
         MainWindow.setTabOrder(self.checkBox_rtscts, self.lineEdit_delay)
@@ -765,7 +820,15 @@ class Ui_MainWindow(object):
         self.checkBox_xonxoff.setText(_translate("MainWindow", "xonxoff"))
         self.checkBox_autoscroll.setText(_translate("MainWindow", "Autoscroll"))
         self.checkBox_timestamp.setText(_translate("MainWindow", "Timestamp"))
+        self.checkBox_ansi.setToolTip(_translate("MainWindow", "Render ANSI/VT100 colors and line erases in received text"))
+        self.checkBox_ansi.setText(_translate("MainWindow", "ANSI"))
         self.pushButton_clear.setText(_translate("MainWindow", "Clear"))
+        self.comboBox_view.setToolTip(_translate("MainWindow", "Show received and sent data as text, or as a hex dump of the raw bytes"))
+        self.comboBox_view.setItemText(0, _translate("MainWindow", "Text"))
+        self.comboBox_view.setItemText(1, _translate("MainWindow", "Hex"))
+        self.lineEdit_hex_width.setToolTip(_translate("MainWindow", "Bytes per hex dump row"))
+        self.lineEdit_hex_width.setText(_translate("MainWindow", "16"))
+        self.lineEdit_hex_width.setPlaceholderText(_translate("MainWindow", "16"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.terminal), _translate("MainWindow", "Terminal"))
         self.lineEdit_delay.setPlaceholderText(_translate("MainWindow", "200"))
         self.pushButton_run_script.setText(_translate("MainWindow", "Run"))
@@ -825,6 +888,13 @@ class Ui_MainWindow(object):
         self.label_10.setText(_translate("MainWindow", "Error:"))
         self.label_12.setText(_translate("MainWindow", "* Prepended Text is only displayed in the Log / Terminal. \n"
 "  It is NOT sent to the device"))
+        self.label_scrollback.setText(_translate("MainWindow", "Scrollback:"))
+        self.lineEdit_scrollback_lines.setToolTip(_translate("MainWindow", "Lines kept in the terminal. The oldest are dropped (they are still in the log). 0 = no limit"))
+        self.lineEdit_scrollback_lines.setText(_translate("MainWindow", "10000"))
+        self.label_scrollback_lines.setText(_translate("MainWindow", "lines, at most"))
+        self.lineEdit_scrollback_kb.setToolTip(_translate("MainWindow", "Thousands of characters kept in the terminal. 0 = no limit"))
+        self.lineEdit_scrollback_kb.setText(_translate("MainWindow", "4096"))
+        self.label_scrollback_kb.setText(_translate("MainWindow", "k chars"))
         self.toolBox.setItemText(self.toolBox.indexOf(self.page_terminal_settings), _translate("MainWindow", "Terminal Settings"))
         self.pushButton_restart_logger.setText(_translate("MainWindow", "Restart Logger"))
         self.lineEdit_log_name.setText(_translate("MainWindow", "log-%y-%m-%d"))
@@ -861,3 +931,4 @@ class Ui_MainWindow(object):
         self.action_save_as_script.setText(_translate("MainWindow", "Save As"))
         self.action_run_script.setText(_translate("MainWindow", "Run"))
 from plot_widget import Plot_Widget
+from sk_terminal import Terminal
@@ -6,6 +6,7 @@ import PyQt5.QtCore
 from pyqtgraph.functions import intColor
 from termcolor import cprint
 from sk_tools import vprint
+from sk_ring_buffer import shift_stamps, stamp_at
 
 
 def char_split(input: str, chars: list, keep_seps=False) -> list:
@@ -55,7 +56,13 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
         self.plot_type: str = None
         self.targets: list = None
         self.max_points: int = 100
-        self.str_buffer: str = ""
+        self.rx_buffer = bytearray()
+        self.rx_stamps = []  # (offset in rx_buffer, mono, wall) of each chunk in rx_buffer
+        self.parse_time = 0.0  # Seconds spent parsing lines, for sk_stats
+        self.resyncing = False  # Data was skipped. Wait for the next line to start
+        self.parsed_lines = 0
+        self.encoding = "latin-1"
+        self.errors = 'replace'
         self.limits = "Window"
         self.paused = False
         self.started = False
@@ -93,12 +100,16 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
         self.paused = False
         self.elements = {}
         
-        self.start_time = time.perf_counter()
+        self.start_time = time.monotonic()
         self.legend = pg.LegendItem(offset=(30, 30))
         self.legend.setParentItem(self.plot)
         vprint(f"[PLOT] STARTING {self.plot_type}\n\ttargets: {self.targets}\n\tlen: {self.max_points}\n\tseps:{self.separators}\n\tlines:{ref_lines}", color="green")
         self.addItem(self.plot)
         
+    def set_encoding(self, encoding: str = "latin-1", errors: str = 'replace'):
+        self.encoding = encoding
+        self.errors = errors
+
     def pause(self):
         vprint("[PLOT] Paused")
         self.paused = True
@@ -115,7 +126,8 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
         self.min_value = 0
         self.max_value =0
         self.legend.clear()
-        self.str_buffer = ""
+        self.rx_buffer = bytearray()
+        self.rx_stamps = []
         self.plot.clearPlots()
 
         self.removeItem(self.plot)
@@ -130,30 +142,50 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
     def end(self): #TODO 
         return
 
-    def update(self, input: str):
+    def update(self, data, stamps: list = None):
+        '''Buffer str or bytes-like data, parsing every completed line. Only whole lines are decoded.
+        stamps: (offset, mono, wall) capture times of the chunks in data. A line is plotted at the time it started, else now'''
         if not self.started or self.paused:
             return
-        self.str_buffer += input
-        if '\n' not in self.str_buffer:
+        if isinstance(data, str):
+            data = data.encode(self.encoding, 'backslashreplace')
+        if not stamps:
+            stamps = [(0, time.monotonic(), time.time())]
+        if self.resyncing:
+            start = bytes(data).find(b'\n') + 1
+            if not start:
+                return
+            data = data[start:]
+            stamps = shift_stamps(stamps, start)
+            self.resyncing = False
+        base = len(self.rx_buffer)
+        self.rx_stamps += [(base + offset, mono, wall) for offset, mono, wall in stamps]
+        self.rx_buffer += data
+        end = self.rx_buffer.rfind(b'\n')
+        if end < 0:
             return
 
-        elements = self.str_buffer.split("\n", 1)
-        if len(elements) > 1:
-            self.str_buffer = elements[1]
-        else:
-            self.str_buffer = ""
-
-        elements[0] = elements[0].replace("\r", "")
-
-        if self.plot_type == 'Key-Value':
-            self.parse_data_key_value(elements[0])
-        elif self.plot_type == "Single-Array": # TODO
-            self.parse_data_single_array(elements[0])
-        elif self.plot_type == 'Single-Value':
-            self.parse_data_single_value(elements[0])
-        elif self.plot_type == "Key-Array":
-            pass 
-
+        lines = self.rx_buffer[:end].split(b'\n')
+        del self.rx_buffer[:end + 1]
+        line_stamps = self.rx_stamps
+        self.rx_stamps = shift_stamps(line_stamps, end + 1)
+
+        parse_start = time.perf_counter()
+        start = 0
+        for line in lines:
+            timestamp = stamp_at(line_stamps, start)[1] - self.start_time
+            start += len(line) + 1
+            line = line.replace(b'\r', b'').decode(self.encoding, self.errors)
+            if self.plot_type == 'Key-Value':
+                self.parse_data_key_value(line, timestamp)
+            elif self.plot_type == "Single-Array": # TODO
+                self.parse_data_single_array(line)
+            elif self.plot_type == 'Single-Value':
+                self.parse_data_single_value(line, timestamp)
+            elif self.plot_type == "Key-Array":
+                pass 
+        self.parse_time += time.perf_counter() - parse_start
+        self.parsed_lines += len(lines)
 
         for element in self.elements:
             self.elements[element]['line'].setData(self.elements[element]['x'], self.elements[element]['y'])
@@ -162,10 +194,15 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
             self.plot.setYRange(self.min_value, self.max_value)
 
 
+    def resync(self):
+        '''Data was skipped (see RingCursor.catch_up): drop the partial line, and start again at the next one'''
+        self.rx_buffer.clear()
+        self.rx_stamps = []
+        self.resyncing = True
+
     def add_element(self, element_name: str, start_x: float = 0, start_y:float = 0):
         if not element_name:
             return
-        startTs = time.perf_counter() - self.start_time
         self.elements[element_name] = {}
         #self.elements[element_name]['x'] = np.zeros(shape=self.max_points)
         self.elements[element_name]['x'] = np.empty(shape=self.max_points)
@@ -180,8 +217,9 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
         self.prev_color += 50
         self.legend.addItem(self.elements[element_name]['line'], name=element_name)
 
-    def parse_data_single_value(self, input:str):
-        timestamp = time.perf_counter() - self.start_time
+    def parse_data_single_value(self, input:str, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.monotonic() - self.start_time
         tokens = char_split(input, self.separators)
         value = None 
 
@@ -196,7 +234,7 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
             return 
 
         if "a" not in self.elements:
-                self.add_element("a", time.perf_counter() - self.start_time, value)
+                self.add_element("a", timestamp, value)
 
         vprint(f"[PLOT SV] VALUES: {tokens}", color = "green")
         self.elements["a"]['x'][-1] = timestamp
@@ -228,10 +266,11 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
         pass
 
     
-    def parse_data_key_value(self, input: str):
+    def parse_data_key_value(self, input: str, timestamp: float = None):
         tokens = char_split(input, self.separators)
         vprint(f"\n[PLOT KV] TOKENS: {tokens}", color = 'yellow', end = "\t") # Debug
-        timestamp = time.perf_counter() - self.start_time
+        if timestamp is None:
+            timestamp = time.monotonic() - self.start_time
         prev_key:str = None 
         while tokens: 
             token = tokens.pop(0)
@@ -254,7 +293,7 @@ class Plot_Widget(pg.GraphicsLayoutWidget):
             vprint(f"\n[PLOT KV] PAIR: {prev_key}:{value}", color = 'green', sep = '=', end = "\t") # Debug 
 
             if prev_key not in self.elements:
-                self.add_element(prev_key, time.perf_counter() - self.start_time, value)
+                self.add_element(prev_key, timestamp, value)
             
             self.elements[prev_key]['x'][-1] = timestamp
             self.elements[prev_key]['y'][-1] = value
@@ -1,149 +1,641 @@
+import os
+import queue
+import threading
 import time
 import traceback
+from concurrent.futures import Future
 
 import serial
-import serial.tools.list_ports as list_ports
-from PyQt5.QtCore import QObject, pyqtSignal
 from serial.serialutil import (PARITY_EVEN, PARITY_MARK, PARITY_NONE, PARITY_ODD, PARITY_SPACE)
+from sk_autobaud import line_error_counts
+from sk_decoder import RxDecoder
+from sk_logging import SK_Logger
+from sk_port_catalog import PortCatalog, get_serial_port_number, port_sort_key
+from sk_ring_buffer import RxRingBuffer
 from sk_tools import *
 baud_rates = serial.Serial.BAUDRATES
-ser = serial.Serial()
 parity_values = {"NONE": PARITY_NONE, "EVEN": PARITY_EVEN,
                  "ODD": PARITY_ODD, "MARK": PARITY_MARK, "SPACE": PARITY_SPACE}
 
+READ_MODE_POLL = "poll"    # Spin on inWaiting(), sleeping only after a second of inactivity
+READ_MODE_BLOCK = "block"  # Block inside read() until bytes arrive or the read timeout expires
+read_modes = [READ_MODE_POLL, READ_MODE_BLOCK]
+DEFAULT_READ_TIMEOUT = .1  # Seconds
+DEFAULT_MIN_CHUNK = 1      # Bytes
+DEFAULT_EMIT_RATE = 60     # Max batches per second sent to the GUI. 0 = emit every read
+DEFAULT_BATCH_BYTES = 65536  # Emit early once this many bytes are pending. 0 = emit every read
+DEFAULT_TX_QUEUE_DEPTH = 256  # Sends waiting to be written before send() starts refusing them
+RECONNECT_MIN_DELAY = .02  # Seconds. The first retry is immediate, then the delay doubles
+RECONNECT_MAX_DELAY = 1    # up to this
+BITS_PER_BYTE = 10         # 8N1: start + 8 data + stop
+DEFAULT_DRIVER_BUFFER = 1 << 20  # Bytes the driver may hold while the reader is late, where it can be sized (Windows)
+LINE_CHECK_INTERVAL = .5         # Seconds between reads of the driver's error counters
 
-def serial_get_string() -> str:
-    if not ser.isOpen():
+DROP_DISPLAY = "display"  # When the GUI falls behind, the terminal and plot skip to recent data. The log and recording get everything
+DROP_DATA = "data"        # Every consumer gets everything, until it falls a whole ring behind and loses the oldest bytes
+drop_policies = [DROP_DISPLAY, DROP_DATA]
+DISPLAY_MAX_BEHIND = 64 * 1024  # Bytes the terminal and plot may be behind under DROP_DISPLAY
+DRAIN_MAX_BYTES = 256 * 1024  # Bytes each GUI consumer takes per frame. The rest waits for the next one, or overruns
+
+BACKEND_THREAD = "thread"  # A thread per port for reading and another for writing
+BACKEND_ASYNC = "async"    # Every port read and written by tasks on one shared asyncio loop (see sk_async)
+backends = [BACKEND_THREAD, BACKEND_ASYNC]
+ASYNC_SUPPORTED = os.name == 'posix'  # The async backend watches the port's file descriptor
+
+virtual_ports: dict = {}  # Port name: port info. Filled by sk_virtual_port, listed by get_ports()
+
+
+class TxQueue:
+    '''Sends are queued and written by one thread per port, so a slow or flow-controlled device never blocks the caller'''
+
+    def __init__(self, ser: serial.Serial, max_depth: int = DEFAULT_TX_QUEUE_DEPTH) -> None:
+        self.ser = ser
+        self.queue = queue.Queue(max_depth)
+        self.lock = threading.Lock()
+        self.thread: threading.Thread = None
+        self.active = False
+        self.bytes_in_flight = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.last_latency = 0.0  # Seconds from send() to the bytes leaving the driver
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self.run, name="TxQueue", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        if self.thread:
+            self.thread.join(1)
+        self.thread = None
+
+    def send(self, data: bytes, callback=None) -> Future:
+        '''Queue data to be written. The future resolves to the number of bytes written, or the write error'''
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        if not self.active:
+            future.set_exception(serial.PortNotOpenError())
+            return future
+        try:
+            self.queue.put_nowait((data, future, time.perf_counter()))
+        except queue.Full:
+            future.set_exception(BufferError(f"TX QUEUE FULL ({self.queue.maxsize} SENDS WAITING)"))
+            return future
+        with self.lock:
+            self.bytes_in_flight += len(data)
+        return future
+
+    def run(self):
+        while self.active:
+            try:
+                data, future, queued_at = self.queue.get(timeout=.1)
+            except queue.Empty:
+                continue
+            self.write(data, future, queued_at)
+        self.fail_pending()
+
+    def fail_pending(self):
+        '''Fail anything left in the queue when the port closed'''
+        while not self.queue.empty():
+            data, future, queued_at = self.queue.get_nowait()
+            with self.lock:
+                self.bytes_in_flight -= len(data)
+            future.set_exception(serial.PortNotOpenError())
+
+    def write(self, data: bytes, future: Future, queued_at: float):
+        try:
+            written = self.ser.write(data)
+            self.ser.flush()  # Wait for the driver to drain, so the future means "sent"
+        except Exception as E:
+            future.set_exception(E)
+            return
+        finally:
+            with self.lock:
+                self.bytes_in_flight -= len(data)
+        self.record(written, queued_at)
+        future.set_result(written)
+
+    def record(self, written: int, queued_at: float):
+        latency = time.perf_counter() - queued_at
+        self.writes += 1
+        self.bytes_written += written
+        self.last_latency = latency
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'in_flight': self.bytes_in_flight,
+            'written': self.bytes_written,
+            'last_latency': self.last_latency,
+            'avg_latency': self.total_latency / self.writes if self.writes else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+
+class SerialSession:
+    '''One serial connection: owns its port, RX worker thread, RX ring buffer, decoder, counters and logger'''
+
+    def __init__(self, log: SK_Logger = None) -> None:
+        self.ser = serial.Serial()
+        self.ring = RxRingBuffer()
+        self.log: SK_Logger = log
+        self.decoder = RxDecoder()
+        self.tx = TxQueue(self.ser)
+        self.thread = None  # QThread, or threading.Thread for start_reader()
+        self.worker = None  # SerialWorker, SerialReader, AsyncSerialWorker or ReplayWorker
+        self.read_mode: str = READ_MODE_POLL
+        self.read_timeout: float = DEFAULT_READ_TIMEOUT
+        self.min_chunk: int = DEFAULT_MIN_CHUNK
+        self.emit_rate: float = DEFAULT_EMIT_RATE
+        self.batch_bytes: int = DEFAULT_BATCH_BYTES
+        self.backend: str = BACKEND_THREAD
+        self.rx_bytes = 0  # Counters for sk_stats. Each has one writer thread, so none are locked
+        self.tx_bytes = 0
+        self.rx_reads = 0
+        self.rx_lines = 0
+        self.tx_lines = 0          # Counted as sends are queued
+        self.rx_batches = 0        # on_data() calls made by the reader
+        self.rx_batches_handled = 0  # and handled by the consumer. The difference is the emit queue depth
+        self.rx_waiting_max = 0    # High-water mark of bytes found waiting in the driver
+        self.rx_buffer_full = 0    # Reads that found a sized driver buffer full: bytes were likely dropped
+        self.line_errors = {}      # Driver error counts since connect (see check_line_errors)
+        self.line_counts: dict = None  # The driver's counters at the last check. None if it keeps none
+        self.line_checked = 0.0
+        self.driver_buffer: int = DEFAULT_DRIVER_BUFFER
+        self.rx_capacity: int = None  # Bytes the driver buffer was sized to (Windows). None where it is fixed
+        self.drop_policy: str = DROP_DISPLAY
+        self.settings: dict = {}  # From connect(). Reused to reopen the port
+        self.identity: str = None  # Of the connected device (see sk_port_catalog)
+        self.reconnecting = False
+        self.reconnect_thread: threading.Thread = None
+        self.reconnect_wake = threading.Event()
+        self.reconnect_attempts = 0
+        self.lost_at = 0.0
+        self.outages = 0
+        self.outage_time = 0.0  # Seconds
+        self.bytes_lost = 0     # Estimated, from the baud rate and outage time
+        self.capture = None     # sk_capture.CaptureWriter while recording
+        self.capture_tx = queue.SimpleQueue()  # (data, mono) of sends that went out, for capture_sent()
+
+    @property
+    def port(self) -> str:
+        return self.ser.port
+
+    def is_open(self) -> bool:
+        return self.ser.isOpen()
+
+    def get_bytes(self) -> bytes:
+        if not self.ser.isOpen():
+            return None
+        waiting = self.ser.inWaiting()
+        if waiting:
+            self.note_waiting(waiting)
+            self.rx_reads += 1
+            data = self.ser.read(waiting)
+            self.rx_bytes += len(data)
+            self.rx_lines += data.count(b'\n')
+            return data
         return None
-    waiting = ser.inWaiting()
-    if waiting:
-        out_str = ""
-        for c in ser.read(waiting):
-            out_str += chr(c)
-        return out_str
-    return None
 
-def serial_send_string(input: str = ""):
-    try:
-        ser.flush()
-        ser.write(input.encode('utf-8'))
-    except Exception as E:
-        eprint("ERROR SENDING DATA:", E, color='red')
-
-def serial_connect(port: str, baud=115200, xonxoff=False, rtscts=False, dsrdtr=False, parity="NONE"):
-    try:
-        ser.baudrate = baud
-        ser.setPort(port)
-        ser.xonxoff = xonxoff
-        ser.rtscts = rtscts
-        ser.dsrdtr = dsrdtr
+    def read_blocking(self, min_chunk: int = DEFAULT_MIN_CHUNK) -> bytes:
+        '''Wait in read() for min_chunk bytes (or ser.timeout), then drain anything else waiting'''
+        if not self.ser.isOpen():
+            return None
+        data = self.ser.read(min_chunk)
+        if not data:
+            return None
+        waiting = self.ser.inWaiting()
+        self.note_waiting(len(data) + waiting)
+        if waiting:
+            data += self.ser.read(waiting)
+        self.rx_reads += 1
+        self.rx_bytes += len(data)
+        self.rx_lines += data.count(b'\n')
+        return data
+
+    def read_available(self, size: int = 65536) -> bytes:
+        '''One non-blocking read straight from the file descriptor (posix only). Raises SerialException if the port is gone'''
+        try:
+            data = os.read(self.ser.fd, size)
+        except BlockingIOError:
+            return None
+        except OSError as E:
+            raise serial.SerialException(E)
+        if not data:  # Readable, but nothing to read: the device went away
+            raise serial.SerialException("device disconnected")
+        self.note_waiting(len(data))
+        self.rx_reads += 1
+        self.rx_bytes += len(data)
+        self.rx_lines += data.count(b'\n')
+        return data
+
+    def note_waiting(self, waiting: int):
+        '''Called by the reader with the bytes it found waiting. A full driver buffer of known size means the reader was too late.
+        Where it was not sized (Linux), only the high-water mark is kept: in_waiting stops at the line discipline's
+        buffer while more waits in the tty layer behind it. Loss there shows in the driver's overrun counters'''
+        if waiting > self.rx_waiting_max:
+            self.rx_waiting_max = waiting
+        if self.rx_capacity and waiting >= self.rx_capacity - 1 and not (self.ser.rtscts or self.ser.xonxoff):  # Flow control holds the device off instead
+            self.rx_buffer_full += 1
+
+    def check_line_errors(self):
+        '''Add what the driver's error counters (overrun, framing, parity...) gained since the last check.
+        Called by the reader. Does nothing for LINE_CHECK_INTERVAL after a check, or if the driver keeps no counters'''
+        now = time.perf_counter()
+        if self.line_counts is None or now - self.line_checked < LINE_CHECK_INTERVAL:
+            return
+        self.line_checked = now
+        counts = line_error_counts(self.ser)
+        if counts is None:
+            return
+        for name, count in counts.items():
+            self.line_errors[name] = self.line_errors.get(name, 0) + max(0, count - self.line_counts.get(name, count))
+        self.line_counts = counts
+
+    def send_string(self, input: str = "", callback=None) -> Future:
+        '''Queue input to be sent. Returns immediately. callback(future) runs on the TX thread when done'''
+        data = input.encode('utf-8')
+        self.tx_lines += data.count(b'\n')
+        queued_at = time.monotonic()
+        future = self.tx.send(data)
+        future.add_done_callback(lambda future: self.sent(future, data, queued_at))
+        if callback:
+            future.add_done_callback(callback)  # After sent(), so the capture has the chunk by then
+        return future
+
+    def sent(self, future: Future, data: bytes = b"", queued_at: float = None):
+        if future.cancelled():
+            return
+        if future.exception():
+            eprint("ERROR SENDING DATA:", future.exception(), color='red')
+            return
+        self.tx_bytes += future.result()
+        if self.capture:
+            self.capture_tx.put((data, queued_at))  # Written by capture_sent(), on the capture's thread
+
+    def connect(self, port: str, baud=115200, xonxoff=False, rtscts=False, dsrdtr=False, parity="NONE") -> bool:
         if parity not in parity_values:
             return False
-        ser.parity = parity_values[parity]
-        ser.close()
-        ser.open()
-        if (ser.isOpen()):
-            ser.flush()
-            return True
-        else:
+        self.settings = {'port': port, 'baud': baud, 'xonxoff': xonxoff, 'rtscts': rtscts, 'dsrdtr': dsrdtr, 'parity': parity}
+        self.identity = port_catalog.identity(port)
+        self.decoder.reset()
+        return self.open(port)
+
+    def open(self, port: str, quiet: bool = False) -> bool:
+        '''Open port with the settings from connect()'''
+        settings = self.settings
+        try:
+            self.ser.baudrate = settings['baud']
+            self.ser.setPort(port)
+            self.ser.xonxoff = settings['xonxoff']
+            self.ser.rtscts = settings['rtscts']
+            self.ser.dsrdtr = settings['dsrdtr']
+            self.ser.parity = parity_values[settings['parity']]
+            self.ser.close()
+            self.ser.open()
+            if (self.ser.isOpen()):
+                self.ser.flush()
+                self.size_driver_buffer()
+                self.line_counts = line_error_counts(self.ser)  # Errors are counted from here on
+                self.line_checked = time.perf_counter()
+                if self.backend == BACKEND_ASYNC:
+                    from sk_async import AsyncTxQueue
+                    self.tx = AsyncTxQueue(self.ser)
+                else:
+                    self.tx = TxQueue(self.ser)
+                self.tx.start()
+                return True
+            else:
+                return False
+        except Exception as E:
+            if not quiet:
+                self.ser.port = None
+                eprint(f"ERROR OPENING PORT: {port} ", E)
+                eprint(f"ERR: {traceback.format_exc()}\n", color='red')
+                time.sleep(.05)
             return False
-    except Exception as E:
-        eprint(f"ERROR OPENING PORT: {port} ", E)
-        eprint(f"ERR: {traceback.format_exc()}\n", color='red')
-        ser.port = None
-        time.sleep(.05)
-        return False
-
-def serial_disconnect():
-    ser.cancel_read()
-    ser.cancel_write()
-    time.sleep(.01)
-    ser.close()
-
-class SerialWorker(QObject):  # THIS FETCHES SERIAL DATA. ASYNC.
-    out = pyqtSignal(str)
-    disconnected = pyqtSignal(bool)
-
-    def __init__(self):
-        super().__init__()
+
+    def size_driver_buffer(self):
+        '''Ask the driver for a bigger receive buffer, where the platform allows it (Windows). Elsewhere it is fixed'''
+        self.rx_capacity = None
+        if not hasattr(self.ser, 'set_buffer_size') or not self.driver_buffer:
+            return
+        try:
+            self.ser.set_buffer_size(rx_size=self.driver_buffer)
+            self.rx_capacity = self.driver_buffer
+        except Exception as E:
+            vprint(f"DRIVER BUFFER OF {self.driver_buffer} BYTES REFUSED: {E}", color='red')
+
+    def disconnect(self):
+        self.stop_reconnect()
+        self.close_port()
+
+    def close_port(self):
+        self.stop_worker()
+        self.tx.active = False
+        if self.ser.isOpen():
+            self.ser.cancel_read()
+            self.ser.cancel_write()
+        self.tx.stop()
+        time.sleep(.01)
+        try:
+            self.ser.close()
+        except Exception as E:  # The device may already be gone
+            vprint("ERROR CLOSING PORT: ", E, color='red')
+
+    def start_reconnect(self, on_restored, lost: bool = True):
+        '''The port was lost. Reopen it with the same settings, retrying at once and then with backoff.
+        The ring, decoder and logger are kept as they are. on_restored(outage_sec, bytes_lost) is called
+        from the reconnect thread, after which start_worker() resumes reading.
+        lost=False: connect() failed on a port that was just plugged in (i.e. udev still setting its
+        permissions). It is retried the same way, but nothing was lost'''
+        self.lost_at = time.perf_counter()
+        self.close_port()
+        self.reconnecting = True
+        self.reconnect_wake.clear()
+        self.reconnect_thread = threading.Thread(target=self.reconnect_loop, args=(on_restored, lost),
+                                                 name="Reconnect", daemon=True)
+        self.reconnect_thread.start()
+
+    def reconnect_loop(self, on_restored, lost: bool = True):
+        delay = 0
+        self.reconnect_attempts = 0
+        while self.reconnecting:
+            port = self.find_port()
+            if port:
+                self.reconnect_attempts += 1
+                if self.open(port, quiet=True):
+                    break
+            self.reconnect_wake.wait(delay)
+            self.reconnect_wake.clear()
+            delay = min(max(delay * 2, RECONNECT_MIN_DELAY), RECONNECT_MAX_DELAY)
+        if not self.reconnecting:  # Stopped by disconnect()
+            return
+        self.reconnecting = False
+        outage = time.perf_counter() - self.lost_at
+        if not lost:
+            on_restored(outage, 0)
+            return
+        bytes_lost = int(outage * self.ser.baudrate / BITS_PER_BYTE)  # What the line could have carried meanwhile
+        self.outages += 1
+        self.outage_time += outage
+        self.bytes_lost += bytes_lost
+        on_restored(outage, bytes_lost)
+
+    def find_port(self) -> str:
+        '''Where the lost device is now. None if it is not back yet, or its old name belongs to another device'''
+        port_catalog.refresh()
+        port = port_catalog.lookup(self.identity)
+        if port:
+            return port
+        if self.identity == self.settings['port']:  # Not a device the catalog can recognize. Trust the name
+            return self.settings['port']
+        return None
+
+    def reconnect_now(self):
+        '''Skip the rest of the current backoff, i.e. when a port was just plugged in'''
+        self.reconnect_wake.set()
+
+    def stop_reconnect(self):
+        if not self.reconnecting:
+            return
+        self.reconnecting = False
+        self.reconnect_wake.set()
+        if self.reconnect_thread and self.reconnect_thread is not threading.current_thread():
+            self.reconnect_thread.join(1)
+        self.reconnect_thread = None
+
+    def start_worker(self, on_data, on_lost):
+        '''Start reading into the ring. on_data(count) is called per batch written, on_lost if the port drops'''
+        if self.backend == BACKEND_ASYNC:
+            from sk_async import AsyncSerialWorker
+            self.thread = None
+            self.worker = AsyncSerialWorker(self, self.emit_rate, self.batch_bytes)
+            self.worker.out.connect(on_data)
+            self.worker.disconnected.connect(on_lost)
+            self.worker.run()
+            return
+        from PyQt5.QtCore import QThread
+        from sk_workers import SerialWorker
+        self.thread = QThread()
+        self.worker = SerialWorker(self, self.read_mode, self.read_timeout, self.min_chunk,
+                                   self.emit_rate, self.batch_bytes)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.out.connect(on_data)
+        self.worker.disconnected.connect(on_lost)
+        self.thread.setTerminationEnabled(True)
+        self.thread.start()
+
+    def start_replay(self, file_path: str, speed: float, on_data, on_tx, on_finished):
+        '''Feed the ring from a capture file (see sk_capture) instead of the port. speed 0 = as fast as possible'''
+        from PyQt5.QtCore import QThread
+        from sk_capture import ReplayWorker
+        self.decoder.reset()
+        self.thread = QThread()
+        self.worker = ReplayWorker(self, file_path, speed, self.emit_rate, self.batch_bytes)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.out.connect(on_data)
+        self.worker.tx.connect(on_tx)
+        self.worker.finished.connect(on_finished)
+        self.thread.start()
+
+    def start_capture(self, file_path: str):
+        '''Record RX (from capture_rx) and TX to file_path'''
+        from sk_capture import CaptureWriter
+        self.stop_capture()
+        self.capture = CaptureWriter(file_path, self.port, self.ser.baudrate)
+        return self.capture
+
+    def capture_rx(self, data, stamps: list):
+        if self.capture:
+            self.capture.write_rx(data, stamps)
+
+    def capture_sent(self):
+        '''Record the sends that went out since the last call, stamped with when they were queued'''
+        while not self.capture_tx.empty():
+            data, queued_at = self.capture_tx.get_nowait()
+            if self.capture:
+                self.capture.write_tx(data, queued_at)
+
+    def stop_capture(self):
+        if self.capture:
+            self.capture_sent()
+            self.capture.close()
+        self.capture = None
+
+    def start_reader(self, on_data, on_lost):
+        '''start_worker() without Qt (i.e. headless): a plain thread reads into the ring. Callbacks run on that thread'''
+        self.worker = SerialReader(self, self.read_mode, self.read_timeout, self.min_chunk, self.emit_rate, self.batch_bytes,
+                                   on_data=on_data, on_lost=on_lost)
+        self.thread = threading.Thread(target=self.worker.run, name=f"Reader {self.port}", daemon=True)
+        self.thread.start()
+
+    def stop_worker(self):
+        if self.worker is None:
+            return
+        self.worker.stop()
+        if isinstance(self.thread, threading.Thread):
+            if self.thread is not threading.current_thread():
+                self.thread.join(1)
+        elif self.thread:
+            self.thread.exit()
+
+
+class SerialReader:  # THIS FETCHES SERIAL DATA
+    '''Reads go into session.ring. on_data(count) is called at most emit_rate times a second, or once batch_bytes are pending,
+    and on_lost() if the port fails. Both run on the reading thread: a QThread for SerialWorker (sk_workers), else a plain thread'''
+
+    def __init__(self, session: SerialSession, read_mode: str = READ_MODE_POLL, read_timeout: float = DEFAULT_READ_TIMEOUT, min_chunk: int = DEFAULT_MIN_CHUNK,
+                 emit_rate: float = DEFAULT_EMIT_RATE, batch_bytes: int = DEFAULT_BATCH_BYTES, on_data=None, on_lost=None):
+        self.session = session
+        self.on_data = on_data
+        self.on_lost = on_lost
         self.active = True
         self.last_activity = time.perf_counter()
+        self.read_mode = read_mode
+        self.read_timeout = read_timeout
+        self.min_chunk = min_chunk
+        self.emit_interval = 1 / emit_rate if emit_rate else 0
+        self.batch_bytes = batch_bytes
+        self.pending = 0
+        self.last_emit = 0
+
+    def emit_data(self, count: int):
+        if self.on_data:
+            self.on_data(count)
+
+    def emit_lost(self):
+        if self.on_lost:
+            self.on_lost()
+
+    def emit_pending(self):
+        self.session.rx_batches += 1
+        self.emit_data(self.pending)
+        self.pending = 0
+        self.last_emit = time.perf_counter()
 
     def run(self):
+        ser = self.session.ser
+        if self.read_mode == READ_MODE_BLOCK:
+            ser.timeout = self.read_timeout
+            if self.emit_interval:  # Wake at least once a frame so a pending batch is never held for long
+                ser.timeout = min(self.read_timeout, self.emit_interval)
         while self.active:
             try:
-                serial_data = serial_get_string()
+                if self.read_mode == READ_MODE_BLOCK:
+                    serial_data = self.session.read_blocking(self.min_chunk)
+                else:
+                    serial_data = self.session.get_bytes()
+                self.session.check_line_errors()
                 if serial_data:
-                    self.out.emit(serial_data)
+                    self.session.ring.write(serial_data, time.monotonic(), time.time())  # Capture time, before any queueing
+                    self.pending += len(serial_data)
                     self.last_activity = time.perf_counter()
+                    if self.pending >= self.batch_bytes or self.last_activity - self.last_emit >= self.emit_interval:
+                        self.emit_pending()
+                elif self.pending and time.perf_counter() - self.last_emit >= self.emit_interval:
+                    self.emit_pending()
+                elif self.read_mode == READ_MODE_BLOCK:
+                    if not ser.isOpen():  # read() returns immediately on a closed port
+                        time.sleep(self.read_timeout)
                 elif time.perf_counter() - self.last_activity > 1:  # Throttle polling if no activity within .5 sec
                     time.sleep(.005)
             except Exception as E:
                 eprint("Serial Worker Error", E)
                 eprint(f"ERR: {traceback.format_exc()}\n", color='red')
                 self.active = False
-                self.disconnected.emit(False)
+                self.emit_lost()
+        if self.pending:
+            self.emit_pending()
 
     def stop(self):
         self.active = False
 
 
-def get_serial_port_number(input: str) -> int:
-    port_numb = 0
-    if "COM" in input:
-        try:
-            port_numb = int(input.replace("COM", ""))
-        except:
-            port_numb = -1
-    if "dev/ttyS" in input:
-        try:
-            port_numb = int(input.split("dev/ttyS")[1])
-        except:
-            port_numb = -1
+def configure_session(session: SerialSession, kwargs: dict) -> str:
+    '''Apply the reader and decoder options of the 'con' command. Returns an error message, or None'''
+    if '--rx' in kwargs:
+        if kwargs['--rx'] not in read_modes:
+            return f"RX MODE {kwargs['--rx']} INVALID"
+        session.read_mode = kwargs['--rx']
 
-    return port_numb
+    if '--timeout' in kwargs:
+        read_timeout = get_number(kwargs['--timeout'], float, None, lower_limit=0)
+        if read_timeout == None:
+            return f"READ TIMEOUT {kwargs['--timeout']} INVALID"
+        session.read_timeout = read_timeout
 
-def get_ports() -> dict:
-    '''Get the Serial Ports Availiable'''
-    ports = {}
-    for port in list_ports.comports():
-        ports[port.device] = {
-            'descr': str(port.description),
-            'name': str(port.name),
-            'mfgr': str(port.manufacturer),
-            'hwid': str(port.hwid),
-            'vid': str(port.vid),
-            'pid': str(port.pid),
-            's/n': str(port.serial_number),
-            'numb': get_serial_port_number(port.device),
-        }
+    if '--chunk' in kwargs:
+        min_chunk = get_number(kwargs['--chunk'], int, None, lower_limit=1)
+        if min_chunk == None:
+            return f"CHUNK SIZE {kwargs['--chunk']} INVALID"
+        session.min_chunk = min_chunk
 
-    sorted_ports = {}
-    for name in sorted(ports, key=lambda x: ports[x]['numb']):
-        sorted_ports[name] = ports[name]
+    if '--rate' in kwargs:
+        emit_rate = get_number(kwargs['--rate'], float, None, lower_limit=0)
+        if emit_rate == None:
+            return f"EMIT RATE {kwargs['--rate']} INVALID"
+        session.emit_rate = emit_rate
 
-    return sorted_ports
+    if '--batch' in kwargs:
+        batch_bytes = get_number(kwargs['--batch'], int, None, lower_limit=0)
+        if batch_bytes == None:
+            return f"BATCH SIZE {kwargs['--batch']} INVALID"
+        session.batch_bytes = batch_bytes
 
+    if '--backend' in kwargs:
+        if kwargs['--backend'] not in backends:
+            return f"BACKEND {kwargs['--backend']} INVALID"
+        if kwargs['--backend'] == BACKEND_ASYNC and not ASYNC_SUPPORTED:
+            return f"ASYNC BACKEND NOT SUPPORTED ON {USER_OS}"
+        session.backend = kwargs['--backend']
 
-class RescanWorker(QObject):
-    new_ports = pyqtSignal(dict)
-    active = True
+    if '--enc' in kwargs or '--errors' in kwargs:
+        codec = kwargs.get('--enc') or session.decoder.codec
+        errors = kwargs.get('--errors')
+        try:
+            session.decoder.set_codec(codec.lower(), errors)
+        except ValueError as E:
+            return str(E).upper()
 
-    def __init__(self, update_interval=1) -> None:
-        super().__init__()
-        self.active = True
-        self.update_interval = update_interval
+    if '--buffer' in kwargs:
+        driver_buffer = get_number(kwargs['--buffer'], int, None, lower_limit=0)
+        if driver_buffer == None:
+            return f"BUFFER SIZE {kwargs['--buffer']} INVALID"
+        session.driver_buffer = driver_buffer
 
-    def run(self):
-        while self.active:
-            try:
-                self.new_ports.emit(get_ports())
-                time.sleep(self.update_interval)
-            except Exception as E:
-                eprint(f"ERR: {traceback.format_exc()}\n", color='red')
+    if '--drop' in kwargs:
+        if kwargs['--drop'] not in drop_policies:
+            return f"DROP POLICY {kwargs['--drop']} INVALID"
+        session.drop_policy = kwargs['--drop']
+    return None
 
-    def stop(self):
-        self.active = False
+
+port_catalog = PortCatalog()
+
+
+def get_ports() -> dict:
+    '''Get the Serial Ports Availiable. Port details come from port_catalog, which only re-reads changed ports'''
+    ports = port_catalog.refresh()
+    sorted_ports = {}
+    for name in sorted(ports, key=port_sort_key):
+        sorted_ports[name] = ports[name]
+    sorted_ports.update(virtual_ports)
+
+    return sorted_ports
 
 
 if __name__ == "__main__":
@@ -66,6 +66,7 @@ Options:
   -x <size>       set the window X size (pixels) default: 600
   -y <size>       set the window Y size (pixels) default: 700
   -c <command>    open serial killer with a command <command>
+  --headless ...  log ports without the GUI. See 'py serial_killer.py --headless -h'
   '''
     print(help_str)
     quit()
@@ -98,6 +99,9 @@ def execute():
         elif arg == '-v' or arg == '--verbose':
             import sk_tools
             sk_tools.DEBUG_LEVEL = 2
+        elif arg == '--headless':  # Never imports Qt
+            from sk_headless import run_headless
+            sys.exit(run_headless(input_args))
         else:
             print(f"-----\nWARNING: ARGUMENT {arg} NOT RECOGNIZED\n------")
             show_help()
@@ -108,7 +112,7 @@ def run_app(size_x = 600, size_y = 700, open_cmd = ""):
     try:
         from PyQt5 import QtWidgets
         from termcolor import cprint
-        import sk_main_window
+        import sk_session_tabs
         from PyQt5.QtGui import QIcon
         from sk_tools import GITHUB_URL
     except Exception as E:
@@ -118,7 +122,7 @@ def run_app(size_x = 600, size_y = 700, open_cmd = ""):
     cprint(GREETINGS_TEXT, color='cyan')
     global app
     app = QtWidgets.QApplication(sys.argv)
-    main = sk_main_window.MainWindow(open_cmd=open_cmd)
+    main = sk_session_tabs.SessionTabs(open_cmd=open_cmd)
     main.setWindowIcon(QIcon("img/SK_Icon.png"))
     main.resize(size_x, size_y)
     main.show()
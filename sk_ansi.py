@@ -0,0 +1,173 @@
+'''
+ANSI/VT100 escape sequences in received text: colors and the line erases devices use for progress.
+
+AnsiParser.feed() splits a chunk into runs of text in one style, and the few operations a
+scrolling, line-based terminal can honor. Text between escapes is passed on in whole slices: a
+chunk with no escape is a single run, with no work per character. Sequences split across chunks
+are held until the rest arrives.
+
+Supported:
+    SGR (ESC[...m): bold, italic, underline, inverse, the 16 colors, 256 colors and 24-bit colors, fg and bg
+    Erase in line (ESC[K after a \\r, ESC[1K, ESC[2K) and column 1 (ESC[G): the current line is erased
+    Erase display (ESC[2J, ESC[3J) and reset (ESC c): a new line is started, the screen's text stays in the scrollback
+The rest (cursor movement, modes, OSC titles, ...) is removed from the text.
+
+A style is (fg, bg, attributes): fg and bg are rgba ints (0 = the terminal's color), attributes
+are BOLD | ITALIC | UNDERLINE | INVERSE bits. No Qt here, so the style can be stored with the text.
+'''
+
+import re
+
+BOLD = 1
+ITALIC = 2
+UNDERLINE = 4
+INVERSE = 8
+PLAIN = (0, 0, 0)
+
+ERASE_LINE = "erase line"
+NEW_LINE = "new line"
+
+MAX_HELD = 256  # Longest unfinished sequence held for the next chunk. Past it, it is shown as text
+
+ESCAPE = re.compile(
+    r'\x1b(?:'
+    r'\[([0-?]*)[ -/]*([@-~])'         # CSI: parameters, intermediates, final
+    r'|\][^\x07\x1b]*(?:\x07|\x1b\\)'  # OSC, up to BEL or ST
+    r'|[ -/]*([0-Z\\^-~])'             # Two character escapes (ESC c, ESC 7, ESC ( B, ...)
+    r')')
+UNFINISHED = re.compile(r'\x1b(?:\[[0-?]*[ -/]*|\][^\x07]*|[ -/]*)\Z')
+
+
+def rgba(red: int, green: int, blue: int) -> int:
+    return 0xFF000000 | red << 16 | green << 8 | blue
+
+
+ANSI_COLORS = [rgba(*color) for color in (
+    (0, 0, 0), (205, 49, 49), (13, 188, 121), (229, 229, 16), (36, 114, 200), (188, 63, 188), (17, 168, 205), (229, 229, 229),
+    (102, 102, 102), (241, 76, 76), (35, 209, 139), (245, 245, 67), (59, 142, 234), (214, 112, 214), (41, 184, 219), (255, 255, 255))]
+CUBE = (0, 95, 135, 175, 215, 255)
+PALETTE_256 = ANSI_COLORS + [rgba(CUBE[n // 36], CUBE[n // 6 % 6], CUBE[n % 6]) for n in range(216)] + \
+    [rgba(8 + 10 * n, 8 + 10 * n, 8 + 10 * n) for n in range(24)]
+
+# SGR code: (attributes set, attributes cleared)
+SGR_ATTRIBUTES = {
+    1: (BOLD, 0), 3: (ITALIC, 0), 4: (UNDERLINE, 0), 7: (INVERSE, 0),
+    21: (0, BOLD), 22: (0, BOLD), 23: (0, ITALIC), 24: (0, UNDERLINE), 27: (0, INVERSE),
+}
+# SGR code: (0 = fg / 1 = bg, color). 0 is the terminal's color
+SGR_COLORS = {39: (0, 0), 49: (1, 0)}
+SGR_COLORS.update({30 + n: (0, ANSI_COLORS[n]) for n in range(8)})
+SGR_COLORS.update({40 + n: (1, ANSI_COLORS[n]) for n in range(8)})
+SGR_COLORS.update({90 + n: (0, ANSI_COLORS[8 + n]) for n in range(8)})
+SGR_COLORS.update({100 + n: (1, ANSI_COLORS[8 + n]) for n in range(8)})
+
+
+def select_graphic(style: tuple, parameters: str) -> tuple:
+    '''The style after SGR ESC[<parameters>m'''
+    colors = [style[0], style[1]]
+    attributes = style[2]
+    codes = [int(code) if code.isdigit() else 0 for code in parameters.replace(':', ';').split(';')]
+    index = 0
+    while index < len(codes):
+        code = codes[index]
+        index += 1
+        if code == 0:
+            colors, attributes = [0, 0], 0
+        elif code in SGR_COLORS:
+            layer, color = SGR_COLORS[code]
+            colors[layer] = color
+        elif code in SGR_ATTRIBUTES:
+            on, off = SGR_ATTRIBUTES[code]
+            attributes = (attributes | on) & ~off
+        elif code in (38, 48) and index < len(codes):  # 38;5;n or 38;2;r;g;b
+            layer = code == 48
+            if codes[index] == 5 and index + 1 < len(codes):
+                colors[layer] = PALETTE_256[codes[index + 1] & 0xFF]
+                index += 2
+            elif codes[index] == 2 and index + 3 < len(codes):
+                colors[layer] = rgba(*(value & 0xFF for value in codes[index + 1:index + 4]))
+                index += 4
+            else:
+                index = len(codes)
+    return colors[0], colors[1], attributes
+
+
+class AnsiParser:
+    '''Keeps the style and any unfinished sequence between chunks. One per stream'''
+
+    def __init__(self) -> None:
+        self.style = PLAIN
+        self.held = ""
+        self.at_column_1 = False  # A \r (or ESC[G) was taken off the text: put back, unless an erase uses it
+
+    def reset(self):
+        self.__init__()
+
+    def feed(self, text: str) -> list:
+        '''(style, text) runs and ERASE_LINE / NEW_LINE operations, in order'''
+        if self.held:
+            text, self.held = self.held + text, ""
+        if '\x1b' not in text:
+            items = []
+            self.add_text(items, text)
+            return items
+
+        items = []
+        position = 0
+        for match in ESCAPE.finditer(text):
+            self.add_text(items, text[position:match.start()])
+            position = match.end()
+            parameters, final, short = match.groups()
+            if final:
+                handler = CSI_HANDLERS.get(final)
+                if handler and parameters[:1] not in ('?', '<', '=', '>'):
+                    handler(self, items, parameters)
+            elif short == 'c':  # Full reset
+                self.style = PLAIN
+                self.at_column_1 = False
+                items.append(NEW_LINE)
+
+        tail = text[position:]
+        escape = tail.rfind('\x1b')
+        if escape >= 0 and len(tail) - escape < MAX_HELD and UNFINISHED.match(tail, escape):
+            tail, self.held = tail[:escape], tail[escape:]
+        self.add_text(items, tail)
+        return items
+
+    def add_text(self, items: list, text: str):
+        if not text:
+            return
+        if '\x1b' in text:  # Not a sequence this parser knows: dropped, not shown as a stray ESC
+            text = text.replace('\x1b', '')
+        if self.at_column_1:
+            text = '\r' + text
+        self.at_column_1 = text.endswith('\r')
+        if self.at_column_1:
+            text = text[:-1]
+        if text:
+            items.append((self.style, text))
+
+    def graphic(self, items: list, parameters: str):
+        self.style = select_graphic(self.style, parameters)
+
+    def erase_in_line(self, items: list, parameters: str):
+        if parameters in ('1', '2') or self.at_column_1:
+            items.append(ERASE_LINE)
+            self.at_column_1 = False  # The line is empty: what follows is written on it
+
+    def column(self, items: list, parameters: str):
+        if parameters in ('', '0', '1'):
+            self.at_column_1 = True
+
+    def erase_in_display(self, items: list, parameters: str):
+        if parameters in ('2', '3'):
+            items.append(NEW_LINE)
+            self.at_column_1 = False
+
+
+CSI_HANDLERS = {
+    'm': AnsiParser.graphic,
+    'K': AnsiParser.erase_in_line,
+    'G': AnsiParser.column,
+    'J': AnsiParser.erase_in_display,
+}
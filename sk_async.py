@@ -0,0 +1,246 @@
+'''
+Optional asyncio backend for serial sessions. Select it with 'con --backend async'.
+
+Instead of a thread per port and per script, every port using this backend is a
+non-blocking file descriptor watched by one event loop on one thread. Reads, writes
+and scripts all run on that loop, and everything bound for the GUI goes through one
+SignalPump. The workers here keep the SerialWorker, TxQueue and ScriptWorker interfaces.
+'''
+
+import asyncio
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+import serial
+from PyQt5.QtCore import QCoreApplication, QObject, pyqtSignal, pyqtSlot
+
+from serial_handler import DEFAULT_BATCH_BYTES, DEFAULT_EMIT_RATE, DEFAULT_TX_QUEUE_DEPTH, TxQueue
+from sk_scripting import ScriptWorker
+from sk_tools import *
+
+
+class SignalPump(QObject):
+    '''The one bridge from the event loop thread to the GUI thread. Lives on the GUI thread'''
+    deliver = pyqtSignal(object, object)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.deliver.connect(self.call)
+
+    @pyqtSlot(object, object)  # A real slot, so it moves with the pump
+    def call(self, func, arg):
+        func(arg)
+
+    def post(self, func, arg=None):
+        '''Call func(arg) on the GUI thread'''
+        self.deliver.emit(func, arg)
+
+
+class AsyncLoop:
+    '''The event loop thread shared by every async session'''
+    _instance = None
+
+    @classmethod
+    def get(cls) -> 'AsyncLoop':
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.pump = SignalPump()
+        app = QCoreApplication.instance()
+        if app is not None:
+            self.pump.moveToThread(app.thread())  # The first session may be opened from the reconnect thread
+        self.thread = threading.Thread(target=self.loop.run_forever, name="AsyncLoop", daemon=True)
+        self.thread.start()
+
+    def call_soon(self, func, *args):
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def call_wait(self, func, *args, timeout: float = 1):
+        '''Run func on the loop thread and wait for its result'''
+        if threading.current_thread() is self.thread:
+            return func(*args)
+        done = Future()
+
+        def call():
+            try:
+                done.set_result(func(*args))
+            except Exception as E:
+                done.set_exception(E)
+        self.loop.call_soon_threadsafe(call)
+        return done.result(timeout)
+
+    def run(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+class AsyncSerialWorker(QObject):
+    '''SerialWorker interface. The loop calls readable() whenever the port has data, so no thread spins or blocks'''
+    out = pyqtSignal(int)  # Bytes written to session.ring since the last emit
+    disconnected = pyqtSignal(bool)
+
+    def __init__(self, session, emit_rate: float = DEFAULT_EMIT_RATE, batch_bytes: int = DEFAULT_BATCH_BYTES):
+        super().__init__()
+        self.session = session
+        self.active = False
+        self.emit_interval = 1 / emit_rate if emit_rate else 0
+        self.batch_bytes = batch_bytes
+        self.pending = 0
+        self.flush_handle: asyncio.TimerHandle = None
+        self.fd: int = None
+        self.async_loop = AsyncLoop.get()
+
+    def run(self):
+        self.active = True
+        self.fd = self.session.ser.fd
+        self.async_loop.call_wait(self.async_loop.loop.add_reader, self.fd, self.readable)
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        self.async_loop.call_wait(self.detach)
+
+    def detach(self):
+        self.async_loop.loop.remove_reader(self.fd)
+        self.flush()
+
+    def readable(self):
+        try:
+            data = self.session.read_available()
+        except Exception as E:
+            eprint("Serial Worker Error", E)
+            eprint(f"ERR: {traceback.format_exc()}\n", color='red')
+            self.active = False
+            self.detach()
+            self.async_loop.pump.post(self.disconnected.emit, False)
+            return
+        self.session.check_line_errors()
+        if not data:
+            return
+        self.session.ring.write(data, time.monotonic(), time.time())
+        self.pending += len(data)
+        if self.pending >= self.batch_bytes or not self.emit_interval:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = self.async_loop.loop.call_later(self.emit_interval, self.flush)
+
+    def flush(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.pending:
+            self.session.rx_batches += 1
+            self.async_loop.pump.post(self.out.emit, self.pending)
+            self.pending = 0
+
+
+class AsyncTxQueue(TxQueue):
+    '''TxQueue interface. Sends are written by a task on the shared loop, waiting on the port only when the driver is full'''
+
+    def __init__(self, ser: serial.Serial, max_depth: int = DEFAULT_TX_QUEUE_DEPTH) -> None:
+        super().__init__(ser, max_depth)
+        self.async_loop = AsyncLoop.get()
+        self.task: asyncio.Task = None
+        self.ready: asyncio.Event = None
+
+    def start(self):
+        self.active = True
+        self.async_loop.call_wait(self.start_task)
+
+    def start_task(self):
+        self.ready = asyncio.Event()
+        self.task = self.async_loop.loop.create_task(self.run_async())
+
+    def stop(self):
+        self.active = False
+        if self.task:
+            self.async_loop.call_wait(self.task.cancel)
+        self.task = None
+
+    def send(self, data: bytes, callback=None) -> Future:
+        future = super().send(data, callback)
+        if not future.done():
+            self.async_loop.call_soon(self.ready.set)
+        return future
+
+    async def run_async(self):
+        fd = self.ser.fd
+        try:
+            while self.active:
+                try:
+                    data, future, queued_at = self.queue.get_nowait()
+                except queue.Empty:
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                await self.write_async(fd, data, future, queued_at)
+        finally:
+            self.fail_pending()
+
+    async def write_async(self, fd: int, data: bytes, future: Future, queued_at: float):
+        view = memoryview(data)
+        written = 0
+        try:
+            while written < len(data):
+                try:
+                    written += os.write(fd, view[written:])
+                except BlockingIOError:
+                    pass
+                if written < len(data):
+                    await self.writable(fd)
+        except asyncio.CancelledError:
+            future.set_exception(serial.PortNotOpenError())
+            raise
+        except Exception as E:
+            future.set_exception(E)
+            return
+        finally:
+            with self.lock:
+                self.bytes_in_flight -= len(data)
+        self.record(written, queued_at)
+        future.set_result(written)
+
+    async def writable(self, fd: int):
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_writer(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_writer(fd)
+
+
+class AsyncScriptWorker(ScriptWorker):
+    '''ScriptWorker interface. The script runs as a coroutine on the shared loop instead of a thread'''
+
+    def __init__(self, text: str, delay: int = DEFAULT_SCRIPT_DELAY, arg_str: str = "") -> None:
+        super().__init__(text, delay, arg_str)
+        self.async_loop = AsyncLoop.get()
+        self.task: Future = None
+
+    def emit_line(self, text: str, type: int):
+        self.async_loop.pump.post(self.line.emit, [text, type])
+
+    def emit_finished(self):
+        self.async_loop.pump.post(self.finished.emit, True)
+
+    def run(self):
+        self.active = True
+        self.task = self.async_loop.run(self.run_async())
+
+    async def run_async(self):
+        for wait in self.steps():
+            await asyncio.sleep(wait)
+        self.emit_finished()
+
+    def stop(self):
+        super().stop()
+        if self.task:
+            self.task.cancel()
@@ -0,0 +1,121 @@
+'''
+Automatic baud rate detection ('con -b auto').
+
+Each candidate rate is sampled for a short window and the traffic scored: at the right rate
+text is printable and arrives in lines, at a wrong one it is full of garbage, NULs and (where
+the driver counts them) framing errors. A port can only run at one rate at a time, so its
+rates are tried in turn within a fixed time budget. Several ports are probed in parallel.
+'''
+
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import serial
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+AUTOBAUD_RATES = [115200, 9600, 57600, 38400, 19200, 230400, 460800, 921600, 4800, 2400, 1200]  # Most likely first
+DEFAULT_AUTOBAUD_BUDGET = 2.0  # Seconds per port
+MIN_WINDOW = .05       # Seconds sampled per rate, at least
+SAMPLE_BYTES = 4096    # A window ends early once this much has arrived
+MIN_SAMPLE_BYTES = 8   # Less than this is too little to judge
+MIN_SCORE = .7         # The best rate must score at least this to be chosen. Random bytes score about .4
+CONFIDENT_SCORE = .98  # Stop probing a port at a rate this good
+
+TEXT_BYTES = bytes(range(0x20, 0x7F)) + b'\t\r\n'
+TIOCGICOUNT = 0x545D  # Linux: struct serial_icounter_struct
+ICOUNT = struct.Struct("20i")  # cts, dsr, rng, dcd, rx, tx, frame, overrun, parity, brk, buf_overrun, reserved[9]
+
+
+def line_error_counts(ser: serial.Serial) -> dict:
+    '''Error counters kept by the serial driver (Linux only). None if the driver does not keep them (i.e. ptys, USB CDC)'''
+    if fcntl is None:
+        return None
+    try:
+        counts = ICOUNT.unpack(fcntl.ioctl(ser.fd, TIOCGICOUNT, bytes(ICOUNT.size)))
+    except (OSError, AttributeError, TypeError):
+        return None
+    return {'frame': counts[6], 'overrun': counts[7], 'parity': counts[8], 'break': counts[9], 'buf_overrun': counts[10]}
+
+
+def score_sample(data: bytes, frame_errors: int = 0) -> float:
+    '''0 (garbage or too little) to about 1.1 (clean text in lines)'''
+    n = len(data)
+    if n < MIN_SAMPLE_BYTES:
+        return 0.0
+    text_ratio = 1 - len(data.translate(None, TEXT_BYTES)) / n
+    junk_ratio = (data.count(0) + data.count(0xFF)) / n  # Framing errors and breaks often read as 00 or FF
+    lines = data.count(b'\n')
+    structure = .1 if lines > 1 and n / lines <= 256 else 0.0
+    return max(0.0, text_ratio + structure - junk_ratio - 2 * frame_errors / n)
+
+
+def probe_port(port: str, rates: list = AUTOBAUD_RATES, budget: float = DEFAULT_AUTOBAUD_BUDGET, parity: str = serial.PARITY_NONE) -> dict:
+    '''Sample port at each rate. Returns {'baud': best rate or None, 'score': its score, 'scores': {rate: score}, 'error': str}'''
+    result = {'port': port, 'baud': None, 'score': 0.0, 'scores': {}, 'error': None}
+    window = max(MIN_WINDOW, budget / len(rates))
+    deadline = time.perf_counter() + budget
+    try:
+        ser = serial.Serial(port, rates[0], parity=parity, timeout=window)
+    except Exception as E:
+        result['error'] = str(E)
+        return result
+    try:
+        for rate in rates:
+            if time.perf_counter() >= deadline:
+                break
+            ser.baudrate = rate
+            ser.reset_input_buffer()
+            errors_before = line_error_counts(ser)
+            ser.timeout = min(window, max(0, deadline - time.perf_counter()))
+            data = ser.read(SAMPLE_BYTES)
+            errors_after = line_error_counts(ser)
+            frame_errors = 0
+            if errors_before and errors_after:
+                frame_errors = errors_after['frame'] - errors_before['frame'] + errors_after['parity'] - errors_before['parity']
+            score = score_sample(data, frame_errors)
+            result['scores'][rate] = round(score, 3)
+            if score > result['score']:
+                result['score'] = score
+                result['baud'] = rate
+            if score >= CONFIDENT_SCORE:
+                break
+    except Exception as E:
+        result['error'] = str(E)
+    finally:
+        ser.close()
+    if result['score'] < MIN_SCORE:
+        result['baud'] = None
+    result['score'] = round(result['score'], 3)
+    return result
+
+
+def autobaud(ports: list, rates: list = AUTOBAUD_RATES, budget: float = DEFAULT_AUTOBAUD_BUDGET, parity: str = serial.PARITY_NONE) -> Future:
+    '''Probe every port at once. The future resolves to a list of probe_port() results, in the order of ports (empty if there are none)'''
+    done = Future()
+    if not ports:
+        done.set_result([])
+        return done
+    results = [None] * len(ports)
+    remaining = [len(ports)]
+    lock = threading.Lock()
+
+    def finished(index: int, probe: Future):
+        results[index] = probe.result()
+        with lock:
+            remaining[0] -= 1
+            last = not remaining[0]
+        if last:
+            done.set_result(results)
+
+    executor = ThreadPoolExecutor(max_workers=len(ports), thread_name_prefix="Autobaud")
+    for index, port in enumerate(ports):
+        probe = executor.submit(probe_port, port, rates, budget, parity)
+        probe.add_done_callback(lambda probe, index=index: finished(index, probe))
+    executor.shutdown(wait=False)
+    return done
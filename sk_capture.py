@@ -0,0 +1,190 @@
+'''
+Session capture and replay.
+
+A capture file holds the raw traffic of a session as timestamped chunks, exactly as the reader
+got them (RX) or they were queued to send (TX, recorded once sent):
+
+    MAGIC | header length (uint32 LE) | header (JSON: port, baud, start wall time)
+    then per chunk: kind (b'R' or b'T') | seconds since the start (float64 LE) | length (uint32 LE) | data
+
+ReplayWorker plays a capture back into a session's ring in place of a SerialWorker, at real
+time, N times faster or as fast as the consumers keep up. Replayed chunks keep their recorded
+timestamps, so the log, plot and terminal times are the same on every run.
+'''
+
+import json
+import struct
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from serial_handler import DEFAULT_BATCH_BYTES, DEFAULT_EMIT_RATE
+from sk_tools import *
+
+CAPTURE_MAGIC = b"SKCAP\x01\n"
+CAPTURE_EXTENSION = ".skcap"
+HEADER_LENGTH = struct.Struct("<I")
+CHUNK = struct.Struct("<cdI")  # Kind, seconds since the start, length
+KIND_RX = b'R'
+KIND_TX = b'T'
+
+REPLAY_MAX_SPEED = 0  # As fast as the consumers keep up
+REPLAY_MAX_BEHIND = .5  # Fraction of the ring the slowest consumer may fall behind before replay waits for it
+
+
+class CaptureWriter:
+    '''Appends chunks to a capture file. Not thread safe: write from one thread'''
+
+    def __init__(self, file_path: str, port: str = None, baud: int = None) -> None:
+        self.file_path = file_path
+        self.start_mono = time.monotonic()
+        self.start_wall = time.time()
+        self.chunks = 0
+        self.bytes = 0
+        self.file = open(file_path, 'wb')
+        header = json.dumps({'port': port, 'baud': baud, 'start_wall': self.start_wall}).encode()
+        self.file.write(CAPTURE_MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+
+    def write(self, kind: bytes, data, mono: float = None):
+        '''A chunk seen at mono (time.monotonic()), default now'''
+        if not data or self.file is None:
+            return
+        if mono is None:
+            mono = time.monotonic()
+        self.file.write(CHUNK.pack(kind, mono - self.start_mono, len(data)))
+        self.file.write(data)
+        self.chunks += 1
+        self.bytes += len(data)
+
+    def write_tx(self, data, mono: float = None):
+        self.write(KIND_TX, data, mono)
+
+    def write_rx(self, data, stamps: list):
+        '''A slice drained from the ring with its stamps (see RxRingBuffer.stamps). One chunk per read'''
+        ends = [offset for offset, mono, wall in stamps[1:]] + [len(data)]
+        for (offset, mono, wall), end in zip(stamps, ends):
+            self.write(KIND_RX, data[offset:end], mono)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+        self.file = None
+
+
+def read_capture_header(file) -> dict:
+    '''Reads past the header of an open capture file. Raises ValueError if it is not a capture'''
+    if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+        raise ValueError(f"{file.name} is not a capture file")
+    length, = HEADER_LENGTH.unpack(file.read(HEADER_LENGTH.size))
+    return json.loads(file.read(length))
+
+
+def read_capture(file_path: str):
+    '''The header, then (kind, seconds since the start, data) for each chunk. A truncated last chunk is dropped'''
+    with open(file_path, 'rb') as file:
+        yield read_capture_header(file)
+        while True:
+            head = file.read(CHUNK.size)
+            if len(head) < CHUNK.size:
+                return
+            kind, t, length = CHUNK.unpack(head)
+            data = file.read(length)
+            if len(data) < length:
+                return
+            yield kind, t, data
+
+
+class ReplayWorker(QObject):
+    '''SerialWorker interface, fed from a capture file instead of a port'''
+    out = pyqtSignal(int)  # Bytes written to the ring since the last emit
+    tx = pyqtSignal(bytes)  # A recorded send. Shown, never sent
+    finished = pyqtSignal(bool)  # True if the whole capture was played
+
+    def __init__(self, session, file_path: str, speed: float = 1, emit_rate: float = DEFAULT_EMIT_RATE,
+                 batch_bytes: int = DEFAULT_BATCH_BYTES) -> None:
+        super().__init__()
+        self.session = session
+        self.file_path = file_path
+        self.speed = speed
+        self.active = True
+        self.wake = threading.Event()
+        self.emit_interval = 1 / emit_rate if emit_rate else 0
+        self.batch_bytes = batch_bytes
+        self.pending = 0
+        self.last_emit = 0
+        self.header: dict = {}
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+        self.recorded_time = 0.0  # Seconds the capture covers
+        self.elapsed = 0.0        # Seconds the replay took
+        self.error: str = None
+
+    def emit_pending(self):
+        if self.pending:
+            self.session.rx_batches += 1
+            self.out.emit(self.pending)
+        self.pending = 0
+        self.last_emit = time.perf_counter()
+
+    def run(self):
+        ring = self.session.ring
+        start = time.monotonic()
+        complete = False
+        try:
+            chunks = read_capture(self.file_path)
+            self.header = next(chunks)
+            start_wall = self.header.get('start_wall') or time.time()
+            for kind, t, data in chunks:
+                if self.speed:
+                    self.wait(start + t / self.speed)
+                self.wait_for_consumers(ring.size * REPLAY_MAX_BEHIND)
+                if not self.active:
+                    break
+                self.recorded_time = t
+                if kind == KIND_TX:
+                    self.wait_for_consumers(0)  # Everything received before it is shown first
+                    self.tx.emit(data)
+                    self.tx_bytes += len(data)
+                    continue
+                ring.write(data, start + t, start_wall + t)  # The recorded spacing, at any speed
+                self.rx_bytes += len(data)
+                self.session.rx_reads += 1  # So 'stats' shows the replay like a live port
+                self.session.rx_bytes += len(data)
+                self.session.rx_lines += data.count(b'\n')
+                self.pending += len(data)
+                if self.pending >= self.batch_bytes or time.perf_counter() - self.last_emit >= self.emit_interval:
+                    self.emit_pending()
+            else:
+                complete = True
+        except (OSError, ValueError, StopIteration, struct.error) as E:
+            eprint("Replay Error", E)
+            self.error = str(E) or "not a capture file"
+        self.emit_pending()
+        self.elapsed = time.monotonic() - start
+        self.active = False
+        self.finished.emit(complete)
+
+    def wait(self, until: float):
+        '''Sleep until the chunk is due, emitting what is pending at the usual rate meanwhile'''
+        while self.active:
+            now = time.monotonic()
+            if now >= until:
+                return
+            if self.pending and time.perf_counter() - self.last_emit >= self.emit_interval:
+                self.emit_pending()
+            self.wake.wait(min(until - now, self.emit_interval or .01))
+
+    def wait_for_consumers(self, max_behind: int):
+        '''Wait until the slowest cursor is at most max_behind bytes behind. At full speed the replay runs as fast as the GUI drains it'''
+        ring = self.session.ring
+        while self.active and ring.cursors:
+            behind = ring.head - min(cursor.position for cursor in list(ring.cursors.values()))
+            if behind <= max_behind:
+                return
+            self.emit_pending()
+            self.wake.wait(.005)
+
+    def stop(self):
+        self.active = False
+        self.wake.set()
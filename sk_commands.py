@@ -4,6 +4,8 @@ import traceback
 
 from sk_tools import *
 
+CONNECT_OPTIONS = ['-b', '-d', '-x', '-r', '-p', '-h', '--rx', '--timeout', '--chunk', '--enc', '--errors', '--rate', '--batch', '--backend', '--budget', '--buffer', '--drop']  # 'con', in the GUI and headless
+
 
 class Command:
     def __init__(self, name: str, func, numb_args = 0, kw_options = []) -> None:
@@ -0,0 +1,52 @@
+'''
+Incremental decoding of serial data.
+
+A multibyte character can be split across two reads, so each chunk is fed through
+one incremental decoder that holds any trailing partial sequence until the next chunk.
+'''
+
+import codecs
+
+RX_CODECS = {  # name: (python codec, default error policy)
+    "utf-8": ("utf-8", "replace"),
+    "latin-1": ("latin-1", "strict"),           # Every byte maps to a code point. Never fails
+    "ascii": ("ascii", "backslashreplace"),      # Non-ascii bytes are shown as \xNN escapes
+}
+RX_ERROR_POLICIES = ["replace", "ignore", "backslashreplace"]
+DEFAULT_RX_CODEC = "utf-8"
+
+
+class RxDecoder:
+    def __init__(self, codec: str = DEFAULT_RX_CODEC, errors: str = None) -> None:
+        self.codec: str = None
+        self.errors: str = None
+        self._decoder: codecs.IncrementalDecoder = None
+        self.set_codec(codec, errors)
+
+    def set_codec(self, codec: str = DEFAULT_RX_CODEC, errors: str = None):
+        '''Raises ValueError if codec or errors is not supported'''
+        if codec not in RX_CODECS:
+            raise ValueError(f"codec '{codec}' not supported")
+        py_codec, default_errors = RX_CODECS[codec]
+        if errors == None:
+            errors = default_errors
+        elif errors not in RX_ERROR_POLICIES:
+            raise ValueError(f"error policy '{errors}' not supported")
+        self.codec = codec
+        self.errors = errors
+        self._decoder = codecs.getincrementaldecoder(py_codec)(errors)
+
+    @property
+    def encoding(self) -> str:
+        return RX_CODECS[self.codec][0]
+
+    def decode(self, data, final: bool = False) -> str:
+        '''Decode a bytes-like chunk. A partial sequence at the end is held until the next call'''
+        return self._decoder.decode(data, final)
+
+    def flush(self) -> str:
+        '''Decode whatever partial sequence is being held (i.e. when the port closes)'''
+        return self._decoder.decode(b"", True)
+
+    def reset(self):
+        self._decoder.reset()
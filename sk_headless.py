@@ -0,0 +1,340 @@
+'''
+Headless capture: connect to one or more ports and log them, without Qt or a display.
+
+Each port gets a SerialSession whose SerialReader runs on a plain thread. One drain thread
+empties every port's ring into its SK_Logger, so received data takes the same path to the
+log as in the GUI, minus the terminal and plot. A script may run alongside: its lines are
+sent to every port.
+
+Ports are given as 'con' commands, with the same options:
+    python serial_killer.py --headless "con /dev/ttyUSB0 -b 9600" "con /dev/ttyUSB1,/dev/ttyUSB2 -b auto"
+'''
+
+import os
+import sys
+import threading
+import time
+
+from serial_handler import *
+from sk_autobaud import DEFAULT_AUTOBAUD_BUDGET, autobaud
+from sk_commands import CONNECT_OPTIONS, Command
+from sk_logging import DEFAULT_LOG_FORMAT, DEFAULT_TIME_FORMAT, SK_Logger
+from sk_script_runner import ScriptRunner
+from sk_stats import STATS_INTERVAL, loss_events
+from sk_tools import *
+
+DEFAULT_HEADLESS_LOG_NAME = "log-%y-%m-%d.txt"  # strftime format, as in the GUI
+DEFAULT_HEADLESS_BAUD = 115200
+DRAIN_INTERVAL = .25  # Seconds. Readers wake the drain thread per batch, so this only bounds the wait
+SCRIPT_LINE_END = "\n"  # Appended to each line a script sends, like the GUI's default 'append' setting
+
+
+class HeadlessPort:
+    '''One port: its session, its log cursor and its reconnects'''
+
+    def __init__(self, log: SK_Logger, wake: threading.Event, reconnect: bool = True) -> None:
+        self.session = SerialSession(log)
+        self.log_cursor = self.session.ring.cursor("log")
+        self.echo_cursor = self.session.ring.cursor("echo")
+        self.wake = wake
+        self.reconnect = reconnect
+        self.connected = False
+        self.reported = {}  # Losses already reported (see sk_stats.loss_events)
+
+    @property
+    def name(self) -> str:
+        return self.session.port
+
+    def connect(self, port: str, baud: int, xonxoff: bool, rtscts: bool, dsrdtr: bool, parity: str) -> bool:
+        self.connected = self.session.connect(port, baud, xonxoff, rtscts, dsrdtr, parity)
+        if not self.connected:
+            return False
+        self.session.log.set_port(port)
+        self.session.log.set_encoding(self.session.decoder.encoding, self.session.decoder.errors)
+        self.session.start_reader(self.data_ready, self.lost)
+        return True
+
+    def data_ready(self, count: int):
+        self.wake.set()
+
+    def lost(self):
+        '''Runs on the reader thread'''
+        if not self.reconnect:
+            eprint(f"LOST {self.name}")
+            self.connected = False
+            self.session.disconnect()
+            self.wake.set()
+            return
+        eprint(f"LOST {self.name}. RECONNECTING...")
+        self.session.start_reconnect(self.restored)
+
+    def restored(self, outage: float, bytes_lost: int):
+        '''Runs on the reconnect thread'''
+        self.session.log.set_port(self.name)
+        self.session.start_reader(self.data_ready, self.lost)
+        cprint(f"RECONNECTED TO {self.name} AFTER {outage * 1000:.0f} ms (UP TO {bytes_lost} BYTES LOST)", color='green')
+
+    def disconnect(self):
+        self.connected = False
+        self.session.disconnect()
+
+
+class HeadlessCapture:
+    '''Any number of ports, logged from one drain thread'''
+
+    def __init__(self, log_folder: str = DEFAULT_LOG_FOLDER, log_name: str = DEFAULT_HEADLESS_LOG_NAME,
+                 echo: bool = False, reconnect: bool = True) -> None:
+        self.log_folder = log_folder if log_folder.endswith("/") else log_folder + "/"
+        self.log_name = time.strftime(log_name)
+        self.echo = echo
+        self.reconnect = reconnect
+        self.ports: list = []
+        self.wake = threading.Event()
+        self.active = True
+        self.script: ScriptRunner = None
+        self.script_thread: threading.Thread = None
+        self.errors = []
+        self.command = Command("con", self.connect_command, 1, kw_options=CONNECT_OPTIONS)
+
+    def add(self, command: str) -> bool:
+        '''Connect with a 'con' command (the 'con' itself is optional). False on any error'''
+        if not command.startswith("con"):
+            command = "con " + command
+        self.errors = []
+        result = self.command.execute(command)
+        if isinstance(result, str):  # The command failed to parse, or raised
+            self.errors.append(result)
+        for error in self.errors:
+            eprint(f"ERR: {error}")
+        return not self.errors
+
+    def connect_command(self, *args, **kwargs):
+        if '-h' in kwargs or not args:
+            print(HEADLESS_CONNECT_HELP)
+            self.errors.append("NO PORT GIVEN")
+            return
+        names = args[0].split(',')
+        ports = []
+        port_catalog.refresh()
+        for name in names:
+            port = port_catalog.lookup(name)
+            if port is None and os.path.exists(name):
+                port = name  # i.e. a pty or symlink the catalog does not list
+            if port is None:
+                self.errors.append(f"PORT {name} NOT FOUND")
+                continue
+            if any(existing.name == port for existing in self.ports):
+                self.errors.append(f"{port} IS ALREADY CONNECTED")
+                continue
+            ports.append(port)
+
+        parity = kwargs['-p'].upper() if kwargs.get('-p') else "NONE"
+        if parity not in parity_values:
+            self.errors.append(f"PARITY {parity} INVALID")
+            return
+        if kwargs.get('--backend') == BACKEND_ASYNC:
+            self.errors.append("THE ASYNC BACKEND NEEDS THE GUI. HEADLESS PORTS USE THREADS")
+            return
+
+        bauds = {}
+        baud = kwargs.get('-b') or DEFAULT_HEADLESS_BAUD
+        if baud == "auto":
+            budget = get_number(kwargs.get('--budget') or DEFAULT_AUTOBAUD_BUDGET, float, None, lower_limit=.1)
+            if budget is None:
+                self.errors.append(f"BUDGET {kwargs['--budget']} INVALID")
+                return
+            print(f"AUTOBAUD: PROBING {', '.join(ports)} (UP TO {budget:g} s)")
+            for result in autobaud(ports, budget=budget, parity=parity_values[parity]).result():
+                if result['baud']:
+                    print(f"AUTOBAUD {result['port']}: {result['baud']} BAUD (SCORE {result['score']})")
+                    bauds[result['port']] = result['baud']
+                else:
+                    self.errors.append(f"AUTOBAUD {result['port']}: {result['error'] or 'NO RATE FOUND'}")
+        else:
+            baud = get_number(baud, int, None, lower_limit=1)
+            if baud is None:
+                self.errors.append(f"BAUD RATE {kwargs['-b']} INVALID")
+                return
+            bauds = {port: baud for port in ports}
+
+        for port, baud in bauds.items():
+            log = SK_Logger(self.log_folder, self.log_name, DEFAULT_TIME_FORMAT, DEFAULT_LOG_FORMAT, port)
+            headless_port = HeadlessPort(log, self.wake, self.reconnect)
+            error = configure_session(headless_port.session, kwargs)
+            if error:
+                self.errors.append(error)
+                log.stop()
+                return
+            if not headless_port.connect(port, baud, '-x' in kwargs, '-r' in kwargs, '-d' in kwargs, parity):
+                self.errors.append(f"{port} COULD NOT CONNECT")
+                log.stop()
+                continue
+            self.ports.append(headless_port)
+            cprint(f"CONNECTED TO {port} at {baud} BAUD (RX: {headless_port.session.read_mode}, {headless_port.session.decoder.codec})", color='green')
+
+    def start_script(self, file_path: str, delay: int = DEFAULT_SCRIPT_DELAY):
+        '''Run a script on its own thread. Lines it sends go to every port'''
+        with open(file_path, 'r') as file:
+            text = file.read()
+        self.script = ScriptRunner(text, delay, on_line=self.script_line, on_finished=self.script_finished)
+        self.script_thread = threading.Thread(target=self.script.run, name="Script", daemon=True)
+        self.script_thread.start()
+
+    def script_line(self, text: str, type: int):
+        if type == TYPE_TX:
+            text = replace_escapes(text.replace("$UTS", str(int(time.time())))) + SCRIPT_LINE_END
+            for port in self.ports:
+                if port.connected and port.session.is_open():
+                    port.session.send_string(text)
+        elif type == TYPE_INFO:
+            cprint(text, color='green', end="")
+        elif type == TYPE_ERROR:
+            eprint(text, end="")
+        elif type == TYPE_CMD:
+            eprint(f"SCRIPT COMMAND '{text}' IGNORED (GUI ONLY)")
+
+    def script_finished(self):
+        if self.script and self.script.active:
+            self.script.stop()
+
+    def run(self, duration: float = None):
+        '''Drain every port into its log until duration passes, the script ends (with no duration),
+        every port is gone, or Ctrl+C'''
+        end = time.monotonic() + duration if duration else None
+        last_report = time.monotonic()
+        try:
+            while self.active:
+                self.wake.wait(DRAIN_INTERVAL)
+                self.wake.clear()
+                self.drain()
+                if time.monotonic() - last_report >= STATS_INTERVAL:
+                    last_report = time.monotonic()
+                    self.report_losses()
+                if end and time.monotonic() >= end:
+                    break
+                if not end and self.script_thread and not self.script_thread.is_alive():
+                    break
+                if not any(port.connected for port in self.ports):
+                    eprint("NO PORTS LEFT")
+                    break
+        except KeyboardInterrupt:
+            pass
+        self.close()
+
+    def drain(self):
+        for port in self.ports:
+            port.log_cursor.drain(port.session.log.write, stamped=True)
+            if self.echo:
+                if port.session.drop_policy == DROP_DISPLAY and port.echo_cursor.catch_up(DISPLAY_MAX_BEHIND):
+                    port.session.decoder.reset()
+                port.echo_cursor.drain(lambda data: sys.stdout.write(port.session.decoder.decode(data)))
+                sys.stdout.flush()
+            else:
+                port.echo_cursor.skip()
+
+    def report_losses(self):
+        '''Data lost or likely lost since the last report, to stderr and the log'''
+        for port in self.ports:
+            for event in loss_events(port.session, port.reported):
+                eprint(f"{port.name}: {event}")
+                port.session.log.write(event + "\n")
+
+    def close(self):
+        self.active = False
+        if self.script and self.script.active:
+            self.script.stop()
+        for port in self.ports:
+            port.disconnect()
+        self.drain()
+        self.report_losses()
+        for port in self.ports:
+            port.session.log.stop()
+            cursor = port.log_cursor
+            lost = f", {cursor.overrun_bytes} LOST (LOG FELL BEHIND)" if cursor.overrun_bytes else ""
+            print(f"{port.name}: {port.session.rx_bytes} BYTES RECEIVED, {port.session.tx_bytes} SENT{lost}")
+        print(f"LOGGED TO {self.log_folder + self.log_name}")
+
+
+HEADLESS_CONNECT_HELP = '''\
+Each port is a 'con' command, quoted: "con <PORT[,PORT...]> [OPTIONS]". The 'con' is optional.
+The options are those of 'con' in the GUI (see 'con -h'), except '--backend async'.
+The baud rate defaults to 115200. '-b auto' finds it.'''
+
+
+def run_headless(input_args: list):
+    '''serial_killer.py --headless [OPTIONS] <"con ..."> ["con ..." ...]'''
+    duration = None
+    script = None
+    delay = DEFAULT_SCRIPT_DELAY
+    log_folder = DEFAULT_LOG_FOLDER
+    log_name = DEFAULT_HEADLESS_LOG_NAME
+    echo = False
+    reconnect = True
+    commands = []
+    while input_args:
+        arg = input_args.pop(0)
+        if arg == '-t':
+            duration = get_number(input_args.pop(0), float, None, lower_limit=0)
+        elif arg == '-s' or arg == '--script':
+            script = input_args.pop(0)
+        elif arg == '-d':
+            delay = get_number(input_args.pop(0), int, DEFAULT_SCRIPT_DELAY, lower_limit=0)
+        elif arg == '--log-folder':
+            log_folder = input_args.pop(0)
+        elif arg == '--log-name':
+            log_name = input_args.pop(0)
+        elif arg == '-e' or arg == '--echo':
+            echo = True
+        elif arg == '--no-reconnect':
+            reconnect = False
+        elif arg == '-h' or arg == '--help':
+            show_headless_help()
+            return 0
+        else:
+            commands.append(arg)
+
+    if not commands:
+        show_headless_help()
+        return 1
+    if script and not os.path.isfile(script):
+        script = SCRIPT_FOLDER + script.replace(".txt", "") + ".txt"
+        if not os.path.isfile(script):
+            eprint(f"ERR: SCRIPT {script} NOT FOUND")
+            return 1
+
+    capture = HeadlessCapture(log_folder, log_name, echo, reconnect)
+    for command in commands:
+        capture.add(command)
+    if not capture.ports:
+        eprint("ERR: NO PORTS CONNECTED")
+        return 1
+    if script:
+        capture.start_script(script, delay)
+    capture.run(duration)
+    return 0
+
+
+def show_headless_help():
+    print(f'''\
+Usage:
+    py serial_killer.py --headless [options] <"con PORT [con options]"> ["con PORT2 ..." ...]
+
+Log one or more ports without the GUI (no Qt or display needed). Stops on Ctrl+C.
+
+Options:
+  -h, --help          show this help message
+  -t <sec>            stop after <sec> seconds
+  -s <script>         run a script (a file, or a name in the scripts folder). Its lines are sent to every port.
+                      Without -t, stop when the script ends
+  -d <ms>             delay between script lines                        default: {DEFAULT_SCRIPT_DELAY}
+  --log-folder <dir>  where to log                                      default: {DEFAULT_LOG_FOLDER}
+  --log-name <name>   log file name (strftime format)                   default: {DEFAULT_HEADLESS_LOG_NAME}
+  -e, --echo          print received data to stdout as well
+  --no-reconnect      give up on a port that drops, instead of waiting for it to come back
+
+{HEADLESS_CONNECT_HELP}
+
+Examples:
+    py serial_killer.py --headless "con /dev/ttyUSB0 -b 9600"
+    py serial_killer.py --headless -t 3600 "con COM5,COM6 -b auto" "con COM9 -b 57600 --enc latin-1"
+''')
@@ -91,16 +91,137 @@ OPTIONS:
 [PORT]      The target port name.
             If all ports begin with "COM", only the COM# is required. 
             i.e, 3 = COM3
+            A USB adapter's serial number or /dev/serial/by-id name also works
 -b [BAUD]   connect at baud rate [BAUD]
+            'auto' samples the port at common rates and picks the one
+            whose traffic looks right. [PORT] may be a list: 3,4,5
+            (probed in parallel, each found port opens in its own session)
 -d          enable dsrdtr
 -x          enable flow control (xonxoff)
 -r          enable rtscts 
 -p [PARITY] set parity to [PARITY] 
+--rx [MODE] receive mode: 'poll' (default) or 'block'
+            'block' waits inside read() and wakes as soon as bytes arrive
+--timeout [SEC]  read timeout for 'block' mode (default .1)
+--chunk [N]      bytes a 'block' mode read waits for (default 1)
+--enc [CODEC]    decode received text as 'utf-8' (default), 'latin-1' or 'ascii'
+                 'ascii' shows non-ascii bytes as \\xNN escapes
+--errors [MODE]  undecodable bytes: 'replace', 'ignore' or 'backslashreplace'
+--rate [HZ]      max times a second received data is sent to the terminal (default 60)
+--batch [N]      send early once N bytes are waiting (default 65536)
+                 '--rate 0' or '--batch 0' sends every read as soon as it arrives
+--budget [SEC]   time '-b auto' may spend on each port (default 2)
+--backend [B]    'thread' (default): a reader and writer thread per port
+                 'async': one shared asyncio loop reads, writes and runs scripts
+                 for every async port (Linux/macOS only)
+--buffer [N]     ask the driver to hold up to N bytes while the reader is late
+                 (default 1048576. Windows only: elsewhere the size is fixed)
+--drop [D]       when the GUI can't keep up, 'display' (default): the terminal
+                 and plot skip ahead, the log and recording get every byte
+                 'data': everything is shown, until the slowest falls a whole
+                 buffer behind and loses the oldest bytes
 
 Examples (assuming ports are COM5 and COM10):
 con 10                (connect to COM10)
 con com5 -b 9600 -x   (connect to COM5. Set baud to 9600, enable flow control)
 con 5 -p ODD          (connect to COM5. Set ODD parity)
+con 5 --rx block      (connect to COM5. Use blocking reads)
+con 5,10 -b auto      (find the baud rates of COM5 and COM10, and connect to both)
+'''
+
+VIRTUAL_HELP = '''\
+USEAGE: virtual [OPTIONS]
+Create a virtual serial device (Linux/macOS only).
+It is listed with the other ports, and connects like any real port.
+
+Options:
+    -h              print this help text
+    -p [PATTERN]    traffic the device sends:
+                    'kv' (default)  key-value lines      a:1.234 b:0.567 c:-2.101
+                    'array'         comma separated      1.234,0.567,-2.101
+                    'binary'        frames of: AA 55 | seq (u16) | len (u8) | float32 values | xor
+                    'replay'        the lines of a file (-f), looped. Log prefixes are removed
+                    'none'          nothing. Only echo / respond
+    -r [RATE]       messages per second (default 10). 0 = as fast as the port accepts them
+    -n [N]          values per message (default 3)
+    -f [FILE]       file to replay
+    -e              echo everything received
+    -s [REPLIES]    reply to lines received. i.e. "ping=pong;ver=v1.0"
+    --con           connect to the device once it is created
+    -ls             list virtual ports and their byte counts
+    -rm [PORT]      remove virtual port [PORT]. With no [PORT], remove all
+
+Examples:
+virtual -p kv -r 100 --con      (100 key-value lines a second, and connect)
+virtual -p none -e              (a loopback device)
+virtual -p replay -f logs/example.txt -r 0
+'''
+
+RECORD_HELP = '''\
+USEAGE: record [NAME] [OPTIONS]
+Record everything received and sent, with the time it was read or sent, to [NAME].skcap
+in the log folder. Recordings can be played back with 'replay'.
+
+Options:
+    NONE        record to capture-<date>-<time>.skcap
+    -h          print this help text
+    -s          stop recording
+'''
+
+REPLAY_HELP = '''\
+USEAGE: replay [NAME] [OPTIONS]
+Play a recording (see 'record') back through the terminal, log and plot, instead of a port.
+Received data keeps its recorded times. Recorded sends are shown, never sent.
+
+Options:
+    NONE        choose a recording to play
+    -h          print this help text
+    -x [SPEED]  play [SPEED] times faster than real time (default 1)
+    --max       play as fast as the terminal, log and plot keep up
+    -s          stop playing
+    -ls         list the files in the log folder
+
+Examples:
+replay capture-26-10-18-120000 -x 10
+replay field_issue --max
+'''
+
+STATS_HELP = '''\
+USEAGE: stats
+Show how the session is coping with the data, over the last second:
+    RX/TX       bytes and lines per second, reads per second and the average read size
+    TX QUEUE    sends waiting, bytes not written yet, and the time from send to written (last, average, max)
+    EMIT QUEUE  batches the reader has signalled that the GUI has not handled yet
+    GUI LAG     how late the GUI thread ran a timer (how long it was blocked)
+    LOG BACKLOG bytes received but not in the log file yet
+    PLOT PARSE  time spent parsing lines for the plot, per second
+    DRIVER      most bytes found waiting in the driver, times its buffer was full (Windows), and its error counts
+    LOST        bytes a consumer never saw because it fell a ring behind, the driver dropped (overruns),
+                and estimated lost to reconnects
+    SKIPPED     bytes the terminal and plot skipped to catch up ('con --drop display')
+Losses, full driver buffers and framing errors are also reported in the terminal and log as they happen.
+The status bar shows the main figures, updated every second.
+
+Options:
+    NONE        show the stats
+    -h          print this help text
+'''
+
+VIEW_HELP = '''\
+USEAGE: view [text|hex] [OPTIONS]
+Show received and sent data as text, or as a hex dump of the raw bytes:
+    00000000  48 65 6c 6c 6f 0d 0a 00 ff 10 20 30 41 42 43 44 |Hello..... 0ABCD|
+Each row is one direction (RX white, TX blue). The offset counts the bytes of that direction.
+Switching views loses nothing: the text terminal is always kept up to date, and the hex view dumps
+the last 256 kB it missed while hidden.
+
+Options:
+    NONE        keep the current view
+    -w [n]      bytes per hex row (default 16)
+    -h          print this help text
+
+Example:
+view hex -w 8
 '''
 
 KEY_HELP = '''
@@ -132,7 +253,12 @@ ports [-a]          List availiable ports. '-a' lists more info
 script [OPTS]       Run, open or save a script. '-h' for options
 log [OPTS]          Open, View, Edit logs. '-h' for options
 clear               Clear the terminal
-new                 Open a new window
+new [CMD]           Open a new session tab (optional: run [CMD] in it)
+virtual [OPTS]      Create a virtual test device. '-h' for options
+record [NAME]       Record the session's traffic. '-h' for options
+replay [NAME]       Play a recording back. '-h' for options
+stats               Show throughput, lag and data loss. '-h' for details
+view [text|hex]     Show data as text or as a hex dump. '-h' for options
 quit                Quit immediately
 key [OPTS]          Set key commands. '-h' for options
 help                Show help popup
@@ -0,0 +1,126 @@
+'''
+Hex dump of the raw bytes of a session, one direction (RX or TX) per row:
+
+    00000000  48 65 6c 6c 6f 0d 0a 00 ff 10 20 30 41 42 43 44 |Hello..... 0ABCD|
+
+Rows are formatted with numpy over whole chunks: the offset digits, hex pairs and ASCII column are
+looked up in tables and written into a character array, one array row per dump row, so the work
+per byte is a few array operations, not Python string building.
+
+The offset is the position of the row's first byte in the stream of its direction. A row is shown
+as soon as it has a byte: when more bytes arrive, the partial row is erased and drawn again, fuller.
+'''
+
+from collections import deque
+
+import numpy as np
+
+from sk_tools import *
+
+DEFAULT_HEX_WIDTH = 16  # Bytes per row
+MAX_HEX_WIDTH = 256
+HEX_BACKLOG = 256 * 1024  # Bytes kept while the hex view is hidden, dumped when it is shown
+
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", np.uint8)
+HEX_PAIRS = np.array([[HEX_DIGITS[value >> 4], HEX_DIGITS[value & 15], ord(' ')] for value in range(256)], np.uint8)  # "xx "
+PRINTABLE = np.array([value if 32 <= value < 127 else ord('.') for value in range(256)], np.uint8)
+OFFSET_SHIFTS = np.arange(28, -1, -4, dtype=np.int64)  # 8 hex digits
+OFFSET_WIDTH = len(OFFSET_SHIFTS) + 2
+
+
+def hex_rows(data, offset: int = 0, width: int = DEFAULT_HEX_WIDTH, partial: bool = True) -> str:
+    '''Rows of width bytes, the first at stream offset offset. With partial, a last row that is not full has no line break'''
+    values = np.frombuffer(data, np.uint8)
+    count = len(values)
+    if not count:
+        return ""
+    rows = -(-count // width)
+    hex_start = OFFSET_WIDTH
+    ascii_start = hex_start + 3 * width + 1
+    row_length = ascii_start + width + 2
+
+    grid = np.zeros(rows * width, np.uint8)
+    grid[:count] = values
+    grid = grid.reshape(rows, width)
+    text = np.full((rows, row_length), ord(' '), np.uint8)
+    offsets = offset + np.arange(rows, dtype=np.int64) * width
+    text[:, :OFFSET_WIDTH - 2] = HEX_DIGITS[(offsets[:, None] >> OFFSET_SHIFTS) & 15]
+    text[:, hex_start:ascii_start - 1] = HEX_PAIRS[grid].reshape(rows, 3 * width)
+    text[:, ascii_start - 1] = ord('|')
+    text[:, ascii_start:ascii_start + width] = PRINTABLE[grid]
+    text[:, -2] = ord('|')
+    text[:, -1] = ord('\n')
+    last = count - (rows - 1) * width  # Bytes in the last row
+    if last < width:
+        text[-1, hex_start + 3 * last:ascii_start - 1] = ord(' ')
+        text[-1, ascii_start + last:-2] = ord(' ')
+    dump = text.tobytes().decode('ascii')
+    return dump[:-1] if partial and last < width else dump
+
+
+class HexDump:
+    '''Turns chunks of one direction or the other into rows. feed() returns what to draw'''
+
+    def __init__(self, width: int = DEFAULT_HEX_WIDTH) -> None:
+        self.width = width
+        self.offsets = {}  # Type (TYPE_RX / TYPE_TX): bytes of that direction so far
+        self.type = None  # Direction of the last row
+        self.row = b""  # Bytes of the last row, if not full
+        self.row_offset = 0
+        self.backlog = deque()  # (type, offset, bytes) while hidden
+        self.backlog_bytes = 0
+
+    def set_width(self, width: int):
+        '''Applies from the next row'''
+        width = min(max(1, width), MAX_HEX_WIDTH)
+        if width != self.width:
+            self.width = width
+            self.type = None
+
+    def reset(self):
+        self.__init__(self.width)
+
+    def skip(self, count: int, type: int = TYPE_RX):
+        '''count bytes of type will not be fed. The next row starts after them'''
+        if count:
+            self.offsets[type] = self.offsets.get(type, 0) + count
+
+    def feed(self, data, type: int = TYPE_RX, offset: int = None) -> tuple:
+        '''(erase, text): erase the current line (the last, partial row) first, then add text'''
+        data = bytes(data)
+        if offset is None:
+            offset = self.offsets.get(type, 0)
+        self.offsets[type] = offset + len(data)
+        erase = False
+        prefix = ""
+        if type == self.type and self.row and offset == self.row_offset + len(self.row):
+            erase = True
+            data = self.row + data
+            offset = self.row_offset
+        elif self.row:
+            prefix = "\n"  # The partial row stays as it is
+        self.type = type
+        full = len(data) - len(data) % self.width
+        self.row, self.row_offset = data[full:], offset + full
+        return erase, prefix + hex_rows(data, offset, self.width)
+
+    def hold(self, data, type: int = TYPE_RX):
+        '''Keep a chunk while the view is hidden. Past HEX_BACKLOG, the oldest chunks are dropped'''
+        offset = self.offsets.get(type, 0)
+        self.offsets[type] = offset + len(data)
+        self.backlog.append((type, offset, bytes(data)))
+        self.backlog_bytes += len(data)
+        while self.backlog_bytes > HEX_BACKLOG and len(self.backlog) > 1:
+            self.backlog_bytes -= len(self.backlog.popleft()[2])
+
+    def release(self) -> list:
+        '''(type, erase, text) for everything held'''
+        runs = []  # Contiguous chunks of one direction, joined so each is dumped at once
+        for type, offset, data in self.backlog:
+            if runs and runs[-1][0] == type and runs[-1][1] + len(runs[-1][2]) == offset:
+                runs[-1][2].extend(data)
+            else:
+                runs.append((type, offset, bytearray(data)))
+        self.backlog.clear()
+        self.backlog_bytes = 0
+        return [(type, *self.feed(data, type, offset)) for type, offset, data in runs]
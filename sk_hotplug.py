@@ -0,0 +1,116 @@
+'''
+Hot-plug detection for serial ports.
+
+On Linux, DeviceMonitor watches /dev with inotify and wakes only when a serial device
+node is created or removed, so ports are enumerated on a change instead of every second.
+Anywhere inotify is not available it falls back to waking on a timer (polling).
+'''
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = os.O_NONBLOCK if hasattr(os, 'O_NONBLOCK') else 0
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+DEVICE_FOLDER = "/dev"
+SERIAL_PREFIXES = ("tty", "rfcomm", "cu.")  # Device names that could be serial ports
+DEFAULT_POLL_INTERVAL = 1  # Seconds between scans when events are not available
+SETTLE_TIME = .02  # Seconds to gather the rest of a burst of events before reporting it
+
+
+def inotify_init(directory: str):
+    '''An inotify fd watching directory for nodes being added or removed. None if inotify is not available'''
+    if not hasattr(os, 'uname') or os.uname().sysname != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, directory.encode(), IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO) < 0:
+            os.close(fd)
+            return None
+    except (OSError, AttributeError):
+        return None
+    return fd
+
+
+class DeviceMonitor:
+    '''wait() returns when serial devices may have changed (or on wake()), so the caller can enumerate ports again'''
+
+    def __init__(self, directory: str = DEVICE_FOLDER, poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self.fd = inotify_init(directory)
+        self.woken = threading.Event()
+        self.wake_r, self.wake_w = None, None
+        if self.fd is not None:
+            self.wake_r, self.wake_w = os.pipe()
+            os.set_blocking(self.wake_r, False)
+
+    @property
+    def uses_events(self) -> bool:
+        return self.fd is not None
+
+    def wait(self, timeout: float = None) -> bool:
+        '''Block until a change, a wake() or timeout. True if anything may have changed'''
+        if not self.uses_events:
+            self.woken.wait(self.poll_interval if timeout is None else timeout)
+            self.woken.clear()
+            return True
+        readable, _, _ = select.select([self.fd, self.wake_r], [], [], timeout)
+        changed = False
+        if self.wake_r in readable:
+            self.drain(self.wake_r)
+            changed = True
+        if self.fd in readable:
+            time.sleep(SETTLE_TIME)  # Devices arrive as bursts of nodes. Report the burst once
+            changed |= self.read_events()
+        return changed
+
+    def read_events(self) -> bool:
+        data = self.drain(self.fd)
+        offset = 0
+        changed = False
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW or name.startswith(SERIAL_PREFIXES):
+                changed = True
+        return changed
+
+    def drain(self, fd: int) -> bytes:
+        data = b""
+        while True:
+            try:
+                chunk = os.read(fd, 4096)
+            except (BlockingIOError, OSError):
+                return data
+            if not chunk:
+                return data
+            data += chunk
+
+    def wake(self):
+        '''Make wait() return now. Safe from any thread'''
+        if self.uses_events:
+            os.write(self.wake_w, b'\0')
+        else:
+            self.woken.set()
+
+    def close(self):
+        for fd in (self.fd, self.wake_r, self.wake_w):
+            if fd is not None:
+                os.close(fd)
+        self.fd = self.wake_r = self.wake_w = None
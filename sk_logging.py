@@ -2,22 +2,30 @@ import os
 from datetime import date
 import logging
 
-from serial.win32 import FILE_FLAG_OVERLAPPED
 from sk_tools import *
+from sk_ring_buffer import shift_stamps, stamp_at
+import threading
+import time
 import traceback
 
 DEFAULT_LOG_FORMAT = '%(port)s\t|%(asctime)s.%(msecs)03d|\t%(message)s'
 DEFAULT_TIME_FORMAT = "%I:%M:%S"
 DEFAULT_LOG_NAME = f"log-{DATE_TODAY}.txt"
+LOG_DRAIN_INTERVAL = .25  # Seconds. The log drain is woken per batch, so this only bounds the wait
 
 
 
 class SK_Logger:
-    def __init__(self, directory:str = None, log_name:str = None, time_fmt:str = None, log_fmt:str = None, port_name:str = None) -> None:
-        self.buffer = ""
+    def __init__(self, directory:str = None, log_name:str = None, time_fmt:str = None, log_fmt:str = None, port_name:str = None, encoding:str = "latin-1") -> None:
+        self.lock = threading.RLock()  # RX is written by the log drain's thread, TX and info by the GUI's
+        self.buffer = bytearray()
+        self.buffer_stamps = []  # (offset in buffer, mono, wall) of each chunk in buffer
+        self.encoding = encoding
+        self.errors = 'replace'
         self.port_name = port_name
         self.formatter = logging.Formatter(fmt = log_fmt, datefmt=time_fmt, validate=True)
-        self.logger = logging.getLogger(__name__)
+        self.logger = logging.Logger(__name__)  # One per session, so sessions never share handlers. Not registered with logging, so freed with it
+        self.logger.propagate = False
         if not log_name:
             log_name = DEFAULT_LOG_NAME
         if not directory:
@@ -34,28 +42,75 @@ class SK_Logger:
     def set_port(self, port_name:str = None):
         self.port_name = port_name
 
-    def stop(self):
-        for handler in self.logger.handlers[:]:
-            self.logger.removeHandler(handler)
+    def set_encoding(self, encoding:str = "latin-1", errors:str = 'replace'):
+        self.encoding = encoding
+        self.errors = errors
 
-    def write(self, text: str):
-        self.buffer += text.replace("\r", "")
-        if '\n' not in self.buffer:
+    def stop(self):
+        with self.lock:
+            for handler in self.logger.handlers[:]:
+                self.logger.removeHandler(handler)
+                handler.close()
+
+    def write(self, data, stamps: list = None):
+        '''Buffer str or bytes-like data, logging each completed line. Only whole lines are decoded.
+        stamps: (offset, mono, wall) capture times of the chunks in data. Lines are logged at the time they started, else now'''
+        with self.lock:
+            return self.write_locked(data, stamps)
+
+    def write_locked(self, data, stamps: list = None):
+        if isinstance(data, str):
+            data = data.encode(self.encoding, 'backslashreplace')
+        if not stamps:
+            stamps = [(0, time.monotonic(), time.time())]
+        base = len(self.buffer)
+        self.buffer_stamps += [(base + offset, mono, wall) for offset, mono, wall in stamps]
+        self.buffer += data
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
             return
-        lines = self.buffer.splitlines(True)
-        self.buffer = ""
+        lines = self.buffer[:end].split(b'\n')
+        del self.buffer[:end + 1]
+        line_stamps = self.buffer_stamps
+        self.buffer_stamps = shift_stamps(line_stamps, end + 1)
+        start = 0
         try:
+            formatted = []
             for line in lines:
-                if '\n' in line:
-                    self.logger.warning(line.replace("\n", ""), extra={"port": self.port_name})
-                else:
-                    self.buffer += line
+                wall = stamp_at(line_stamps, start)[2]
+                start += len(line) + 1
+                formatted.append(self.format_line(line.replace(b'\r', b'').decode(self.encoding, self.errors), wall))
+            self.write_lines(formatted)
         except Exception as E:
             eprint("Log Write Error:", E)
             eprint(f"ERR: {traceback.format_exc()}\n", color='red')
             return E
 
+    def format_line(self, text: str, wall: float) -> str:
+        '''text as a log line, as if it happened at wall (time.time())'''
+        record = self.logger.makeRecord(self.logger.name, logging.WARNING, __file__, 0, text, None, None, extra={"port": self.port_name})
+        record.created = wall
+        record.msecs = int(wall * 1000) % 1000
+        return self.formatter.format(record)
+
+    def write_lines(self, lines: list):
+        '''Formatted lines to the log file in one write and one flush, not one per line'''
+        handler = self.handler
+        if not lines or handler not in self.logger.handlers:  # Stopped
+            return
+        handler.acquire()
+        try:
+            if handler.stream is not None:
+                handler.stream.write(handler.terminator.join(lines) + handler.terminator)
+                handler.flush()
+        finally:
+            handler.release()
+
     def archive(self, new_name: str = None, extension = ".txt"):
+        with self.lock:
+            self.archive_locked(new_name, extension)
+
+    def archive_locked(self, new_name: str = None, extension = ".txt"):
         self.stop()
         self.handler.close()
         if new_name == None:
@@ -69,11 +124,56 @@ class SK_Logger:
             test_name = new_name + f'({logIndex})'
 
         os.rename(self.file_path, self.directory + test_name + extension)
-        
-        self.__init__()
+
+        self.handler = logging.FileHandler(self.file_path)
+        self.handler.setFormatter(self.formatter)
+        self.logger.addHandler(self.handler)
         self.write("ARCHIVED\n")
         return
 
+
+class LogDrain:
+    '''Drains a ring cursor into a log on a thread of its own, so the GUI never waits on the disk.
+    A log falling behind shows as a growing log backlog in stats, then as overruns of its cursor.
+    get_log() is called per drain, as the session's logger is replaced when restarted'''
+
+    def __init__(self, cursor, get_log) -> None:
+        self.cursor = cursor
+        self.get_log = get_log
+        self.wake_event = threading.Event()
+        self.active = False
+        self.thread: threading.Thread = None
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self.run, name="LogDrain", daemon=True)
+        self.thread.start()
+
+    def wake(self):
+        '''New data is in the ring'''
+        self.wake_event.set()
+
+    def run(self):
+        while self.active:
+            self.wake_event.wait(LOG_DRAIN_INTERVAL)
+            self.wake_event.clear()
+            self.drain()
+
+    def drain(self):
+        log = self.get_log()
+        if log is None:
+            return
+        self.cursor.drain(log.write, stamped=True)
+
+    def stop(self):
+        '''Stop the thread, then log what is left'''
+        self.active = False
+        self.wake_event.set()
+        if self.thread:
+            self.thread.join()  # At most the drain under way
+        self.thread = None
+        self.drain()
+
 """
 class SK_Logger:
     def __init__(self, file_path = None, time_fmt: str = None, log_fmt: str = None, port_name: str = None) -> None:
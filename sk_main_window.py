@@ -7,6 +7,7 @@ from datetime import datetime
 import re
 
 import random
+import shlex
 
 import PyQt5
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -20,16 +21,30 @@ from pyqtgraph.graphicsItems.LabelItem import LabelItem
 # gui imports
 from gui.GUI_MAIN_WINDOW import Ui_MainWindow
 from serial_handler import *
-from sk_commands import Command
+from sk_commands import CONNECT_OPTIONS, Command
 from sk_help import *
 from sk_help_popup import Help_Popup, open_help_popup
 from sk_log_popup import Log_Viewer, open_log_viewer
-from sk_logging import SK_Logger
+from sk_logging import DEFAULT_TIME_FORMAT, LogDrain, SK_Logger
+from sk_ring_buffer import stamp_at
 from sk_scripting import ScriptWorker, ScriptSyntaxHighlighter
+from sk_autobaud import DEFAULT_AUTOBAUD_BUDGET, autobaud
+from sk_capture import CAPTURE_EXTENSION, REPLAY_MAX_SPEED
+from sk_terminal import DEFAULT_SCROLLBACK_KB, DEFAULT_SCROLLBACK_LINES, FRAME_INTERVAL
+from sk_hexdump import DEFAULT_HEX_WIDTH, MAX_HEX_WIDTH, HexDump
+from sk_stats import STATS_INTERVAL, STATS_TICK, StatsSampler, loss_events, stats_report, status_text
+import sk_virtual_port
+from sk_virtual_port import DEFAULT_VIRTUAL_RATE, DEFAULT_VIRTUAL_VALUES, PATTERN_KV, VIRTUAL_SUPPORTED, VirtualDevice
 from sk_tools import *
+from sk_gui_tools import *
+from sk_workers import RescanWorker
 
 
 class MainWindow(QtWidgets.QMainWindow):
+    tx_failed = QtCore.pyqtSignal(str)
+    tx_sent = QtCore.pyqtSignal()
+    port_restored = QtCore.pyqtSignal(float, int)  # From the session's reconnect thread
+    autobaud_done = QtCore.pyqtSignal(object)  # Future from sk_autobaud, resolved on a probe thread
     target_port: str = None  # Port to auto-connect to.
     current_ports: dict = {}  # List of current ports
     command_char: str = None
@@ -38,20 +53,43 @@ class MainWindow(QtWidgets.QMainWindow):
     commands = {}
     history_index = 1
     target_port: str = None
+    target_id: str = None  # Identity of the auto-connect device (see sk_port_catalog)
+    autobaud_kwargs: dict = None  # Options to connect with once 'con -b auto' finds a rate
     key_cmds: dict = {}
     script_thread = QThread()
     plot_started = False
     is_connected = False
+    replaying = False  # A recording is being played instead of a port
+    sessions: dict = {}  # Port name: SerialSession. Every open port in this process
+    current_settings: dict = {}  # Shared by every session in this process
+    rescan_thread: QThread = None  # One port rescanner shared by every session
+    rescan_worker: RescanWorker = None
 
-    def __init__(self, open_cmd="", * args, **kwargs) -> None:
+    def __init__(self, open_cmd="", tabs=None, * args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.last_save_time = time.perf_counter()
         self.cmd_list = []
         self.ui = Ui_MainWindow()
-        self.current_settings = {}
+        self.session = SerialSession()
+        self.term_cursor = self.session.ring.cursor("terminal")
+        self.log_cursor = self.session.ring.cursor("log")
+        self.plot_cursor = self.session.ring.cursor("plot")
+        self.capture_cursor = self.session.ring.cursor("capture")
+        self.hex_cursor = self.session.ring.cursor("hex")
+        self.log_drain = LogDrain(self.log_cursor, lambda: self.session.log)
+        self.hex_dump = HexDump()
+        self.hex_view = False
+        self.drain_timer = QTimer()  # Drains what rx_ready left for the next frame
+        self.drain_timer.setSingleShot(True)
+        self.drain_timer.setInterval(FRAME_INTERVAL)
+        self.drain_timer.timeout.connect(self.rx_ready)
+        self.reported_overruns = {}
+        self.tabs = tabs  # SessionTabs this session is shown in
+        self.extra_windows = []
         self.ui.setupUi(self)
         self.connect_ui()
         self.save_timer = QTimer()
+        self.start_stats()
 
         self.create_settings()
         self.create_commands()
@@ -60,6 +98,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.recall_settings()
         self.script_highlighter = ScriptSyntaxHighlighter(self.ui.textEdit_script)
         self.start_logger()
+        self.log_drain.start()
 
         self.ui.lineEdit_input.setFocus()
 
@@ -95,7 +134,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if key == QtCore.Qt.Key_Escape:
             if self.ui.lineEdit_input.hasFocus() == False:
                 self.ui.lineEdit_input.setFocus()
-            if self.script_thread:
+            if self.script_worker:
                 self.end_script()
 
         if modifier == QtCore.Qt.ControlModifier:  # CTRL + ...
@@ -153,9 +192,24 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.label_log_settings_debug.setText("")
 
         self.ui.textEdit_terminal.setPlaceholderText(HELP_TEXT)
-        self.ui.textEdit_terminal.setStyleSheet(STYLE_SHEET_TERMINAL_INACTIVE)
+        self.ui.textEdit_terminal.keep_history()
+        self.ui.lineEdit_scrollback_lines.textChanged.connect(self.scrollback_changed)
+        self.ui.lineEdit_scrollback_kb.textChanged.connect(self.scrollback_changed)
+        self.ui.checkBox_autoscroll.toggled.connect(self.autoscroll_changed)
+        self.autoscroll_changed()
+        self.ui.checkBox_ansi.toggled.connect(self.ui.textEdit_terminal.set_ansi)
+        self.ui.textEdit_hex.set_ansi(False)
+        self.ui.textEdit_hex.keep_history()
+        self.ui.textEdit_hex.hide()
+        self.ui.comboBox_view.currentTextChanged.connect(self.view_changed)
+        self.ui.lineEdit_hex_width.textChanged.connect(self.hex_width_changed)
+        self.set_terminal_style(STYLE_SHEET_TERMINAL_INACTIVE)
         self.ui.pushButton_connect.setStyleSheet(STYLE_SHEET_BUTTON_INACTIVE)
         self.ui.pushButton_send.clicked.connect(self.send_clicked)
+        self.tx_failed.connect(self.send_failed)
+        self.tx_sent.connect(self.session.capture_sent)
+        self.port_restored.connect(self.restored)
+        self.autobaud_done.connect(self.autobaud_finished)
         self.ui.pushButton_clear.clicked.connect(self.clear_clicked)
         self.ui.pushButton_connect.clicked.connect(self.connect_clicked)
         self.ui.pushButton_pause_plot.clicked.connect(self.pause_plot)
@@ -227,52 +281,192 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def add_text(self, *args, type: int = TYPE_RX):
         text: str = ""
-        for arg in args:
-            text += str(arg)
+        data = None
+        if len(args) == 1 and isinstance(args[0], (bytes, bytearray, memoryview)):
+            data = args[0]  # Raw serial data. Decoded once, only for the terminal
+            text = self.session.decoder.decode(data)
+        else:
+            for arg in args:
+                text += str(arg)
+            data = text
 
         if type == TYPE_RX:  # Incoming FROM device
-            self.ui.textEdit_terminal.setTextColor(COLOR_WHITE)
-            self.ui.textEdit_terminal.insertPlainText(text)
-            self.log.write(text)
+            self.ui.textEdit_terminal.write(text, TYPE_RX)
+            self.session.log.write(data)
             if self.plot_started:
-                self.ui.widget_plot.update(text)
+                self.ui.widget_plot.update(data)
             vprint(text, color="white", end="", flush=True)
 
         elif type == TYPE_TX:  # Outgoing TO DEVICE
             text = self.ui.lineEdit_tx_chr.text() + text
             if self.ui.checkBox_output_include_terminal.isChecked():
-                self.ui.textEdit_terminal.setTextColor(COLOR_LIGHT_BLUE)
-                self.ui.textEdit_terminal.insertPlainText(text)
+                self.ui.textEdit_terminal.write(text, TYPE_TX)
             if self.ui.checkBox_output_include_log.isChecked():
-                self.log.write(text)
+                self.session.log.write(text)
             vprint(text, color="blue", end="", flush=True)
 
         elif type == TYPE_INFO:
             if self.ui.checkBox_info_include_terminal.isChecked():
                 text = self.ui.lineEdit_info_chr.text() + text
-                self.ui.textEdit_terminal.setTextColor(COLOR_LIGHT_GREEN)
-                self.ui.textEdit_terminal.insertPlainText(text)
+                self.ui.textEdit_terminal.write(text, TYPE_INFO)
             if self.ui.checkBox_info_include_log.isChecked():
-                self.log.write(text)
+                self.session.log.write(text)
             vprint(text, color="green", end="", flush=True)
 
         elif type == TYPE_ERROR:
             if self.ui.checkBox_error_include_terminal.isChecked():
                 text = self.ui.lineEdit_err_chr.text() + text
-                self.ui.textEdit_terminal.setTextColor(COLOR_LIGHT_RED)
-                self.ui.textEdit_terminal.insertPlainText(text)
+                self.ui.textEdit_terminal.write(text, TYPE_ERROR)
             if self.ui.checkBox_error_include_log.isChecked():
-                self.log.write(text)
+                self.session.log.write(text)
             vprint(text, color="red", end="", flush=True)
 
         elif type == TYPE_HELP:
-            self.ui.textEdit_terminal.setTextColor(COLOR_LIGHT_YELLOW)
-            self.ui.textEdit_terminal.insertPlainText(text)
+            self.ui.textEdit_terminal.write(text, TYPE_HELP)
             vprint(text, color="yellow", end="", flush=True)
 
-        if self.ui.checkBox_autoscroll.isChecked():
-            self.ui.textEdit_terminal.moveCursor(QTextCursor.End)
-            self.ui.textEdit_terminal.ensureCursorVisible()
+    def scrollback_changed(self):
+        '''Older text is dropped from the terminal only. The log keeps it all'''
+        lines = get_number(self.ui.lineEdit_scrollback_lines.text(), int, DEFAULT_SCROLLBACK_LINES, lower_limit=0)
+        kb = get_number(self.ui.lineEdit_scrollback_kb.text(), int, DEFAULT_SCROLLBACK_KB, lower_limit=0)
+        self.ui.textEdit_terminal.set_scrollback(lines, kb)
+        self.ui.textEdit_hex.set_scrollback(lines, kb)
+
+    def autoscroll_changed(self):
+        '''The terminal scrolls to the end once per frame it draws, if checked'''
+        self.ui.textEdit_terminal.autoscroll = self.ui.checkBox_autoscroll.isChecked()
+        self.ui.textEdit_hex.autoscroll = self.ui.checkBox_autoscroll.isChecked()
+
+    def set_terminal_style(self, style_sheet: str):
+        self.ui.textEdit_terminal.setStyleSheet(style_sheet)
+        self.ui.textEdit_hex.setStyleSheet(style_sheet)
+
+    def view_changed(self, view: str):
+        '''Text or Hex. The text terminal is always written to. The hex view keeps the last HEX_BACKLOG bytes while hidden'''
+        self.hex_view = view == "Hex"
+        self.ui.textEdit_terminal.setVisible(not self.hex_view)
+        self.ui.textEdit_hex.setVisible(self.hex_view)
+        if self.hex_view:
+            for type, erase, text in self.hex_dump.release():
+                self.show_hex(erase, text, type)
+
+    def hex_width_changed(self):
+        self.hex_dump.set_width(get_number(self.ui.lineEdit_hex_width.text(), int, DEFAULT_HEX_WIDTH, lower_limit=1, upper_limit=MAX_HEX_WIDTH))
+
+    def add_hex(self, data, type: int = TYPE_RX):
+        '''Raw bytes received or sent: dumped if the hex view is shown, held if not'''
+        if self.hex_view:
+            self.show_hex(*self.hex_dump.feed(data, type), type)
+        else:
+            self.hex_dump.hold(data, type)
+
+    def show_hex(self, erase: bool, text: str, type: int):
+        if erase:
+            self.ui.textEdit_hex.erase_line()
+        self.ui.textEdit_hex.write(text, type)
+
+    def rx_ready(self, count: int = 0):
+        '''count new bytes are in the session's ring. Each consumer reads them through its own cursor, up to
+        DRAIN_MAX_BYTES a frame: a consumer that can't keep up falls behind, and overruns, rather than stall the GUI'''
+        if count:
+            self.session.rx_batches_handled += 1
+        if self.session.drop_policy == DROP_DISPLAY:  # Show recent data rather than hold up the log catching up
+            if self.term_cursor.catch_up(DISPLAY_MAX_BEHIND):
+                self.session.decoder.reset()
+                self.ui.textEdit_terminal.reset_ansi()
+            if self.plot_started and self.plot_cursor.catch_up(DISPLAY_MAX_BEHIND):
+                self.ui.widget_plot.resync()
+            if self.hex_view:
+                self.hex_dump.skip(self.hex_cursor.catch_up(DISPLAY_MAX_BEHIND))
+        self.term_cursor.drain(self.show_rx, stamped=True, max_bytes=DRAIN_MAX_BYTES)
+        self.hex_cursor.drain(self.add_hex, max_bytes=DRAIN_MAX_BYTES)
+        self.log_drain.wake()  # The log is written on a thread of its own
+        if self.plot_started:
+            self.plot_cursor.drain(self.ui.widget_plot.update, stamped=True, max_bytes=DRAIN_MAX_BYTES)
+        else:
+            self.plot_cursor.skip()
+        if self.session.capture:
+            self.capture_cursor.drain(self.session.capture_rx, stamped=True, max_bytes=DRAIN_MAX_BYTES)
+        else:
+            self.capture_cursor.skip()
+        cursors = (self.term_cursor, self.hex_cursor, self.plot_cursor, self.capture_cursor)
+        if any(cursor.available for cursor in cursors) and not self.drain_timer.isActive():
+            self.drain_timer.start()
+
+    def show_rx(self, data, stamps: list = None):
+        if self.ui.checkBox_timestamp.isChecked() and stamps:
+            text = self.stamp_lines(data, stamps)
+        else:
+            text = self.session.decoder.decode(data)
+        self.ui.textEdit_terminal.write(text, TYPE_RX)
+        vprint(text, color="white", end="", flush=True)
+
+    def stamp_lines(self, data, stamps: list) -> str:
+        '''Decode data, starting each line with the time its first byte was read'''
+        time_fmt = replace_escapes(self.ui.lineEdit_time_format.text()) or DEFAULT_TIME_FORMAT
+        line_start = self.ui.textEdit_terminal.at_line_start()
+        data = bytes(data)
+        text = []
+        start = 0
+        while start < len(data):
+            end = data.find(b'\n', start) + 1 or len(data)
+            if line_start:
+                wall = stamp_at(stamps, start)[2]
+                text.append(f"{time.strftime(time_fmt, time.localtime(wall))}.{int(wall * 1000) % 1000:03d} ")
+            text.append(self.session.decoder.decode(data[start:end]))
+            line_start = data[end - 1] == 0x0A
+            start = end
+        return "".join(text)
+
+    def report_overruns(self):
+        '''Data lost, likely lost or skipped since the last report. Shown and logged as errors, once a STATS_INTERVAL'''
+        for event in loss_events(self.session, self.reported_overruns):
+            self.add_text(event + "\n", type=TYPE_ERROR)
+
+    def start_stats(self):
+        '''Sample the session's counters every STATS_INTERVAL for the status bar and 'stats'. A timer ticking every
+        STATS_TICK measures how late the GUI thread gets to it'''
+        self.stats = StatsSampler(self.session)
+        self.gui_lag = 0.0      # Worst over the last interval
+        self.gui_lag_max = 0.0  # so far in this interval
+        self.label_stats = QLabel()
+        self.ui.statusbar.addPermanentWidget(self.label_stats)
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.stats_tick)
+        self.stats_last_tick = time.monotonic()
+        self.stats_timer.start(int(STATS_TICK * 1000))
+
+    def stats_tick(self):
+        now = time.monotonic()
+        self.gui_lag_max = max(self.gui_lag_max, now - self.stats_last_tick - STATS_TICK)
+        self.stats_last_tick = now
+        if now - self.stats.last_time < STATS_INTERVAL:
+            return
+        self.gui_lag, self.gui_lag_max = max(self.gui_lag_max, 0.0), 0.0
+        plot = self.ui.widget_plot
+        self.stats.sample(plot_time=plot.parse_time, plot_lines=plot.parsed_lines)
+        self.label_stats.setText(status_text(self.stats.stats, self.gui_lag))
+        self.report_overruns()
+
+    def handle_stats_command(self, **kwargs):
+        if '-h' in kwargs:
+            self.add_text(STATS_HELP, type=TYPE_HELP)
+            return
+        port = "REPLAY" if self.replaying else self.session.port if self.is_connected else None
+        plot_time = self.stats.stats['rates'].get('plot_time') if self.plot_started else None
+        self.add_text(stats_report(self.stats.stats, port, self.gui_lag, plot_time), type=TYPE_INFO)
+
+    def handle_view_command(self, view: str = None, **kwargs):
+        if '-h' in kwargs:
+            self.add_text(VIEW_HELP, type=TYPE_HELP)
+            return
+        if kwargs.get('-w'):
+            self.ui.lineEdit_hex_width.setText(kwargs['-w'])
+        if view:
+            if view.lower() not in ("text", "hex"):
+                self.add_text(f"ERR: UNKNOWN VIEW '{view}'. USE 'text' OR 'hex'\n", type=TYPE_ERROR)
+                return
+            self.ui.comboBox_view.setCurrentText(view.capitalize())
 
     def debug_text(self, *args, color: QColor = COLOR_BLACK):
         label_text = ""
@@ -328,12 +522,28 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         self.add_text(text, type=TYPE_TX)
         if self.is_connected:
-            serial_send_string(text)
+            self.session.send_string(text, self.send_done)
+            self.add_hex(text.encode('utf-8'), TYPE_TX)
         else:
             self.debug_text("WARN: NOT CONNECTED", color=COLOR_DARK_YELLOW)
 
+    def send_done(self, future):
+        '''Runs on the TX thread, so results are passed back to the GUI thread by signal'''
+        if future.cancelled():
+            return
+        if future.exception():
+            self.tx_failed.emit(str(future.exception()))
+        elif self.session.capture:
+            self.tx_sent.emit()
+
+    def send_failed(self, error: str):
+        self.debug_text(f"ERR: SEND FAILED: {error}", color=COLOR_RED)
+        self.add_text(f"SEND FAILED: {error}\n", type=TYPE_ERROR)
+
     def clear_clicked(self):
         self.ui.textEdit_terminal.setText("")
+        self.ui.textEdit_hex.setText("")
+        self.hex_dump.reset()
         self.debug_text("")
 
 ########################################################################
@@ -343,28 +553,68 @@ class MainWindow(QtWidgets.QMainWindow):
 ########################################################################
 
     def serial_error(self):
-        if self.is_connected:
-            self.add_text(f"LOST {ser.port}\n", type=TYPE_ERROR)
-            self.disconnect(False)
-            vprint("SERIAL PORT LOST", color="red")
+        if not self.is_connected:
+            return
+        if self.target_port and self.ui.checkBox_auto_reconnect.isChecked():
+            self.add_text(f"LOST {self.session.port}. RECONNECTING...\n", type=TYPE_ERROR)
+            self.debug_text(f"RECONNECTING TO {self.session.port}", color=COLOR_DARK_YELLOW)
+            self.set_terminal_style(STYLE_SHEET_TERMINAL_INACTIVE)
+            self.session.start_reconnect(self.port_restored.emit)
+            vprint("SERIAL PORT LOST. RECONNECTING", color="red")
+            return
+        self.add_text(f"LOST {self.session.port}\n", type=TYPE_ERROR)
+        self.disconnect(False)
+        vprint("SERIAL PORT LOST", color="red")
+
+    def restored(self, outage: float, bytes_lost: int):
+        '''The session reopened its port after a loss. Reading resumes into the same ring, log and plot'''
+        if not self.session.is_open():  # Disconnected meanwhile
+            return
+        if not self.is_connected:  # A retried auto-connect (see retry_connect)
+            self.add_text(f"OPENED {self.session.port} AFTER {outage * 1000:.0f} ms "
+                          f"({self.session.reconnect_attempts} ATTEMPTS)\n", type=TYPE_INFO)
+            self.connected(self.session.port)
+            return
+        port = self.session.port
+        if port not in self.sessions:  # The device came back under another name
+            self.sessions.pop(self.target_port, None)
+            self.sessions[port] = self.session
+            self.session.log.set_port(port)
+            self.set_target_port(port)
+        self.session.start_worker(self.rx_ready, self.serial_error)
+        self.add_text(f"RECONNECTED TO {port} AFTER {outage * 1000:.0f} ms "
+                      f"({self.session.reconnect_attempts} ATTEMPTS, UP TO {bytes_lost} BYTES LOST)\n", type=TYPE_INFO)
+        self.debug_text(f"RECONNECTED TO {port}", color=COLOR_GREEN)
+        self.set_terminal_style(STYLE_SHEET_TERMINAL_ACTIVE)
+        self.update_title()
 
     def disconnect(self, intentional=True):
+        if self.replaying:
+            self.stop_replay()
+            return
         if self.is_connected == False:
-            if intentional:
+            if self.session.reconnecting:
+                self.session.stop_reconnect()
+                self.add_text(f"STOPPED RETRYING {self.session.port}\n", type=TYPE_INFO)
+            elif intentional:
                 self.debug_text("ALREADY DISCONNECTED", color=COLOR_DARK_YELLOW)
             return
 
         if intentional:
             self.target_port = None
+            self.target_id = None
             self.ui.label_port.setText("Ports:")
-            self.add_text(f"DISCONNECTED FROM: {ser.port}\n", type=TYPE_INFO)
-            self.debug_text(f"DISCONNECTED FROM: {ser.port}")
+            self.add_text(f"DISCONNECTED FROM: {self.session.port}\n", type=TYPE_INFO)
+            self.debug_text(f"DISCONNECTED FROM: {self.session.port}")
 
-        self.serial_worker.stop()
-        self.serial_thread.exit()
-        serial_disconnect()
+        self.stop_capture()
+        self.sessions.pop(self.session.port, None)
+        self.session.disconnect()
         self.is_connected = False
-        self.ui.textEdit_terminal.setStyleSheet(STYLE_SHEET_TERMINAL_INACTIVE)
+        held_text = self.session.decoder.flush()  # Partial character left when the port closed
+        if held_text:
+            self.ui.textEdit_terminal.write(held_text, TYPE_RX)
+        self.set_terminal_style(STYLE_SHEET_TERMINAL_INACTIVE)
         self.ui.pushButton_connect.setStyleSheet(STYLE_SHEET_BUTTON_INACTIVE)
         self.ui.pushButton_connect.setText("Connect")
         self.ui.comboBox_baud.setEnabled(True)
@@ -373,26 +623,40 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.checkBox_rtscts.setEnabled(True)
         self.ui.checkBox_dsrdtr.setEnabled(True)
         self.ui.checkBox_xonxoff.setEnabled(True)
-        self.log.set_port("NONE")
+        self.session.log.set_port("NONE")
+        self.update_title()
 
     def connect(self, port: str, baud: str = "115200", xonxoff: bool = False, dsrdtr: bool = False, rtscts: str = False, parity: str = "NONE") -> bool:
         self.ui.comboBox_port.setCurrentText(port)
-        self.is_connected = serial_connect(port, baud, xonxoff, rtscts, dsrdtr, parity)
-        if not self.is_connected:
+        if self.replaying:
+            self.add_text("ERR: STOP THE REPLAY BEFORE CONNECTING\n", type=TYPE_ERROR)
+            return False
+        if port in self.sessions:
+            self.debug_text(f"ERR: {port} IS OPEN IN ANOTHER SESSION", color=COLOR_RED)
+            self.add_text(f"ERR: {port} IS OPEN IN ANOTHER SESSION\n", type=TYPE_ERROR)
+            return False
+        self.session.stop_reconnect()  # A retried auto-connect (see retry_connect)
+        if not self.session.connect(port, baud, xonxoff, rtscts, dsrdtr, parity):
             self.debug_text(f"ERR: {port} COULD NOT CONNECT", color=COLOR_RED)
             self.add_text(f"ERR: {port} COULD NOT CONNECT \n", type=TYPE_ERROR)
-            return
+            return False
+        return self.connected(port)
 
-        self.log.set_port(port)
+    def connected(self, port: str) -> bool:
+        '''The session's port is open: start reading and show it'''
+        self.is_connected = True
+        self.sessions[port] = self.session
+        self.session.log.set_port(port)
+        self.set_rx_encoding()
 
-        self.debug_text(f"CONNECTED TO {port} at {ser.baudrate} BAUD", color=COLOR_GREEN)
-        self.add_text(f"CONNECTED TO {port} at {ser.baudrate} BAUD\n", type=TYPE_INFO)
+        self.debug_text(f"CONNECTED TO {port} at {self.session.ser.baudrate} BAUD", color=COLOR_GREEN)
+        rx_mode = self.session.read_mode if self.session.backend == BACKEND_THREAD else self.session.backend
+        self.add_text(f"CONNECTED TO {port} at {self.session.ser.baudrate} BAUD (RX: {rx_mode}, {self.session.decoder.codec})\n", type=TYPE_INFO)
 
         if self.ui.checkBox_auto_reconnect.isChecked():
-            self.target_port = port
-            self.ui.label_port.setText(f"Port: Auto ({self.target_port})")
+            self.set_target_port(port)
 
-        self.ui.textEdit_terminal.setStyleSheet(STYLE_SHEET_TERMINAL_ACTIVE)
+        self.set_terminal_style(STYLE_SHEET_TERMINAL_ACTIVE)
         self.ui.pushButton_connect.setStyleSheet(STYLE_SHEET_BUTTON_ACTIVE)
         self.ui.comboBox_baud.setEnabled(False)
         self.ui.comboBox_parity.setEnabled(False)
@@ -402,18 +666,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.checkBox_xonxoff.setEnabled(False)
         self.ui.pushButton_connect.setText("Disconnect")
 
-        self.serial_thread = QThread()
-        self.serial_worker = SerialWorker()
-        self.serial_worker.moveToThread(self.serial_thread)
-        self.serial_thread.started.connect(self.serial_worker.run)
-        self.serial_worker.out.connect(self.add_text)
-        self.serial_worker.disconnected.connect(self.serial_error)
-        self.serial_thread.setTerminationEnabled(True)
-        self.serial_thread.start()
+        self.session.start_worker(self.rx_ready, self.serial_error)
+        self.update_title()
 
         vprint("Serial Connection Success")
         return True
 
+    def set_rx_encoding(self):
+        '''Line-based consumers decode whole lines with the same codec as the terminal'''
+        self.session.log.set_encoding(self.session.decoder.encoding, self.session.decoder.errors)
+        self.ui.widget_plot.set_encoding(self.session.decoder.encoding, self.session.decoder.errors)
+
     def find_port_name(self, input: str):
         if input.startswith("#"):
             port_index = int(input[1:])
@@ -429,7 +692,7 @@ class MainWindow(QtWidgets.QMainWindow):
             return "COM" + input
         if "dev/tty" + input in self.current_ports:
             return "dev/tty" + input
-        return None
+        return port_catalog.lookup(input)  # Serial number, by-id link, device identity, ...
 
     def handle_connect(self, *args, **kwargs):
         port: str = None
@@ -443,6 +706,10 @@ class MainWindow(QtWidgets.QMainWindow):
             self.add_text(CONNECT_HELP, type=TYPE_HELP)
             return
 
+        if kwargs.get('-b') == "auto":
+            self.start_autobaud(*args, **kwargs)
+            return
+
         if args:  # Port name
             port = args[0]
             if args[0] == '?':
@@ -452,7 +719,7 @@ class MainWindow(QtWidgets.QMainWindow):
             port = self.find_port_name(args[0])
             if port == None:
                 self.debug_text(f"ERR: PORT {args[0]} NOT FOUND", color=COLOR_RED)
-                return
+                return False
         else:
             port = self.ui.comboBox_port.currentText()
 
@@ -478,7 +745,7 @@ class MainWindow(QtWidgets.QMainWindow):
             parity = kwargs['-p'].upper()
             if parity not in parity_values:
                 self.debug_text(f"PARITY {parity} INVALID", color=COLOR_RED)
-                return
+                return False
             self.ui.comboBox_parity.setCurrentText(parity)
         else:
             parity = self.ui.comboBox_parity.currentText()
@@ -487,20 +754,87 @@ class MainWindow(QtWidgets.QMainWindow):
             baud = kwargs['-b']
             if baud not in self.get_combobox_items(self.ui.comboBox_baud):
                 self.debug_text(f"ERR: BAUD RATE {baud} INVALID", color=COLOR_RED)
-                return
+                return False
             self.ui.comboBox_baud.setCurrentText(baud)
         else:
             baud = self.ui.comboBox_baud.currentText()
 
-        if self.is_connected:
-            if port != ser.port or kwargs:
+        if port in self.sessions and self.sessions[port] is not self.session:
+            self.debug_text(f"ERR: {port} IS OPEN IN ANOTHER SESSION", color=COLOR_RED)
+            return False
+
+        if self.is_connected:  # Closed before the options are applied: they change the reader and decoder
+            if port != self.session.port or kwargs:
                 self.disconnect()
-                self.handle_connect(*args, **kwargs)
-            else:
-                self.debug_text("ERR: ALREADY CONNECTED", color=COLOR_RED)
+                return self.handle_connect(*args, **kwargs)
+            self.debug_text("ERR: ALREADY CONNECTED", color=COLOR_RED)
+            return False
+
+        error = configure_session(self.session, kwargs)
+        if error:
+            self.debug_text(f"ERR: {error}", color=COLOR_RED)
+            return False
+
+        return self.connect(port, baud, xonxoff, dsrdtr, rtscts, parity)
+
+    def start_autobaud(self, *args, **kwargs):
+        '''con -b auto. [PORT] may be a comma separated list of ports, probed in parallel'''
+        names = args[0].split(',') if args else [self.ui.comboBox_port.currentText()]
+        ports = []
+        for name in names:
+            port = self.find_port_name(name)
+            if port == None:
+                self.debug_text(f"ERR: PORT {name} NOT FOUND", color=COLOR_RED)
+                return
+            if port in self.sessions and self.sessions[port] is not self.session:
+                self.debug_text(f"ERR: {port} IS OPEN IN ANOTHER SESSION", color=COLOR_RED)
+                return
+            ports.append(port)
+        budget = get_number(kwargs.get('--budget', DEFAULT_AUTOBAUD_BUDGET), float, None, lower_limit=.1)
+        if budget == None:
+            self.debug_text(f"ERR: AUTOBAUD BUDGET {kwargs['--budget']} INVALID", color=COLOR_RED)
+            return
+        parity = kwargs.get('-p', self.ui.comboBox_parity.currentText()).upper()
+        if parity not in parity_values:
+            self.debug_text(f"PARITY {parity} INVALID", color=COLOR_RED)
             return
+        if self.is_connected and self.session.port in ports:
+            self.disconnect()
+        self.autobaud_kwargs = {key: value for key, value in kwargs.items() if key not in ('-b', '--budget')}
+        self.add_text(f"AUTOBAUD: PROBING {', '.join(ports)} (UP TO {budget} s)\n", type=TYPE_INFO)
+        autobaud(ports, budget=budget, parity=parity_values[parity]).add_done_callback(self.autobaud_done.emit)
 
-        self.connect(port, baud, xonxoff, dsrdtr, rtscts, parity)
+    def autobaud_finished(self, future):
+        '''Connect this session to the first port that found a rate, and open a new session for each other one'''
+        try:
+            results = future.result()
+        except Exception as E:
+            self.add_text(f"AUTOBAUD FAILED: {E}\n", type=TYPE_ERROR)
+            return
+        if not results:
+            self.add_text("AUTOBAUD: NO PORTS TO PROBE\n", type=TYPE_ERROR)
+            return
+        found = []
+        for result in results:
+            scores = ", ".join(f"{rate}: {score}" for rate, score in result['scores'].items())
+            if result['error']:
+                self.add_text(f"AUTOBAUD {result['port']}: {result['error']}\n", type=TYPE_ERROR)
+            elif result['baud'] is None:
+                self.add_text(f"AUTOBAUD {result['port']}: NO RATE FOUND ({scores})\n", type=TYPE_ERROR)
+            else:
+                self.add_text(f"AUTOBAUD {result['port']}: {result['baud']} BAUD (SCORE {result['score']})\n", type=TYPE_INFO)
+                vprint(f"AUTOBAUD SCORES {result['port']}: {scores}", color='green')
+                found.append(result)
+        options = []
+        for key, value in self.autobaud_kwargs.items():
+            options.append(key)
+            if value is not None:
+                options.append(shlex.quote(value))
+        for index, result in enumerate(found):
+            if index == 0:
+                self.handle_connect(result['port'], **dict(self.autobaud_kwargs, **{'-b': str(result['baud'])}))
+            else:
+                self.open_new_window("con", shlex.quote(result['port']), "-b", str(result['baud']), *options)
 
     def connect_clicked(self):
         if self.is_connected:
@@ -511,46 +845,90 @@ class MainWindow(QtWidgets.QMainWindow):
     def auto_reconnect_toggled(self):
         if self.ui.checkBox_auto_reconnect.isChecked():
             if self.is_connected:
-                self.target_port = ser.port
-                self.ui.label_port.setText(f"Ports: (Auto {self.target_port})")
+                self.set_target_port(self.session.port)
         else:
             self.ui.label_port.setText(f"Ports:")
             self.target_port = None
+            self.target_id = None
+            if self.session.reconnecting:
+                self.add_text(f"STOPPED RECONNECTING TO {self.session.port}\n", type=TYPE_ERROR)
+                self.session.stop_reconnect()
+                self.disconnect(False)
+
+    def set_target_port(self, port: str):
+        '''Auto-reconnect to port. The device is remembered by identity, so it is found again under a new name'''
+        self.target_port = port
+        self.target_id = port_catalog.identity(port)
+        self.ui.label_port.setText(f"Port: Auto ({self.target_port})")
+
+    def find_target_port(self) -> str:
+        '''The name the auto-reconnect device has now. None if it is not plugged in'''
+        if not self.target_port:
+            return None
+        port = port_catalog.lookup(self.target_id) or self.target_port
+        if port not in self.current_ports:
+            return None
+        if port_catalog.identity(port) != self.target_id:  # Another device took the name
+            return None
+        return port
 
     def start_rescan(self):
-        self.rescan_thread = QThread()
-        self.rescan_worker = RescanWorker()
-        self.rescan_worker.moveToThread(self.rescan_thread)
-        self.rescan_thread.started.connect(self.rescan_worker.run)
-        self.rescan_worker.new_ports.connect(self.update_ports)
-        self.rescan_thread.start()
+        if MainWindow.rescan_worker is None:
+            MainWindow.rescan_thread = QThread()
+            MainWindow.rescan_worker = RescanWorker()
+            self.rescan_worker.moveToThread(self.rescan_thread)
+            self.rescan_thread.started.connect(self.rescan_worker.run)
+            self.rescan_thread.start()
+        self.rescan_worker.ports_changed.connect(self.ports_changed)
 
     def update_ports(self, ports: dict = None):
-        if not ports:
-            return
-        ports_lost = set(self.current_ports).difference(set(ports))
-        ports_found = set(ports).difference(set(self.current_ports))
-        if not ports_found and not ports_lost:
-            return
-        self.current_ports = ports
-        if ports_lost:
-            p_str = "LOST PORT(s): " + str(ports_lost)
-            p_str = p_str.replace("{", '').replace("}", '').replace("'", '')
-            self.debug_text(p_str, color=COLOR_RED)
-        elif ports_found:
-            p_str = "FOUND PORT(s): " + str(ports_found)
-            p_str = p_str.replace("{", '').replace("}", '').replace("'", '')
-            self.debug_text(p_str, color=COLOR_GREEN)
-
-        current_selection = self.ui.comboBox_port.currentText()
-        self.ui.comboBox_port.clear()
-        self.ui.comboBox_port.addItems(self.current_ports)
-        if current_selection in self.current_ports:
-            self.ui.comboBox_port.setCurrentText(current_selection)
-
-        if self.target_port and self.is_connected == False:
-            if self.target_port in self.current_ports and self.ui.checkBox_auto_reconnect.isChecked():
-                self.handle_connect(self.target_port)
+        '''Bring the port list in line with a full listing of ports (i.e. from get_ports())'''
+        if ports is None:
+            return
+        added = {name: ports[name] for name in ports if name not in self.current_ports}
+        removed = [name for name in self.current_ports if name not in ports]
+        self.ports_changed(added, removed)
+
+    def ports_changed(self, added: dict, removed: list):
+        '''Apply the ports added and removed since the last change. The port list is edited, not rebuilt'''
+        added = {name: info for name, info in added.items() if name not in self.current_ports}
+        removed = [name for name in removed if name in self.current_ports]
+        if not added and not removed:
+            return
+        ports = {name: info for name, info in self.current_ports.items() if name not in removed}
+        ports.update(added)
+        self.current_ports = dict(sorted(ports.items(), key=lambda item: port_sort_key(item[0])))
+        if removed:
+            self.debug_text("LOST PORT(s): " + ", ".join(removed), color=COLOR_RED)
+        elif added:
+            self.debug_text("FOUND PORT(s): " + ", ".join(added), color=COLOR_GREEN)
+
+        for name in removed:
+            self.ui.comboBox_port.removeItem(self.ui.comboBox_port.findText(name))
+        placeholder = self.ui.comboBox_port.findText("None")
+        if placeholder >= 0 and "None" not in self.current_ports:
+            self.ui.comboBox_port.removeItem(placeholder)
+        for name in added:  # At its place in the sorted list
+            index = self.ui.comboBox_port.count()
+            while index > 0 and port_sort_key(self.ui.comboBox_port.itemText(index - 1)) > port_sort_key(name):
+                index -= 1
+            self.ui.comboBox_port.insertItem(index, name)
+
+        if self.session.reconnecting and added:
+            self.session.reconnect_now()
+
+        if self.target_port and self.is_connected == False and not self.session.reconnecting:
+            port = self.find_target_port()
+            if port and self.ui.checkBox_auto_reconnect.isChecked():
+                self.handle_connect(port)
+                if not self.is_connected and not self.replaying and port not in self.sessions:
+                    self.retry_connect()
+
+    def retry_connect(self):
+        '''The auto-connect device was plugged in, but could not be opened yet (i.e. udev still setting its permissions).
+        The session retries with backoff, as after a loss, and restored() finishes connecting'''
+        self.add_text(f"RETRYING {self.session.settings['port']}...\n", type=TYPE_INFO)
+        self.session.start_reconnect(self.port_restored.emit, lost=False)
 
     def show_ports(self, **kwargs):
         p_str = "PORTS: "
@@ -574,6 +952,56 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.add_text(p_str, type=TYPE_HELP)
 
+    def handle_virtual_command(self, **kwargs):
+        if '-h' in kwargs or not VIRTUAL_SUPPORTED:
+            self.add_text(VIRTUAL_HELP, type=TYPE_HELP)
+            if not VIRTUAL_SUPPORTED:
+                self.add_text("VIRTUAL PORTS NEED A PTY (LINUX/MACOS ONLY)\n", type=TYPE_ERROR)
+            return
+        if '-ls' in kwargs:
+            p_str = "-----VIRTUAL PORTS-----\n"
+            if not sk_virtual_port.devices:
+                p_str += "NONE"
+            for name, device in sk_virtual_port.devices.items():
+                stats = device.stats()
+                p_str += f"{name}\t{device.describe()}\tsent: {stats['tx_bytes']}  received: {stats['rx_bytes']}  dropped: {stats['dropped_bytes']}\n"
+            self.add_text(p_str, type=TYPE_HELP)
+            return
+        if '-rm' in kwargs:
+            name = kwargs['-rm']
+            if not name:
+                removing = list(sk_virtual_port.devices)
+            elif name in sk_virtual_port.devices:
+                removing = [name]
+            else:
+                self.add_text(f"NO VIRTUAL PORT '{name}'\n", type=TYPE_ERROR)
+                return
+            for name in removing:
+                sk_virtual_port.devices[name].stop()
+                self.add_text(f"VIRTUAL PORT {name} REMOVED\n", type=TYPE_INFO)
+            self.update_ports(get_ports())
+            self.rescan_worker.rescan()  # Other sessions learn of it from the rescanner
+            return
+
+        pattern = kwargs.get('-p') or PATTERN_KV
+        rate = get_number(kwargs.get('-r', DEFAULT_VIRTUAL_RATE), float, lower_limit=0)
+        values = get_number(kwargs.get('-n', DEFAULT_VIRTUAL_VALUES), int, lower_limit=1, upper_limit=255 // 4)
+        if rate is None or values is None:
+            self.add_text("VIRTUAL PORT: -r takes a rate >= 0, -n a count from 1 to 63\n", type=TYPE_ERROR)
+            return
+        responses = sk_virtual_port.parse_responses(kwargs['-s']) if kwargs.get('-s') else None
+        try:
+            device = VirtualDevice(pattern, rate, values, echo='-e' in kwargs, responses=responses, replay_file=kwargs.get('-f'))
+        except (ValueError, OSError) as E:
+            self.add_text(f"VIRTUAL PORT NOT CREATED: {E}\n", type=TYPE_ERROR)
+            return
+        device.start()
+        self.add_text(f"VIRTUAL PORT {device.name} CREATED ({device.describe()})\n", type=TYPE_INFO)
+        self.update_ports(get_ports())
+        self.rescan_worker.rescan()  # Other sessions learn of it from the rescanner
+        if '--con' in kwargs:
+            self.handle_connect(device.name)
+
 
 ########################################################################
 #
@@ -591,6 +1019,7 @@ class MainWindow(QtWidgets.QMainWindow):
                                 self.ui.checkBox_info_include_terminal,
                                 self.ui.checkBox_autoscroll,
                                 self.ui.checkBox_timestamp,
+                                self.ui.checkBox_ansi,
                                 self.ui.checkBox_allow_commands
                                 ]
 
@@ -602,6 +1031,9 @@ class MainWindow(QtWidgets.QMainWindow):
                                 self.ui.lineEdit_log_format,
                                 self.ui.lineEdit_command_char,
                                 self.ui.lineEdit_delay,
+                                self.ui.lineEdit_scrollback_lines,
+                                self.ui.lineEdit_scrollback_kb,
+                                self.ui.lineEdit_hex_width,
                                 ]
 
         self.log_save_line_edits = [self.ui.lineEdit_time_format,
@@ -612,6 +1044,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.save_combo_boxes = [self.ui.comboBox_baud,
                                  self.ui.comboBox_plot_type,
                                  self.ui.comboBox_limits,
+                                 self.ui.comboBox_view,
                                  ]
 
         for checkbox in self.save_checkboxes:
@@ -669,8 +1102,9 @@ class MainWindow(QtWidgets.QMainWindow):
             self._save_settings()
             return
         try:
-            with open(SETTINGS_FILE, 'r') as file:
-                self.current_settings = json.load(file)
+            if not self.current_settings:  # Otherwise already loaded by another session
+                with open(SETTINGS_FILE, 'r') as file:
+                    self.current_settings.update(json.load(file))
 
             if 'lineEdit_log_folder' in self.current_settings and not self.current_settings['lineEdit_log_folder']:
                 self.current_settings['lineEdit_log_folder'] = DEFAULT_LOG_FOLDER
@@ -729,7 +1163,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.cmd_list.append(Command("quit", quit))
         self.cmd_list.append(Command("exit", quit))
         self.cmd_list.append(Command("con", self.handle_connect, 1,
-                                     kw_options=['-b', '-d', '-x', '-r', '-p', '-h']))
+                                     kw_options=CONNECT_OPTIONS))
         self.cmd_list.append(Command("dcon", self.disconnect))
         self.cmd_list.append(Command("script", self.handle_script_command, 0,
                                      kw_options=['-f', '-h', '-o', '-t', '-n', '-rm', '-s', '-r', '-d', '-a', '-ls']))
@@ -744,6 +1178,12 @@ class MainWindow(QtWidgets.QMainWindow):
                                                  '-s', '--seps']))
         self.cmd_list.append(Command("key", self.handle_key_cmd, 0,
                                      kw_options=['-k', '-v', '-c', '-h']))
+        self.cmd_list.append(Command("virtual", self.handle_virtual_command, 0,
+                                     kw_options=['-h', '-p', '-r', '-n', '-e', '-f', '-s', '-ls', '-rm', '--con']))
+        self.cmd_list.append(Command("record", self.handle_record_command, 1, kw_options=['-h', '-s']))
+        self.cmd_list.append(Command("replay", self.handle_replay_command, 1, kw_options=['-h', '-x', '--max', '-s', '-ls']))
+        self.cmd_list.append(Command("stats", self.handle_stats_command, 0, kw_options=['-h']))
+        self.cmd_list.append(Command("view", self.handle_view_command, 1, kw_options=['-w', '-h']))
         self.cmd_list.append(Command("new", self.open_new_window, 1000))
         self.cmd_list.append(Command("cowsay", self.cowsay, 1000))
 
@@ -930,13 +1370,21 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.pushButton_send.setDisabled(True)
         self.ui.tabWidget.setCurrentIndex(0)
 
-        self.script_thread = QThread()
-        self.script_worker = ScriptWorker(text, delay, arg_str)
-        self.script_worker.moveToThread(self.script_thread)
-        self.script_thread.started.connect(self.script_worker.run)
-        self.script_worker.line.connect(self.script_line)
-        self.script_worker.finished.connect(self.end_script)
-        self.script_thread.start()
+        if self.session.backend == BACKEND_ASYNC:  # Run as a task on the shared event loop
+            from sk_async import AsyncScriptWorker
+            self.script_thread = None
+            self.script_worker = AsyncScriptWorker(text, delay, arg_str)
+            self.script_worker.line.connect(self.script_line)
+            self.script_worker.finished.connect(self.end_script)
+            self.script_worker.run()
+        else:
+            self.script_thread = QThread()
+            self.script_worker = ScriptWorker(text, delay, arg_str)
+            self.script_worker.moveToThread(self.script_thread)
+            self.script_thread.started.connect(self.script_worker.run)
+            self.script_worker.line.connect(self.script_line)
+            self.script_worker.finished.connect(self.end_script)
+            self.script_thread.start()
 
         vprint("RUNNING SCRIPT: ", text, color='yellow')
 
@@ -949,7 +1397,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.lineEdit_keyboard_control.setDisabled(False)
         self.ui.pushButton_send.setDisabled(False)
         self.ui.lineEdit_input.setFocus()
-        self.script_thread.exit()
+        if self.script_thread:
+            self.script_thread.exit()
         self.script_worker.stop()
         self.script_worker = None
         self.debug_text("SCRIPT ENDED", color=COLOR_GREEN)
@@ -986,7 +1435,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.list_files(DEFAULT_LOG_FOLDER)
             return
         if '-a' in kwargs:
-            self.log.archive(kwargs['-a'], self.ui.comboBox_log_name_extension.currentText())
+            self.session.log.archive(kwargs['-a'], self.ui.comboBox_log_name_extension.currentText())
             return
         if '--name' in kwargs:
             self.ui.lineEdit_log_name.setText(kwargs['--name'])
@@ -995,6 +1444,104 @@ class MainWindow(QtWidgets.QMainWindow):
         if '--fmt' in kwargs:
             self.ui.lineEdit_log_format.setText(kwargs['--fmt'])
 
+    def capture_path(self, name: str) -> str:
+        '''A file name, or a path. Names are in the log folder'''
+        path = name if os.path.dirname(name) else DEFAULT_LOG_FOLDER + name
+        if not path.endswith(CAPTURE_EXTENSION) and not os.path.isfile(path):
+            path += CAPTURE_EXTENSION
+        return path
+
+    def handle_record_command(self, *args, **kwargs):
+        if '-h' in kwargs:
+            self.add_text(RECORD_HELP, type=TYPE_HELP)
+            return
+        if '-s' in kwargs:
+            if not self.session.capture:
+                self.add_text("NOT RECORDING\n", type=TYPE_ERROR)
+            self.stop_capture()
+            return
+        if not self.is_connected:
+            self.add_text("ERR: CONNECT BEFORE RECORDING\n", type=TYPE_ERROR)
+            return
+        file_path = self.capture_path(args[0] if args else time.strftime("capture-%y-%m-%d-%H%M%S"))
+        try:
+            self.session.start_capture(file_path)
+        except OSError as E:
+            self.add_text(f"ERR: COULD NOT RECORD TO {file_path}: {E}\n", type=TYPE_ERROR)
+            return
+        self.capture_cursor.skip()  # Only what arrives from now on
+        self.add_text(f"RECORDING TO {file_path}\n", type=TYPE_INFO)
+
+    def stop_capture(self):
+        capture = self.session.capture
+        if not capture:
+            return
+        self.capture_cursor.drain(self.session.capture_rx, stamped=True)
+        self.session.stop_capture()
+        self.add_text(f"RECORDED {capture.bytes} BYTES ({capture.chunks} CHUNKS) TO {capture.file_path}\n", type=TYPE_INFO)
+
+    def handle_replay_command(self, *args, **kwargs):
+        if '-h' in kwargs:
+            self.add_text(REPLAY_HELP, type=TYPE_HELP)
+            return
+        if '-s' in kwargs:
+            if not self.replaying:
+                self.add_text("NOT REPLAYING\n", type=TYPE_ERROR)
+            self.stop_replay()
+            return
+        if '-ls' in kwargs:
+            self.list_files(DEFAULT_LOG_FOLDER)
+            return
+        if self.is_connected or self.replaying:
+            self.add_text("ERR: DISCONNECT BEFORE REPLAYING\n", type=TYPE_ERROR)
+            return
+        speed = 1
+        if '--max' in kwargs:
+            speed = REPLAY_MAX_SPEED
+        elif '-x' in kwargs:
+            speed = get_number(kwargs['-x'], float, None, lower_limit=0)
+            if not speed:
+                self.add_text(f"ERR: BAD SPEED '{kwargs['-x']}'\n", type=TYPE_ERROR)
+                return
+        if args:
+            file_path = self.capture_path(args[0])
+        else:
+            file_path = self.get_file(DEFAULT_LOG_FOLDER, f"Recordings (*{CAPTURE_EXTENSION})")
+        if not file_path:
+            return
+        if not os.path.isfile(file_path):
+            self.add_text(f"ERR: RECORDING {file_path} NOT FOUND\n", type=TYPE_ERROR)
+            return
+        self.rx_ready()  # Whatever the last port left in the ring belongs to it, not to the replay
+        self.replaying = True
+        self.session.log.set_port("REPLAY")
+        self.session.start_replay(file_path, speed, self.rx_ready, self.replay_tx, self.replay_finished)
+        self.set_terminal_style(STYLE_SHEET_TERMINAL_ACTIVE)
+        self.add_text(f"REPLAYING {file_path} AT {f'{speed:g}x' if speed else 'MAX'} SPEED\n", type=TYPE_INFO)
+        self.debug_text(f"REPLAYING {os.path.basename(file_path)}", color=COLOR_GREEN)
+
+    def replay_tx(self, data: bytes):
+        '''A recorded send. Shown (and logged) like one, but not sent'''
+        self.add_text(data.decode('utf-8', 'replace'), type=TYPE_TX)
+        self.add_hex(data, TYPE_TX)
+
+    def stop_replay(self):
+        if self.replaying:
+            self.session.worker.stop()  # replay_finished follows
+
+    def replay_finished(self, complete: bool):
+        worker = self.session.worker
+        self.session.stop_worker()
+        self.replaying = False
+        self.session.log.set_port("NONE")
+        self.set_terminal_style(STYLE_SHEET_TERMINAL_INACTIVE)
+        if worker.error:
+            self.add_text(f"ERR: REPLAY FAILED: {worker.error}\n", type=TYPE_ERROR)
+            return
+        self.add_text(f"REPLAY {'DONE' if complete else 'STOPPED'}: {worker.rx_bytes} BYTES RX, {worker.tx_bytes} BYTES TX. "
+                      f"{worker.recorded_time:.2f} s RECORDED, PLAYED IN {worker.elapsed:.2f} s\n", type=TYPE_INFO)
+        self.debug_text(f"REPLAY {'DONE' if complete else 'STOPPED'}")
+
     def set_log_folder(self, log_folder: str = None):
         if not log_folder:
             log_folder = self.get_directory(DEFAULT_LOG_FOLDER)
@@ -1016,8 +1563,11 @@ class MainWindow(QtWidgets.QMainWindow):
             self.ui.lineEdit_log_folder.setText(folder_path)
         port_name = None
         if self.is_connected:
-            port_name = ser.port
-        self.log = SK_Logger(folder_path, file_name + file_extension, time_fmt, log_fmt, port_name)
+            port_name = self.session.port
+        if self.session.log:
+            self.session.log.stop()
+        self.session.log = SK_Logger(folder_path, file_name + file_extension, time_fmt, log_fmt, port_name)
+        self.set_rx_encoding()
         self.ui.pushButton_restart_logger.setEnabled(False)
         self.ui.pushButton_restart_logger.setStyleSheet(STYLE_SHEET_BUTTON_INACTIVE)
 
@@ -1285,19 +1835,39 @@ class MainWindow(QtWidgets.QMainWindow):
         webbrowser.open(GITHUB_URL)
 
     def open_new_window(self, *args):
-        import platform
-        import subprocess
-
-        if platform.system() == 'Windows':
-            cmd = f'start pythonw.exe {INSTALL_FOLDER}/serial_killer.py '
-        elif platform.system() == 'Linux':
-            cmd = f'python3 {INSTALL_FOLDER}/serial_killer.py '
-
-        for arg in args:
-            cmd += arg + " "
-
-        print("OPENING NEW WINDOW ", cmd)
-        subprocess.call(cmd, shell=True)
+        '''Open another session in this process. Any args are run as a command in the new session'''
+        args = list(args)
+        if args and args[0] == '-c':
+            args.pop(0)
+        open_cmd = " ".join(args)
+        if self.tabs:
+            self.tabs.add_session(open_cmd)
+            return
+        window = MainWindow(open_cmd=open_cmd)
+        window.show()
+        self.extra_windows.append(window)
+
+    def close_session(self):
+        '''Release everything this session holds before its tab is closed'''
+        self.stats_timer.stop()
+        self.drain_timer.stop()
+        if self.script_worker:
+            self.end_script()
+        if self.replaying:
+            self.session.worker.stop()
+            self.session.stop_worker()
+        if self.is_connected:
+            self.disconnect()
+        self.session.stop_reconnect()
+        self.log_drain.stop()
+        self.session.log.stop()
+        self.ui.textEdit_terminal.close_history()
+        self.ui.textEdit_hex.close_history()
+        self.rescan_worker.ports_changed.disconnect(self.ports_changed)
+
+    def update_title(self):
+        if self.tabs:
+            self.tabs.update_title(self)
 
     def get_latest_file(self, directory: str):
         list_of_files = glob.glob(directory + "*.txt")
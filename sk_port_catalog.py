@@ -0,0 +1,172 @@
+'''
+Cached port enumeration with stable device identity.
+
+The catalog remembers what it learned about each port. On Linux a port is only described
+again (from sysfs) when its device node is new or was replaced. Each port gets an identity
+that survives replugging and renumbering (USB VID:PID:serial, else its /dev/serial/by-id
+link), and an alias index gives O(1) lookup by name, path, identity, serial number or by-id link.
+'''
+
+import glob
+import os
+import re
+import threading
+
+import serial.tools.list_ports as list_ports
+
+LINUX = hasattr(os, 'uname') and os.uname().sysname == "Linux"
+if LINUX:
+    from serial.tools.list_ports_linux import SysFS
+
+LINUX_PORT_PATTERNS = ['/dev/ttyS*', '/dev/ttyUSB*', '/dev/ttyXRUSB*', '/dev/ttyACM*',  # Same as pyserial's
+                       '/dev/ttyAMA*', '/dev/rfcomm*', '/dev/ttyAP*']
+LINK_FOLDERS = {'by-id': "/dev/serial/by-id", 'by-path': "/dev/serial/by-path"}
+
+
+def port_sort_key(device: str) -> tuple:
+    '''Natural order for any port name: COM2 < COM10, ttyUSB2 < ttyUSB10'''
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part.lower())
+                 for part in re.split(r'(\d+)', device) if part)
+
+
+def port_identity(port, by_id: str = None) -> str:
+    '''Names the physical device rather than the node it happens to be on'''
+    if port.vid is not None and port.serial_number:
+        identity = f"usb:{port.vid:04X}:{port.pid:04X}:{port.serial_number}"
+        if port.location and ':' in port.location:  # One interface of a multi-port adapter
+            identity += ":" + port.location.split(':')[-1]
+        return identity
+    if by_id:
+        return by_id
+    if port.vid is not None and port.location:
+        return f"usb:{port.vid:04X}:{port.pid:04X}@{port.location}"
+    return port.device
+
+
+def read_links(folder: str) -> dict:
+    '''Real device path: link path, for the links in folder'''
+    links = {}
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return links
+    for name in names:
+        path = os.path.join(folder, name)
+        links[os.path.realpath(path)] = path
+    return links
+
+
+class PortCatalog:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.ports = {}       # Device: port info dict
+        self.described = {}   # Device: (node signature, ListPortInfo or None if it is not a real port)
+        self.aliases = {}     # Lower case alias: device. None if the alias fits several devices
+
+    def refresh(self) -> dict:
+        '''Bring the catalog up to date. Returns device: port info for every port'''
+        with self.lock:
+            links = {kind: read_links(folder) for kind, folder in LINK_FOLDERS.items()}
+            if LINUX:
+                described = self.describe_linux()
+            else:
+                described = {port.device: (port.hwid, port) for port in list_ports.comports()}
+            ports = {}
+            for device, (signature, port) in described.items():
+                if port is None:
+                    continue
+                old = self.described.get(device)
+                info = self.ports.get(device)
+                by_id = links['by-id'].get(device)
+                if old and old[0] == signature and info and info['by-id'] == by_id:
+                    ports[device] = info  # Unchanged
+                else:
+                    ports[device] = self.port_info(port, by_id, links['by-path'].get(device))
+            self.described = described
+            self.ports = ports
+            self.aliases = self.index(ports)
+            return dict(ports)
+
+    def describe_linux(self) -> dict:
+        '''Only nodes that are new, or were removed and created again, are read from sysfs'''
+        described = {}
+        for pattern in LINUX_PORT_PATTERNS:
+            for device in glob.glob(pattern):
+                try:
+                    stat = os.stat(device)
+                except OSError:
+                    continue
+                signature = (stat.st_rdev, stat.st_ctime_ns)
+                old = self.described.get(device)
+                if old and old[0] == signature:
+                    described[device] = old
+                    continue
+                port = SysFS(device)
+                described[device] = (signature, None if port.subsystem == "platform" else port)  # Not present
+        return described
+
+    def port_info(self, port, by_id: str = None, by_path: str = None) -> dict:
+        return {
+            'descr': str(port.description),
+            'name': str(port.name),
+            'mfgr': str(port.manufacturer),
+            'hwid': str(port.hwid),
+            'vid': str(port.vid),
+            'pid': str(port.pid),
+            's/n': str(port.serial_number),
+            'numb': get_serial_port_number(port.device),
+            'id': port_identity(port, by_id),
+            'by-id': by_id,
+            'by-path': by_path,
+        }
+
+    def index(self, ports: dict) -> dict:
+        aliases = {}
+
+        def add(alias, device):
+            if not alias:
+                return
+            alias = alias.lower()
+            if aliases.get(alias, device) != device:
+                aliases[alias] = None  # Ambiguous, i.e. two adapters with the same serial number
+            else:
+                aliases[alias] = device
+
+        for device, info in ports.items():
+            add(device, device)
+            add(info['name'], device)
+            add(info['id'], device)
+            add(self.described[device][1].serial_number, device)
+            for link in (info['by-id'], info['by-path']):
+                if link:
+                    add(link, device)
+                    add(os.path.basename(link), device)
+        return aliases
+
+    def lookup(self, alias: str) -> str:
+        '''The device currently known by alias (name, path, identity, serial number or by-id link). None if unknown'''
+        if not alias:
+            return None
+        return self.aliases.get(alias.lower())
+
+    def identity(self, device: str) -> str:
+        info = self.ports.get(device)
+        if info is None:
+            return device
+        return info['id']
+
+
+def get_serial_port_number(input: str) -> int:
+    port_numb = 0
+    if "COM" in input:
+        try:
+            port_numb = int(input.replace("COM", ""))
+        except:
+            port_numb = -1
+    if "dev/ttyS" in input:
+        try:
+            port_numb = int(input.split("dev/ttyS")[1])
+        except:
+            port_numb = -1
+
+    return port_numb
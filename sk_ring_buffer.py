@@ -0,0 +1,167 @@
+'''
+Received data for a session is written once into a preallocated ring buffer by the reader.
+Each consumer (terminal, logger, plot, ...) reads it through its own RingCursor, getting
+memoryview slices of the ring rather than copies. A consumer that falls more than a full
+ring behind loses the oldest bytes, and the loss is counted on its cursor.
+
+The reader stamps every chunk it writes with the time it was read (monotonic and wall clock).
+Consumers get the stamps for the bytes they drain, so times reflect capture, not how long the
+data waited to be displayed, logged or plotted. A line takes the stamp of the chunk it starts in.
+'''
+
+import time
+from array import array
+from bisect import bisect_right
+
+DEFAULT_RING_SIZE = 4 * 1024 * 1024  # Bytes
+DEFAULT_STAMP_SLOTS = 65536  # Chunks remembered. Older bytes get the oldest stamp kept
+
+
+class RxRingBuffer:
+    '''One writer (the reader thread), any number of cursors'''
+
+    def __init__(self, size: int = DEFAULT_RING_SIZE, stamp_slots: int = DEFAULT_STAMP_SLOTS) -> None:
+        self.size = size
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.head = 0  # Total bytes ever written. The write position is head % size
+        self.cursors = {}
+        self.stamp_slots = stamp_slots
+        self.stamp_count = 0  # Chunks ever stamped. Chunk i is in slot i % stamp_slots
+        self.stamp_pos = array('q', bytes(8 * stamp_slots))  # Ring position of the chunk's first byte
+        self.stamp_mono = array('d', bytes(8 * stamp_slots))
+        self.stamp_wall = array('d', bytes(8 * stamp_slots))
+
+    def write(self, data, mono: float = None, wall: float = None):
+        '''Copy in a chunk read at mono (time.monotonic()) / wall (time.time()). Both default to now'''
+        n = len(data)
+        if not n:
+            return
+        slot = self.stamp_count % self.stamp_slots
+        self.stamp_pos[slot] = self.head
+        self.stamp_mono[slot] = time.monotonic() if mono is None else mono
+        self.stamp_wall[slot] = time.time() if wall is None else wall
+        self.stamp_count += 1
+        if n > self.size:  # Only the newest bytes fit
+            data = memoryview(data)[n - self.size:]
+            self.head += n - self.size
+            n = self.size
+        pos = self.head % self.size
+        first = min(n, self.size - pos)
+        self.view[pos:pos + first] = data[:first]
+        if first < n:
+            self.view[:n - first] = data[first:]
+        self.head += n  # Published last, so readers never see a half-written chunk
+
+    def stamps(self, start: int, end: int) -> list:
+        '''(offset from start, mono, wall) for each chunk in ring positions start..end. The first is at offset 0'''
+        count = self.stamp_count
+        if not count:
+            now = (time.monotonic(), time.time())
+            return [(0, *now)]
+        slots = self.stamp_slots
+        lo, hi = max(0, count - slots), count
+        while lo < hi:  # First chunk starting after start
+            mid = (lo + hi) // 2
+            if self.stamp_pos[mid % slots] <= start:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = max(lo - 1, count - slots, 0)
+        stamps = [(0, self.stamp_mono[first % slots], self.stamp_wall[first % slots])]
+        for i in range(first + 1, count):
+            slot = i % slots
+            pos = self.stamp_pos[slot]
+            if pos >= end:
+                break
+            stamps.append((pos - start, self.stamp_mono[slot], self.stamp_wall[slot]))
+        return stamps
+
+    def cursor(self, name: str) -> 'RingCursor':
+        '''A new cursor starting at the newest byte'''
+        cursor = RingCursor(self, name)
+        self.cursors[name] = cursor
+        return cursor
+
+    def clear(self):
+        for cursor in self.cursors.values():
+            cursor.skip()
+
+
+class RingCursor:
+    def __init__(self, ring: RxRingBuffer, name: str) -> None:
+        self.ring = ring
+        self.name = name
+        self.position = ring.head
+        self.overruns = 0       # Times this consumer fell a full ring behind
+        self.overrun_bytes = 0  # Bytes it never saw because of that
+        self.dropped_bytes = 0  # Bytes it chose to skip to catch up (see catch_up)
+
+    @property
+    def available(self) -> int:
+        return self.ring.head - self.position
+
+    def read(self, max_bytes: int = 0) -> list:
+        '''Up to two memoryview slices (two if the data wraps) covering everything new, or its oldest max_bytes.
+        Valid until the writer laps them'''
+        ring = self.ring
+        head = ring.head
+        behind = head - self.position
+        if behind > ring.size:
+            self.overruns += 1
+            self.overrun_bytes += behind - ring.size
+            self.position = head - ring.size
+        if max_bytes:
+            head = min(head, self.position + max_bytes)
+        if head == self.position:
+            return []
+        start = self.position % ring.size
+        end = start + (head - self.position)
+        self.position = head
+        if end <= ring.size:
+            return [ring.view[start:end]]
+        return [ring.view[start:], ring.view[:end - ring.size]]
+
+    def drain(self, consumer, stamped: bool = False, max_bytes: int = 0) -> int:
+        '''Pass each new slice to consumer(memoryview), or consumer(memoryview, stamps) if stamped (see RxRingBuffer.stamps).
+        With max_bytes, at most that many: the rest is left for the next call. Bytes overwritten while the consumer ran count as overrun'''
+        views = self.read(max_bytes)
+        total = sum(len(view) for view in views)
+        start = self.position - total
+        for view in views:
+            if stamped:
+                consumer(view, self.ring.stamps(start, start + len(view)))
+            else:
+                consumer(view)
+            lapped = self.ring.head - self.ring.size - start
+            if lapped > 0:
+                self.overruns += 1
+                self.overrun_bytes += min(lapped, len(view))
+            start += len(view)
+        return total
+
+    def skip(self) -> int:
+        '''Drop everything new, i.e. while the consumer is paused'''
+        skipped = self.available
+        self.position = self.ring.head
+        return skipped
+
+    def catch_up(self, max_behind: int) -> int:
+        '''Skip the oldest new bytes, leaving at most max_behind to read. Returns the bytes skipped'''
+        skipped = self.available - max_behind
+        if skipped <= 0:
+            return 0
+        self.position += skipped
+        self.dropped_bytes += skipped
+        return skipped
+
+
+def stamp_at(stamps: list, offset: int) -> tuple:
+    '''(offset, mono, wall) of the chunk holding byte offset'''
+    return stamps[max(0, bisect_right(stamps, (offset, float('inf'))) - 1)]
+
+
+def shift_stamps(stamps: list, consumed: int) -> list:
+    '''The stamps left once the first consumed bytes are gone. The first is moved to offset 0'''
+    first = max(0, bisect_right(stamps, (consumed, float('inf'))) - 1)
+    return [(max(0, offset - consumed), mono, wall) for offset, mono, wall in stamps[first:]]
@@ -0,0 +1,144 @@
+'''
+The script engine, without Qt, so scripts can also run headless (see sk_headless).
+'''
+
+import time
+
+from sk_tools import *
+
+
+class ScriptRunner:
+    '''Steps through a script. Each line goes to on_line(text, type), and on_finished() is called at the end.
+    Runs on whatever thread calls run(): see ScriptWorker (sk_scripting) for the GUI'''
+
+    def __init__(self, text: str = "", delay: int = DEFAULT_SCRIPT_DELAY, arg_str: str = "", on_line=None, on_finished=None) -> None:
+        self.on_line = on_line
+        self.on_finished = on_finished
+        self.on_exit_str = ""
+        self.arg_str = arg_str
+        self.delay = delay
+        vprint("SCRIPT DELAY:", self.delay)
+        self.lines: list = text.splitlines(False)
+        self.active = False
+        self.line_total = len(self.lines)
+        self.current_line_number = 0
+        self.loop_counter = 0
+        self.loop_start_line = None
+        self.loop_total = 0
+
+    def emit_line(self, text: str, type: int):
+        if self.on_line:
+            self.on_line(text, type)
+
+    def emit_finished(self):
+        if self.on_finished:
+            self.on_finished()
+
+    def send(self, text: str = None, type=TYPE_TX):
+        self.emit_line(text, type)
+        if type == TYPE_TX:
+            yield self.delay / 1000
+
+    def start_loop(self, loop_str: str):
+        loop_str = loop_str.replace("loop", "")
+        self.loop_start_line = self.current_line_number
+        if not loop_str:
+            self.loop_total = None
+            return
+        elif not loop_str.startswith("="):
+            return
+        l_number = get_number(loop_str[1:], int)
+        if l_number == None:
+            self.loop_start_line = None
+            eprint(f"LOOP NUMBER {loop_str[1:]} INVALID")
+            self.loop_counter = 0
+            self.loop_total = 0
+            return
+        if l_number < 0:
+            self.loop_counter = l_number
+            self.loop_total = 0
+            return
+        else:
+            self.loop_total = l_number
+            self.loop_counter = 0
+
+    def end_loop(self):
+        if self.loop_start_line == None:
+            return
+        if self.loop_total != None:
+            if self.loop_counter == self.loop_total - 1:
+                return
+        self.current_line_number = self.loop_start_line
+        self.loop_counter += 1
+        pass
+
+    def handle_command(self, text: str = None):
+        '''Generator. Yields each wait (seconds) the commands need'''
+        if not text:
+            return None
+
+        cmds = text.split("#")
+
+        for cmd in cmds:
+            if not cmd:
+                continue
+            cmd = cmd.strip()
+
+            if cmd.startswith("delay="):
+                self.delay = get_number(cmd[6:], int, self.delay)
+
+            if cmd.startswith("info="):
+                yield from self.send(cmd[5:] + "\n", TYPE_INFO)
+
+            elif cmd.startswith("error="):
+                yield from self.send(cmd[6:] + "\n", TYPE_ERROR)
+
+            elif cmd.startswith("pause="):
+                yield get_number(cmd[6:]) / 1000
+
+            elif cmd.startswith("loop"):
+                self.start_loop(cmd)
+
+            elif cmd.startswith("endloop"):
+                self.end_loop()
+
+            elif cmd.startswith("end"):
+                self.emit_finished()
+                yield .01
+
+            else:
+                yield from self.send(cmd, TYPE_CMD)
+
+    def evaluate(self, line: str):
+        '''Generator. Yields each wait (seconds) the line needs'''
+        if "//" in line:  # Comment
+            line = line.split("//")[0]
+            if not line.replace(" ", ""):
+                return
+        line = line.replace("$LOOP", str(abs(self.loop_counter)))
+
+        if line.strip().startswith("#"):
+            yield from self.handle_command(line)
+            return
+
+        yield from self.send(line)
+        return
+
+    def steps(self):
+        '''Generator over the whole script. Yields the time to wait before continuing'''
+        while self.active and self.current_line_number != self.line_total:
+            yield from self.evaluate(self.lines[self.current_line_number])
+            self.current_line_number += 1
+
+    def run(self):
+        self.active = True
+        for wait in self.steps():
+            time.sleep(wait)
+        self.emit_finished()
+
+    def stop(self):
+        if self.on_exit_str:
+            for wait in self.handle_command(self.on_exit_str):  # Waited here, as before scripts ran as steps
+                time.sleep(wait)
+        self.active = False
+        vprint("SCRIPT DONE")
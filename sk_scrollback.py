@@ -0,0 +1,103 @@
+'''
+Terminal history spilled to disk, so hours of output can be scrolled back through in constant memory.
+
+Two temporary files, written at the end only (deleted when closed):
+
+    data:  per run of one text type and style: type (uint8) | fg, bg (rgba, uint32 LE) | attributes (uint8) | length (uint32 LE) | text (UTF-8)
+    index: per line: offset of its first run in data (uint64 LE)
+
+Runs are split at line breaks, so a line is the runs from its index offset to the next one. The
+last line may be partial: it can be erased (ESC[2K) by cutting both files back to where it starts.
+Reading pages memory-maps both files, so only the pages read are loaded, and the OS may drop them.
+'''
+
+import mmap
+import struct
+import tempfile
+
+from sk_ansi import PLAIN
+from sk_tools import *
+
+RUN = struct.Struct("<BIIBI")  # Text type (TYPE_RX, ...), style (fg, bg, attributes, see sk_ansi), length
+OFFSET = struct.Struct("<Q")
+
+
+class ScrollbackFile:
+    '''Lines of typed text. Append from one thread (the GUI's)'''
+
+    def __init__(self, folder: str = None) -> None:
+        self.data = tempfile.TemporaryFile(prefix="sk-scrollback-", dir=folder)
+        self.index = tempfile.TemporaryFile(prefix="sk-scrollback-index-", dir=folder)
+        self.size = 0  # Bytes in data
+        self.lines = 0  # Lines started. The last may be partial
+        self.line_start = True  # The next text starts a new line
+        self.line_offset = 0  # Where the last line starts in data
+
+    def append(self, text: str, type: int = TYPE_RX, style: tuple = PLAIN):
+        '''text: lines separated by \\n only'''
+        data = []
+        index = []
+        pieces = text.split('\n')
+        last = len(pieces) - 1
+        for number, piece in enumerate(pieces):
+            if number < last:
+                piece += '\n'
+            if not piece:
+                continue
+            if self.line_start:
+                index.append(OFFSET.pack(self.size))
+                self.line_offset = self.size
+                self.lines += 1
+            encoded = piece.encode('utf-8', 'surrogatepass')
+            data.append(RUN.pack(type, *style, len(encoded)))
+            data.append(encoded)
+            self.size += RUN.size + len(encoded)
+            self.line_start = piece.endswith('\n')
+        self.data.write(b"".join(data))
+        self.index.write(b"".join(index))
+
+    def read_lines(self, first: int, last: int) -> list:
+        '''Lines first to last (not included), each a list of (type, style, text) runs. Line breaks are kept'''
+        first, last = max(0, first), min(last, self.lines)
+        if first >= last:
+            return []
+        self.data.flush()
+        self.index.flush()
+        with mmap.mmap(self.index.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            start = OFFSET.unpack_from(index, first * OFFSET.size)[0]
+            end = OFFSET.unpack_from(index, last * OFFSET.size)[0] if last < self.lines else self.size
+            line_starts = {OFFSET.unpack_from(index, number * OFFSET.size)[0] for number in range(first, last)}
+        lines = []
+        with mmap.mmap(self.data.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = start
+            while position < end:
+                if position in line_starts:
+                    lines.append([])
+                type, fg, bg, attributes, length = RUN.unpack_from(data, position)
+                position += RUN.size
+                lines[-1].append((type, (fg, bg, attributes), data[position:position + length].decode('utf-8', 'surrogatepass')))
+                position += length
+        return lines
+
+    def erase_line(self):
+        '''Remove the last line, if partial'''
+        if self.line_start:
+            return
+        self.lines -= 1
+        self.truncate(self.line_offset, self.lines)
+
+    def clear(self):
+        self.truncate(0, 0)
+
+    def truncate(self, size: int, lines: int):
+        self.data.truncate(size)
+        self.data.seek(size)
+        self.index.truncate(lines * OFFSET.size)
+        self.index.seek(lines * OFFSET.size)
+        self.size = self.line_offset = size
+        self.lines = lines
+        self.line_start = True
+
+    def close(self):
+        self.data.close()
+        self.index.close()
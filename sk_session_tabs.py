@@ -0,0 +1,53 @@
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+import sk_virtual_port
+from sk_main_window import MainWindow
+from sk_tools import *
+
+
+class SessionTabs(QtWidgets.QTabWidget):
+    '''Top level window. Each tab is a full MainWindow with its own port, terminal, plot and logger'''
+
+    def __init__(self, open_cmd: str = "") -> None:
+        super().__init__()
+        self.setTabsClosable(True)
+        self.setMovable(True)
+        self.setDocumentMode(True)
+        self.tabCloseRequested.connect(self.close_session)
+        self.add_session(open_cmd)
+        self.setWindowTitle(self.widget(0).windowTitle())
+
+    def add_session(self, open_cmd: str = "") -> MainWindow:
+        window = MainWindow(open_cmd=open_cmd, tabs=self)
+        window.setWindowFlags(QtCore.Qt.Widget)
+        index = self.addTab(window, "")
+        self.update_title(window)
+        self.setCurrentIndex(index)
+        self.tabBar().setVisible(self.count() > 1)
+        window.ui.lineEdit_input.setFocus()
+        vprint(f"SESSION {index} OPENED", color='green')
+        return window
+
+    def update_title(self, window: MainWindow):
+        index = self.indexOf(window)
+        if index < 0:
+            return
+        if window.is_connected:
+            self.setTabText(index, window.session.port)
+        else:
+            self.setTabText(index, "No Port")
+
+    def close_session(self, index: int):
+        window: MainWindow = self.widget(index)
+        window.close_session()
+        self.removeTab(index)
+        window.deleteLater()
+        self.tabBar().setVisible(self.count() > 1)
+        if not self.count():
+            self.close()
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        for index in range(self.count()):
+            self.widget(index).close_session()
+        sk_virtual_port.stop_all()  # Shared by every session, so stopped once they are closed
+        return super().closeEvent(event)
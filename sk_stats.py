@@ -0,0 +1,142 @@
+'''
+Live throughput and health statistics of a session ('stats' command and the status bar).
+
+The counters are plain attributes, each written by one thread only: the reader counts what
+it reads, the TX side what it sends and the consumer what it handles. Nothing is locked, so
+they are always on. StatsSampler turns two snapshots into per-second rates. It runs on the
+consumer's thread (the GUI's), about once a second.
+'''
+
+import time
+
+STATS_INTERVAL = 1     # Seconds between samples
+STATS_TICK = .1        # Seconds between GUI lag checks. The lag is how late a tick arrives
+RATE_COUNTERS = ('rx_bytes', 'rx_lines', 'rx_reads', 'tx_bytes', 'tx_lines')
+
+
+class StatsSampler:
+    '''Per-second rates of a session's counters, plus any counters passed to sample()'''
+
+    def __init__(self, session) -> None:
+        self.session = session
+        self.last_time = time.monotonic()
+        self.last = self.snapshot()
+        self.stats: dict = self.sample()
+
+    def snapshot(self, extra: dict = None) -> dict:
+        counters = {name: getattr(self.session, name) for name in RATE_COUNTERS}
+        counters.update(extra or {})
+        return counters
+
+    def sample(self, **extra) -> dict:
+        '''extra: more running totals (i.e. seconds spent plotting), rated like the session counters'''
+        now = time.monotonic()
+        counters = self.snapshot(extra)
+        elapsed = now - self.last_time
+        rates = {name: (value - self.last.get(name, value)) / elapsed if elapsed > 0 else 0.0
+                 for name, value in counters.items()}
+        self.last, self.last_time = counters, now
+
+        session = self.session
+        ring = session.ring
+        cursors = list(ring.cursors.values())
+        reads = rates['rx_reads']
+        self.stats = {
+            'interval': elapsed,
+            'rates': rates,
+            'totals': counters,
+            'chunk': rates['rx_bytes'] / reads if reads else 0.0,
+            'emit_queue': session.rx_batches - session.rx_batches_handled,
+            'tx': session.tx.stats(),
+            'backlog': {cursor.name: ring.head - cursor.position for cursor in cursors},
+            'log_backlog': 0,
+            'overrun': {cursor.name: cursor.overrun_bytes for cursor in cursors},
+            'dropped': {cursor.name: cursor.dropped_bytes for cursor in cursors if cursor.dropped_bytes},
+            'drop_policy': session.drop_policy,
+            'reconnect_lost': session.bytes_lost,
+            'waiting_max': session.rx_waiting_max,
+            'capacity': session.rx_capacity,
+            'buffer_full': session.rx_buffer_full,
+            'line_errors': dict(session.line_errors) if session.line_counts is not None else None,
+            'driver_lost': driver_lost(session),
+        }
+        if session.log and 'log' in ring.cursors:  # Bytes not in the log file yet: unread, plus a partial line
+            self.stats['log_backlog'] = ring.head - ring.cursors['log'].position + len(session.log.buffer)
+        self.stats['lost'] = sum(self.stats['overrun'].values()) + session.bytes_lost + self.stats['driver_lost']
+        return self.stats
+
+
+def driver_lost(session) -> int:
+    '''Bytes the driver counted as dropped: hardware (UART) overruns and tty buffer overruns'''
+    return session.line_errors.get('overrun', 0) + session.line_errors.get('buf_overrun', 0)
+
+
+def loss_events(session, reported: dict) -> list:
+    '''Messages for data lost, likely lost or skipped since the last call. reported holds the counts already reported, and is updated'''
+    events = []
+
+    def report(key: str, count: int, message: str):
+        new = count - reported.get(key, 0)
+        if new > 0:
+            reported[key] = count
+            events.append(message.format(new))
+
+    for cursor in list(session.ring.cursors.values()):
+        report(cursor.name, cursor.overrun_bytes, f"RX OVERRUN: {cursor.name.upper()} FELL BEHIND AND LOST {{}} BYTES")
+        report(cursor.name + ".dropped", cursor.dropped_bytes, f"{cursor.name.upper()} SKIPPED {{}} BYTES TO CATCH UP")
+    report('driver', driver_lost(session), "RX OVERRUN: THE DRIVER DROPPED {} BYTES")
+    report('line', session.line_errors.get('frame', 0) + session.line_errors.get('parity', 0),
+           "{} FRAMING/PARITY ERRORS (CHECK THE BAUD RATE, PARITY AND WIRING)")
+    report('full', session.rx_buffer_full,
+           f"RX BUFFER FULL {{}} TIMES ({session.rx_waiting_max} BYTES WAITING): THE READER WAS LATE, DATA LIKELY LOST")
+    return events
+
+
+def format_bytes(count: float) -> str:
+    for unit in ("B", "kB", "MB"):
+        if abs(count) < 1000 or unit == "MB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1000
+
+
+def status_text(stats: dict, gui_lag: float = 0.0) -> str:
+    '''One line for the status bar'''
+    rates = stats['rates']
+    text = (f"RX {format_bytes(rates['rx_bytes'])}/s {rates['rx_lines']:.0f} l/s | "
+            f"TX {format_bytes(rates['tx_bytes'])}/s | Queue {stats['emit_queue']} | Lag {gui_lag * 1000:.0f} ms")
+    if stats['lost']:
+        text += f" | Lost {format_bytes(stats['lost'])}"
+    return text
+
+
+def stats_report(stats: dict, port: str = None, gui_lag: float = 0.0, plot_time: float = None) -> str:
+    '''The 'stats' command. gui_lag in seconds, plot_time in seconds spent parsing per second'''
+    rates = stats['rates']
+    totals = stats['totals']
+    tx = stats['tx']
+    lost = [f"{name.upper()} {count}" for name, count in stats['overrun'].items()]
+    lost += [f"DRIVER {stats['driver_lost']}", f"RECONNECT {stats['reconnect_lost']}"]
+    lines = [
+        f"STATS {port or 'NOT CONNECTED'} (LAST {stats['interval']:.1f} s)",
+        f"  RX: {format_bytes(rates['rx_bytes'])}/s, {rates['rx_lines']:.0f} LINES/s, {rates['rx_reads']:.0f} READS/s "
+        f"(AVG CHUNK {format_bytes(stats['chunk'])}). TOTAL {totals['rx_bytes']} BYTES, {totals['rx_lines']} LINES",
+        f"  TX: {format_bytes(rates['tx_bytes'])}/s, {rates['tx_lines']:.0f} LINES/s. TOTAL {totals['tx_bytes']} BYTES, "
+        f"{tx['depth']} SENDS QUEUED ({format_bytes(tx['in_flight'])} IN FLIGHT)",
+        f"  TX LATENCY: LAST {tx['last_latency'] * 1000:.1f} ms, AVG {tx['avg_latency'] * 1000:.1f} ms, "
+        f"MAX {tx['max_latency'] * 1000:.1f} ms",
+        f"  EMIT QUEUE: {stats['emit_queue']} BATCHES. GUI LAG: {gui_lag * 1000:.1f} ms",
+        f"  LOG BACKLOG: {format_bytes(stats['log_backlog'])}",
+    ]
+    if plot_time is not None:
+        lines.append(f"  PLOT PARSE: {plot_time * 1000:.1f} ms/s, {rates.get('plot_lines', 0):.0f} LINES/s")
+    capacity = f" OF {stats['capacity']} BYTES, FULL {stats['buffer_full']} TIMES" if stats['capacity'] else " BYTES"
+    errors = stats['line_errors']
+    if errors is None:
+        errors = "ERRORS NOT COUNTED BY THIS DRIVER"
+    else:
+        errors = ", ".join(f"{name.upper()} {errors.get(name, 0)}" for name in ('overrun', 'buf_overrun', 'frame', 'parity', 'break'))
+    lines.append(f"  DRIVER: HIGH WATER {stats['waiting_max']}{capacity}. {errors}")
+    lines.append(f"  LOST: {stats['lost']} BYTES ({', '.join(lost)})")
+    dropped = ", ".join(f"{name.upper()} {count}" for name, count in stats['dropped'].items()) or "NONE"
+    lines.append(f"  SKIPPED TO CATCH UP (--drop {stats['drop_policy']}): {dropped}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,336 @@
+'''
+The terminal: a QPlainTextEdit with a bounded scrollback, drawn once a frame.
+
+write() only stages text. Every FRAME_INTERVAL the staged runs (text of one type) are inserted
+at the end in one edit, the scrollback trimmed and the view scrolled once, so the layout runs
+about 60 times a second however many chunks arrive.
+
+QPlainTextEdit lays out only the lines in view, so inserting and scrolling cost the same however
+long the session has run. Past max_lines lines or max_chars characters (for data with few line
+breaks), the oldest text is evicted in one cut, TRIM_SLACK more than needed, so the cost of
+evicting is spread over the inserts that follow.
+
+Received text (TYPE_RX) goes through an AnsiParser, unless set_ansi(False): its colors become runs
+of that style, and line erases remove the current line.
+
+With keep_history(), everything written is also spilled to a ScrollbackFile. Scrolling to the top
+pages older lines back in from it (and drops lines from the bottom); the terminal is then
+detached: new text only goes to the file, until scrolling back down pages it in.
+'''
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QColor, QFont, QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+
+from sk_ansi import BOLD, ERASE_LINE, INVERSE, ITALIC, NEW_LINE, PLAIN, UNDERLINE, AnsiParser
+from sk_gui_tools import *
+from sk_scrollback import ScrollbackFile
+
+DEFAULT_SCROLLBACK_LINES = 10000
+DEFAULT_SCROLLBACK_KB = 4096  # Thousands of characters
+TRIM_SLACK = .1  # Past a limit, evict this fraction of it more, so the terminal is not trimmed on every insert
+FRAME_INTERVAL = 16  # ms from the first write to the flush that draws it
+PAGE_LINES = 500  # Lines paged in from the history at a time, at most half of max_lines
+MAX_FORMATS = 4096  # Char formats cached (one per text type and style seen)
+
+TYPE_COLORS = {
+    TYPE_RX: COLOR_WHITE,
+    TYPE_TX: COLOR_LIGHT_BLUE,
+    TYPE_INFO: COLOR_LIGHT_GREEN,
+    TYPE_WARNING: COLOR_LIGHT_YELLOW,
+    TYPE_ERROR: COLOR_LIGHT_RED,
+    TYPE_CMD: COLOR_LIGHT_BLUE,
+    TYPE_HELP: COLOR_LIGHT_YELLOW,
+}
+
+
+class Terminal(QPlainTextEdit):
+    '''Keeps the parts of QTextEdit's interface the terminal used (setText)'''
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.setUndoRedoEnabled(False)  # Otherwise every insert is kept a second time, forever
+        self.max_lines = 0
+        self.max_chars = 0
+        self.autoscroll = True
+        self.pending = []  # [(type, style), [text, ...]] runs waiting for the next flush
+        self.pending_chars = 0
+        self.erase_drawn = False  # Erase the last line drawn on the next flush
+        self.after_cr = False  # The last text written ended with \r: a \n starting the next is the same line break
+        self.ansi = AnsiParser()
+        self.formats = {}  # (type, style): QTextCharFormat
+        self.history = None
+        self.first_line = 0  # History line of the first block
+        self.last_line = 0  # History line after the last block
+        self.live = True  # The last block is the end of the history
+        self.paging = False
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FRAME_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
+        self.set_scrollback(DEFAULT_SCROLLBACK_LINES, DEFAULT_SCROLLBACK_KB)
+
+    def keep_history(self, folder: str = None):
+        '''Spill everything written to a temporary file in folder (default: the system's), to page it back in'''
+        if self.history is None:
+            self.history = ScrollbackFile(folder)
+            self.verticalScrollBar().valueChanged.connect(self.scrolled)
+        self.setText("")
+
+    def close_history(self):
+        if self.history is not None:
+            self.verticalScrollBar().valueChanged.disconnect(self.scrolled)
+            self.history.close()
+            self.history = None
+
+    def set_ansi(self, enabled: bool):
+        '''Render ANSI escapes in received text, or show them as they are'''
+        self.ansi = AnsiParser() if enabled else None
+
+    def reset_ansi(self):
+        '''Received text was skipped: forget the style and any unfinished sequence'''
+        if self.ansi is not None:
+            self.ansi.reset()
+
+    def set_scrollback(self, lines: int = DEFAULT_SCROLLBACK_LINES, kb: int = DEFAULT_SCROLLBACK_KB):
+        '''Keep at most lines lines and kb thousand characters. 0 = no limit'''
+        self.max_lines = max(0, lines)
+        self.max_chars = max(0, kb) * 1000
+        self.first_line += self.trim()
+        self.update_lines()
+
+    def setText(self, text: str):
+        self.discard_pending()
+        self.erase_drawn = False
+        self.after_cr = False
+        self.first_line = self.last_line = 0
+        self.live = True
+        if self.history is not None:
+            self.history.clear()
+        self.setPlainText("")
+        if text:
+            self.write(text)
+            self.flush()
+
+    def clear(self):
+        self.setText("")
+
+    def write(self, text: str, type: int = TYPE_RX):
+        '''Add text at the end on the next frame, in the color of its type (TYPE_RX, ...)'''
+        if type != TYPE_RX or self.ansi is None:
+            self.stage(text, (type, PLAIN))
+            return
+        for item in self.ansi.feed(text):
+            if item is ERASE_LINE:
+                self.erase_line()
+            elif item is NEW_LINE:
+                if not self.at_line_start():
+                    self.stage('\n', (type, PLAIN))
+            else:
+                self.stage(item[1], (type, item[0]))
+
+    def stage(self, text: str, key: tuple):
+        if self.after_cr and text[:1] == '\n':
+            text = text[1:]
+        if not text:
+            return
+        self.after_cr = text.endswith('\r')
+        # Every line break QTextDocument starts a block at, as \n, so the blocks are the history's lines
+        text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\u2029', '\n')
+        if self.pending and self.pending[-1][0] == key:
+            self.pending[-1][1].append(text)
+        else:
+            self.pending.append([key, [text]])
+        self.pending_chars += len(text)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def at_line_start(self) -> bool:
+        '''True if the next text written starts a new line'''
+        if self.pending:
+            return self.pending[-1][1][-1].endswith('\n')
+        if self.erase_drawn:
+            return True
+        if self.history is not None:
+            return self.history.line_start
+        document = self.document()
+        count = document.characterCount()
+        return count <= 1 or document.characterAt(count - 2) == '\u2029'
+
+    def erase_line(self):
+        '''Remove the current line: from the staged text, and if it started before, from the terminal and the history'''
+        for index in range(len(self.pending) - 1, -1, -1):
+            text = "".join(self.pending[index][1])
+            line_break = text.rfind('\n')
+            if line_break >= 0:
+                self.pending[index][1] = [text[:line_break + 1]]
+                del self.pending[index + 1:]
+                self.pending_chars = sum(len(text) for key, texts in self.pending for text in texts)
+                return
+        self.discard_pending()
+        self.erase_drawn = True
+        self.flush_timer.start()
+
+    def discard_pending(self):
+        self.flush_timer.stop()
+        self.pending = []
+        self.pending_chars = 0
+
+    def flush(self):
+        '''Insert everything written since the last frame in one edit, then trim and scroll once'''
+        if not self.pending and not self.erase_drawn:
+            return
+        runs = [(key, "".join(texts)) for key, texts in self.pending]
+        skip = self.pending_chars - self.max_chars if self.max_chars else 0  # Text that would be trimmed at once is never drawn
+        erase, self.erase_drawn = self.erase_drawn, False
+        self.discard_pending()
+        if self.history is not None:
+            if erase:
+                self.history.erase_line()
+            for (type, style), text in runs:
+                self.history.append(text, type, style)
+            if not self.live:  # Paged in when scrolled down to
+                return
+        self.paging = True
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        if erase:
+            cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        for key, text in runs:
+            if skip > 0:
+                text, skip = text[skip:], skip - len(text)
+            if text:
+                cursor.insertText(text, self.char_format(key))
+        cursor.endEditBlock()
+        self.trim()
+        self.update_lines()
+        if self.autoscroll:
+            scroll_bar = self.verticalScrollBar()
+            scroll_bar.setValue(scroll_bar.maximum())
+        self.paging = False
+
+    def char_format(self, key: tuple) -> QTextCharFormat:
+        '''The format of text of a type (TYPE_RX, ...) and style (see sk_ansi)'''
+        char_format = self.formats.get(key)
+        if char_format is not None:
+            return char_format
+        type, (fg, bg, attributes) = key
+        foreground = QColor.fromRgba(fg) if fg else TYPE_COLORS.get(type, COLOR_WHITE)
+        background = QColor.fromRgba(bg) if bg else None
+        if attributes & INVERSE:
+            foreground, background = background or COLOR_BLACK, foreground
+        char_format = QTextCharFormat()
+        char_format.setForeground(foreground)
+        if background is not None:
+            char_format.setBackground(background)
+        if attributes & BOLD:
+            char_format.setFontWeight(QFont.Bold)
+        if attributes & ITALIC:
+            char_format.setFontItalic(True)
+        if attributes & UNDERLINE:
+            char_format.setFontUnderline(True)
+        if len(self.formats) >= MAX_FORMATS:  # i.e. a 24-bit color gradient
+            self.formats.clear()
+        self.formats[key] = char_format
+        return char_format
+
+    def trim(self) -> int:
+        '''Evict the oldest lines past max_lines, then the oldest text past max_chars (up to a line break if one is close).
+        Returns the number of whole lines evicted'''
+        document = self.document()
+        count = document.characterCount()
+        end = 0
+        if self.max_lines and document.blockCount() > self.max_lines:
+            end = document.findBlockByNumber(document.blockCount() - self.max_lines + int(self.max_lines * TRIM_SLACK)).position()
+        if self.max_chars and count - end > self.max_chars:
+            slack = int(self.max_chars * TRIM_SLACK)
+            end = count - self.max_chars + slack
+            block = document.findBlock(end)
+            block_end = block.position() + block.length()
+            if block_end - end <= slack and block_end < count:
+                end = block_end
+        end = min(end, count - 1)
+        if end <= 0:
+            return 0
+        lines = document.findBlock(end).blockNumber()
+        cursor = QTextCursor(document)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        return lines
+
+    def update_lines(self):
+        '''While live, the blocks are the last lines of the history (and an empty block after a final line break)'''
+        if self.history is not None and self.live:
+            self.last_line = self.history.lines
+            self.first_line = max(0, self.last_line - self.document().blockCount() + self.history.line_start)
+
+    def scrolled(self, value: int):
+        if self.paging:
+            return
+        scroll_bar = self.verticalScrollBar()
+        if value == scroll_bar.minimum() and self.first_line > 0:
+            self.page_up()
+        elif value == scroll_bar.maximum() and not self.live:
+            self.page_down()
+
+    def insert_lines(self, cursor: QTextCursor, lines: list):
+        for runs in lines:
+            for type, style, text in runs:
+                cursor.insertText(text, self.char_format((type, style)))
+
+    def page_size(self) -> int:
+        '''Lines paged in at a time: PAGE_LINES, or fewer so a page fits in max_lines with the lines in view'''
+        return max(1, min(PAGE_LINES, self.max_lines // 2)) if self.max_lines else PAGE_LINES
+
+    def page_up(self):
+        '''Page in up to page_size() lines before the first block. The first block is read again, as it may have been cut short'''
+        self.paging = True
+        first = max(0, self.first_line - self.page_size())
+        lines = self.history.read_lines(first, self.first_line + 1)
+        if self.first_line < self.history.lines and lines[-1][-1][2].endswith('\n'):  # The first block keeps its own line break
+            type, style, text = lines[-1][-1]
+            lines[-1][-1] = (type, style, text[:-1])
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+        self.insert_lines(cursor, lines)
+        cursor.endEditBlock()
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + self.first_line - first)
+        self.first_line = first
+        self.trim_bottom()
+        self.paging = False
+
+    def trim_bottom(self):
+        '''Drop the newest lines past max_lines. The terminal is detached from the end of the history until paged down to it'''
+        document = self.document()
+        if not self.max_lines or document.blockCount() <= self.max_lines + 1:
+            return
+        self.live = False
+        self.last_line = self.first_line + self.max_lines
+        cursor = QTextCursor(document)
+        cursor.setPosition(document.findBlockByNumber(self.max_lines).position())
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def page_down(self):
+        '''Page in up to page_size() lines after the last block. Reaching the end of the history, the terminal is live again'''
+        self.paging = True
+        last = min(self.last_line + self.page_size(), self.history.lines)
+        lines = self.history.read_lines(self.last_line, last)
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        self.insert_lines(cursor, lines)
+        cursor.endEditBlock()
+        self.last_line = last
+        self.live = last == self.history.lines
+        scroll_bar = self.verticalScrollBar()
+        value = scroll_bar.value()
+        removed = self.trim()
+        self.first_line += removed
+        scroll_bar.setValue(value - removed)
+        self.update_lines()
+        self.paging = False
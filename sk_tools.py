@@ -3,9 +3,6 @@ import platform
 from termcolor import cprint
 from datetime import date, datetime
 
-from PyQt5.QtGui import QColor
-from PyQt5.QtWidgets import QFileDialog
-
 DATE_TODAY = date.today()
 
 USER_OS = platform.system()
@@ -18,28 +15,6 @@ SETTINGS_FILE = INSTALL_FOLDER + "/user_settings.json"
 SCRIPT_FOLDER = INSTALL_FOLDER + "/scripts/"
 DEFAULT_LOG_FOLDER = INSTALL_FOLDER + "/logs/"
 
-# COLORS
-COLOR_WHITE = QColor(255, 255, 255)
-COLOR_LIGHT_GREY = QColor(220, 220, 220)
-COLOR_GREY = QColor(155, 155, 155)
-COLOR_MED_DARK_GREY = QColor(100, 100, 100)
-COLOR_DARK_GREY = QColor(79, 79, 79)
-COLOR_BLACK = QColor(0, 0, 0)
-
-COLOR_DARK_BLUE = QColor(0, 0, 255)
-COLOR_LIGHT_BLUE = QColor(105, 207, 255)
-
-COLOR_LIGHT_GREEN = QColor(97, 255, 142)
-COLOR_GREEN = QColor(24, 160, 0)
-
-COLOR_RED = QColor(218, 0, 0)
-COLOR_LIGHT_RED = QColor(255, 110, 110)
-COLOR_DARK_RED = QColor(36, 0, 0)
-
-COLOR_LIGHT_YELLOW = QColor(248, 252, 121)
-COLOR_DARK_YELLOW = QColor(138, 140, 0)
-
-
 ARROW_LEFT = "L"
 ARROW_RIGHT = "R"
 ARROW_DOWN = "D"
@@ -106,25 +81,6 @@ def get_timestamp():
     return datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
 
 
-def find_file(self, start_directory: str, file_name: str = None, file_extension: str = '.txt'):
-    '''opens a popup if file_name == None. Returns "" if cancel. Returns None if no file found'''
-    if file_name == None or file_name == False:
-        file_path = QFileDialog.getOpenFileName(
-            self, "Open", directory=start_directory, filter="*"+file_extension)[0]
-        return file_path
-    file_name = file_name.replace(file_extension, "")
-    return_path = start_directory + str(file_name) + file_extension
-    if os.path.exists(return_path):
-        return return_path
-    else:
-        return None
-
-
-def colorToStyleSheet(color: QColor) -> str:
-    fmtcolor = f"rgb({color.red()}, {color.green()}, {color.blue()})"
-    return fmtcolor
-
-
 def get_cow(*args, **kwargs):
     from sk_help import COW_BORED, COW_DEAD, COW_BUBBLES, COW_NERD, COW_IN_LOVE
     if not args and not kwargs:
@@ -167,10 +123,3 @@ def replace_escapes(input: str) -> str:
     input = input.replace("\\\\n", '^n^').replace('\\\\r', '^r^').replace('\\\\t', '^t^')  # Temporary change any \\n, ,etc
     input = input.replace("\\n", '\n').replace('\\r', '\r').replace('\\t', '\t')
     return input.replace("^n^", '\\n').replace('^r^', '\\r').replace('^t^', '\\t')  # Replace any \\n, etc
-
-
-STYLE_SHEET_TERMINAL_INACTIVE = f'background-color: {colorToStyleSheet(COLOR_DARK_GREY)};color: rgb(255, 255, 255);font: 10pt "Consolas";'
-STYLE_SHEET_TERMINAL_ACTIVE = f'background-color: {colorToStyleSheet(COLOR_BLACK)};color: rgb(255, 255, 255);font: 10pt "Consolas";'
-STYLE_SHEET_BUTTON_INACTIVE = f"background-color: {colorToStyleSheet(COLOR_GREY)};"
-STYLE_SHEET_BUTTON_ACTIVE = f"background-color: {colorToStyleSheet(COLOR_GREEN)};"
-STYLE_SHEET_SCRIPT = f'background-color: {colorToStyleSheet(COLOR_DARK_RED)};color: rgb(255, 255, 255);font: 10pt "Consolas";'
@@ -0,0 +1,242 @@
+'''
+Virtual serial devices for testing and benchmarking without hardware (Linux/macOS only).
+
+Each VirtualDevice opens a pty pair. The app connects to the slave end like any other
+port (it is listed by get_ports()), while a thread on the master end plays the device:
+it sends generated traffic at a set rate and pattern, and echoes or answers what it receives.
+'''
+
+import math
+import os
+import random
+import re
+import select
+import struct
+import threading
+import time
+
+import serial_handler
+from sk_tools import *
+
+VIRTUAL_SUPPORTED = os.name == 'posix'
+if VIRTUAL_SUPPORTED:
+    import pty
+    import tty
+
+PATTERN_NONE = "none"      # Send nothing. Only echo / respond
+PATTERN_KV = "kv"          # Key-value telemetry lines: "a:1.23 b:4.56 ..."
+PATTERN_ARRAY = "array"    # Comma separated value lines: "1.23,4.56,..."
+PATTERN_BINARY = "binary"  # Framed binary packets (see VirtualDevice.binary_frame)
+PATTERN_REPLAY = "replay"  # Lines of a file (i.e. a log), looped
+patterns = [PATTERN_NONE, PATTERN_KV, PATTERN_ARRAY, PATTERN_BINARY, PATTERN_REPLAY]
+
+DEFAULT_VIRTUAL_RATE = 10  # Messages per second. 0 = as fast as the port accepts them
+DEFAULT_VIRTUAL_VALUES = 3  # Values per message
+BINARY_SYNC = b'\xAA\x55'
+MAX_RX_LINE = 4096  # Bytes of a received line kept while waiting for its end. Longer lines match no response
+
+LOG_PREFIX = re.compile(rb'^[^\t]*\t\|[^|]*\|\t')  # "port\t|time|\t" from the default log format
+
+devices: dict = {}  # Port name: VirtualDevice
+
+
+class VirtualDevice:
+    '''One pty pair. The app uses the slave end as its port. The device thread owns the master end'''
+
+    def __init__(self, pattern: str = PATTERN_KV, rate: float = DEFAULT_VIRTUAL_RATE, values: int = DEFAULT_VIRTUAL_VALUES,
+                 echo: bool = False, responses: dict = None, replay_file: str = None) -> None:
+        '''Raises ValueError for a bad pattern or replay file, OSError if no pty can be opened'''
+        if not VIRTUAL_SUPPORTED:
+            raise OSError("virtual ports need a pty (Linux/macOS only)")
+        if pattern not in patterns:
+            raise ValueError(f"pattern '{pattern}' not supported")
+        self.pattern = pattern
+        self.rate = rate
+        self.values = max(1, values)
+        self.echo = echo
+        self.responses: dict = responses or {}  # Line received (bytes): reply (bytes)
+        self.replay_lines = []
+        if pattern == PATTERN_REPLAY:
+            self.replay_lines = self.load_replay(replay_file)
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # No echo, no line editing: bytes pass through untouched
+        os.set_blocking(self.master, False)
+        self.name = os.ttyname(self.slave)
+        self.thread: threading.Thread = None
+        self.active = False
+        self.count = 0          # Messages generated
+        self.tx_bytes = 0       # Bytes sent to the app
+        self.rx_bytes = 0       # Bytes received from the app
+        self.dropped_bytes = 0  # Generated while the port buffer was full (nobody reading)
+        self.rx_buffer = bytearray()
+        self.rx_overlong = False  # Dropping a line longer than MAX_RX_LINE until its end arrives
+        self.out_buffer = bytearray()  # Replies waiting for room in the port buffer
+
+    def load_replay(self, file_path: str) -> list:
+        if not file_path or not os.path.exists(file_path):
+            raise ValueError(f"replay file '{file_path}' not found")
+        with open(file_path, 'rb') as file:
+            lines = [LOG_PREFIX.sub(b'', line.rstrip(b'\r\n')) + b'\n' for line in file]
+        if not lines:
+            raise ValueError(f"replay file '{file_path}' is empty")
+        return lines
+
+    def describe(self) -> str:
+        if self.pattern == PATTERN_NONE:
+            descr = "silent"
+        else:
+            descr = f"{self.pattern} @ {self.rate or 'max'}/s"
+        if self.echo:
+            descr += ", echo"
+        return descr
+
+    def port_info(self) -> dict:
+        '''The entry get_ports() lists for this device'''
+        return {
+            'name': self.name,
+            'descr': f"Virtual Serial Device ({self.describe()})",
+            'mfgr': "SerialKiller",
+            'hwid': "VIRTUAL",
+            'numb': None,
+        }
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self.run, name=f"VirtualDevice {self.name}", daemon=True)
+        self.thread.start()
+        devices[self.name] = self
+        serial_handler.virtual_ports[self.name] = self.port_info()
+
+    def stop(self):
+        self.active = False
+        if self.thread:
+            self.thread.join(1)
+        self.thread = None
+        devices.pop(self.name, None)
+        serial_handler.virtual_ports.pop(self.name, None)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def run(self):
+        interval = 1 / self.rate if self.rate else 0
+        next_send = time.perf_counter()
+        while self.active:
+            generating = self.pattern != PATTERN_NONE
+            timeout = .1
+            if generating:
+                timeout = max(0, next_send - time.perf_counter())
+            write_fds = [self.master] if (self.out_buffer or (generating and not interval)) else []
+            try:
+                readable, writable, _ = select.select([self.master], write_fds, [], min(timeout, .1))
+            except (OSError, ValueError):
+                return
+            if readable:
+                self.receive()
+            if self.out_buffer and writable:
+                self.flush_out()
+            if not generating:
+                continue
+            if interval:
+                now = time.perf_counter()
+                if now < next_send:
+                    continue
+                next_send = max(next_send + interval, now - interval)  # Don't burst to catch up after a stall
+                self.send(self.generate(), drop=True)
+            elif writable and not self.out_buffer:
+                self.send(self.generate(), drop=False)
+
+    def generate(self) -> bytes:
+        '''The next message for the current pattern'''
+        n = self.count
+        self.count += 1
+        if self.pattern == PATTERN_KV:
+            return " ".join(f"{chr(97 + i % 26)}:{self.value(n, i):.3f}" for i in range(self.values)).encode() + b'\n'
+        if self.pattern == PATTERN_ARRAY:
+            return ",".join(f"{self.value(n, i):.3f}" for i in range(self.values)).encode() + b'\n'
+        if self.pattern == PATTERN_BINARY:
+            return self.binary_frame(n)
+        if self.pattern == PATTERN_REPLAY:
+            return self.replay_lines[n % len(self.replay_lines)]
+        return b''
+
+    def value(self, n: int, i: int) -> float:
+        return math.sin(n / 10 + i) * (i + 1) + random.random() * .1
+
+    def binary_frame(self, n: int) -> bytes:
+        '''SYNC (AA 55) | seq (uint16 LE) | len (uint8) | payload (float32 LE values) | xor of seq, len and payload'''
+        payload = struct.pack(f"<{self.values}f", *(self.value(n, i) for i in range(self.values)))
+        body = struct.pack("<HB", n & 0xFFFF, len(payload)) + payload
+        check = 0
+        for byte in body:
+            check ^= byte
+        return BINARY_SYNC + body + bytes([check])
+
+    def send(self, data: bytes, drop: bool) -> int:
+        '''Write to the port. A full buffer drops the data (like a real device would), or keeps it queued'''
+        try:
+            written = os.write(self.master, data)
+        except BlockingIOError:
+            written = 0
+        except OSError:
+            return 0
+        self.tx_bytes += written
+        if written < len(data):
+            if drop:
+                self.dropped_bytes += len(data) - written
+            else:
+                self.out_buffer += data[written:]
+        return written
+
+    def flush_out(self):
+        data = bytes(self.out_buffer)
+        self.out_buffer.clear()
+        self.send(data, drop=False)
+
+    def receive(self):
+        try:
+            data = os.read(self.master, 65536)
+        except (BlockingIOError, OSError):
+            return
+        self.rx_bytes += len(data)
+        if self.echo:
+            self.send(data, drop=False)
+        if not self.responses:
+            return
+        self.rx_buffer += data
+        *lines, rest = self.rx_buffer.replace(b'\r', b'').split(b'\n')
+        if self.rx_overlong and lines:
+            lines.pop(0)  # The end of the line that was dropped
+            self.rx_overlong = False
+        if len(rest) > MAX_RX_LINE:
+            rest = b""
+            self.rx_overlong = True
+        self.rx_buffer = bytearray(rest)
+        for line in lines:
+            reply = self.responses.get(bytes(line))
+            if reply is not None:
+                self.send(reply, drop=False)
+
+    def stats(self) -> dict:
+        return {
+            'messages': self.count,
+            'tx_bytes': self.tx_bytes,
+            'rx_bytes': self.rx_bytes,
+            'dropped_bytes': self.dropped_bytes,
+        }
+
+
+def parse_responses(text: str) -> dict:
+    '''"ping=pong;ver=1.0" -> {b'ping': b'pong\\n', b'ver': b'1.0\\n'}'''
+    responses = {}
+    for pair in text.split(';'):
+        if '=' not in pair:
+            continue
+        request, reply = pair.split('=', 1)
+        responses[replace_escapes(request).encode()] = replace_escapes(reply).encode() + b'\n'
+    return responses
+
+
+def stop_all():
+    '''Close every virtual device and its threads, i.e. when the app exits'''
+    for device in list(devices.values()):
+        device.stop()
@@ -0,0 +1,72 @@
+'''
+Qt workers for the GUI: SerialWorker reads a port on a QThread and signals the GUI thread,
+RescanWorker keeps the port list up to date. The reading itself is in serial_handler.SerialReader,
+which the headless mode runs on a plain thread instead.
+'''
+
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from serial_handler import (DEFAULT_BATCH_BYTES, DEFAULT_EMIT_RATE, DEFAULT_MIN_CHUNK, DEFAULT_READ_TIMEOUT, READ_MODE_POLL,
+                            SerialReader, SerialSession, get_ports)
+from sk_hotplug import DeviceMonitor
+from sk_tools import *
+
+
+class SerialWorker(QObject, SerialReader):
+    '''SerialReader for the GUI: out is emitted at most emit_rate times a second, or once batch_bytes are pending'''
+    out = pyqtSignal(int)  # Bytes written to the ring since the last emit
+    disconnected = pyqtSignal(bool)
+
+    def __init__(self, session: SerialSession, read_mode: str = READ_MODE_POLL, read_timeout: float = DEFAULT_READ_TIMEOUT, min_chunk: int = DEFAULT_MIN_CHUNK,
+                 emit_rate: float = DEFAULT_EMIT_RATE, batch_bytes: int = DEFAULT_BATCH_BYTES):
+        super().__init__(session=session, read_mode=read_mode, read_timeout=read_timeout, min_chunk=min_chunk,
+                         emit_rate=emit_rate, batch_bytes=batch_bytes)  # QObject passes these on to SerialReader
+
+    def emit_data(self, count: int):
+        self.out.emit(count)
+
+    def emit_lost(self):
+        self.disconnected.emit(False)
+
+
+class RescanWorker(QObject):
+    '''Enumerates ports only when a device is added or removed (see sk_hotplug), and emits only what changed'''
+    ports_changed = pyqtSignal(dict, list)  # Ports added (name: info), names of ports removed
+    active = True
+
+    def __init__(self, update_interval=1) -> None:
+        super().__init__()
+        self.active = True
+        self.monitor = DeviceMonitor(poll_interval=update_interval)
+        self.ports = {}
+
+    def run(self):
+        self.ports = get_ports()
+        vprint(f"PORT RESCAN: {'device events' if self.monitor.uses_events else 'polling'}", color='green')
+        while self.active:
+            try:
+                if self.monitor.wait() and self.active:
+                    self.scan()
+            except Exception as E:
+                eprint(f"ERR: {traceback.format_exc()}\n", color='red')
+                time.sleep(1)
+        self.monitor.close()
+
+    def scan(self):
+        ports = get_ports()
+        added = {name: ports[name] for name in ports if name not in self.ports}
+        removed = [name for name in self.ports if name not in ports]
+        self.ports = ports
+        if added or removed:
+            self.ports_changed.emit(added, removed)
+
+    def rescan(self):
+        '''Scan now, i.e. after a virtual port is added. Safe from any thread'''
+        self.monitor.wake()
+
+    def stop(self):
+        self.active = False
+        self.monitor.wake()
@@ -0,0 +1,58 @@
+from sk_ansi import ANSI_COLORS, BOLD, ERASE_LINE, NEW_LINE, PALETTE_256, PLAIN, UNDERLINE, AnsiParser, rgba, select_graphic
+
+RED = ANSI_COLORS[1]
+
+
+def feed(parser: AnsiParser, *chunks: str) -> list:
+    items = []
+    for chunk in chunks:
+        items += parser.feed(chunk)
+    return items
+
+
+def test_plain_text_is_one_run():
+    assert AnsiParser().feed("hello\nworld\n") == [(PLAIN, "hello\nworld\n")]
+
+
+def test_colors_and_reset():
+    items = AnsiParser().feed("a\x1b[31mb\x1b[1;4mc\x1b[0md")
+    assert items == [(PLAIN, "a"), ((RED, 0, 0), "b"), ((RED, 0, BOLD | UNDERLINE), "c"), (PLAIN, "d")]
+
+
+def test_sequence_split_across_chunks():
+    sequence = "\x1b[38;5;196m"
+    for split in range(1, len(sequence)):
+        items = feed(AnsiParser(), "x" + sequence[:split], sequence[split:] + "y")
+        assert items == [(PLAIN, "x"), ((PALETTE_256[196], 0, 0), "y")], split
+
+
+def test_lone_escape_at_chunk_end_is_held():
+    parser = AnsiParser()
+    assert parser.feed("abc\x1b") == [(PLAIN, "abc")]
+    assert parser.held == "\x1b"
+    assert parser.feed("[32mok") == [((ANSI_COLORS[2], 0, 0), "ok")]
+
+
+def test_unknown_sequences_are_removed():
+    items = AnsiParser().feed("a\x1b[?25lb\x1b]0;title\x07c\x1b[5Ad")
+    assert "".join(text for style, text in items) == "abcd"
+
+
+def test_carriage_return_then_erase_line():
+    parser = AnsiParser()
+    items = feed(parser, "10%\r", "\x1b[K20%")
+    assert items == [(PLAIN, "10%"), ERASE_LINE, (PLAIN, "20%")]
+
+
+def test_carriage_return_without_erase_is_kept():
+    assert feed(AnsiParser(), "a\r", "\nb") == [(PLAIN, "a"), (PLAIN, "\r\nb")]
+
+
+def test_erase_display_starts_a_new_line():
+    assert AnsiParser().feed("a\x1b[2Jb") == [(PLAIN, "a"), NEW_LINE, (PLAIN, "b")]
+
+
+def test_true_color_and_background():
+    style = select_graphic(PLAIN, "38;2;1;2;3;48;5;4")
+    assert style == (rgba(1, 2, 3), ANSI_COLORS[4], 0)
+    assert select_graphic(style, "39;49") == PLAIN
@@ -0,0 +1,54 @@
+import pytest
+
+from sk_capture import CAPTURE_MAGIC, KIND_RX, KIND_TX, CaptureWriter, read_capture
+from sk_ring_buffer import RxRingBuffer
+
+
+def test_write_read_round_trip(tmp_path):
+    file_path = str(tmp_path / "session.skcap")
+    capture = CaptureWriter(file_path, "/dev/ttyUSB0", 115200)
+    start = capture.start_mono
+    capture.write(KIND_RX, b"hello\n", start + 1.5)
+    capture.write(KIND_TX, b"ping\r\n", start + 2.25)
+    capture.write(KIND_RX, b"", start + 3)  # Empty chunks are not written
+    capture.write(KIND_RX, bytes(range(256)), start + 4)
+    capture.close()
+    assert capture.chunks == 3
+    assert capture.bytes == 6 + 6 + 256
+
+    chunks = read_capture(file_path)
+    header = next(chunks)
+    assert header['port'] == "/dev/ttyUSB0"
+    assert header['baud'] == 115200
+    assert header['start_wall'] == capture.start_wall
+    assert list(chunks) == [(KIND_RX, 1.5, b"hello\n"), (KIND_TX, 2.25, b"ping\r\n"), (KIND_RX, 4.0, bytes(range(256)))]
+
+
+def test_rx_slices_keep_their_chunks(tmp_path):
+    file_path = str(tmp_path / "session.skcap")
+    capture = CaptureWriter(file_path)
+    ring = RxRingBuffer(size=64)
+    cursor = ring.cursor("capture")
+    ring.write(b"abc", mono=capture.start_mono + 1, wall=0)
+    ring.write(b"defg", mono=capture.start_mono + 2, wall=0)
+    cursor.drain(capture.write_rx, stamped=True)
+    capture.close()
+    assert list(read_capture(file_path))[1:] == [(KIND_RX, 1.0, b"abc"), (KIND_RX, 2.0, b"defg")]
+
+
+def test_truncated_last_chunk_is_dropped(tmp_path):
+    file_path = str(tmp_path / "session.skcap")
+    capture = CaptureWriter(file_path)
+    capture.write(KIND_RX, b"whole", capture.start_mono)
+    capture.write(KIND_RX, b"cut short", capture.start_mono)
+    capture.close()
+    with open(file_path, 'r+b') as file:
+        file.truncate(file.seek(0, 2) - 3)
+    assert [data for kind, t, data in list(read_capture(file_path))[1:]] == [b"whole"]
+
+
+def test_not_a_capture(tmp_path):
+    file_path = tmp_path / "log.txt"
+    file_path.write_bytes(b"not " + CAPTURE_MAGIC)
+    with pytest.raises(ValueError):
+        next(read_capture(str(file_path)))
@@ -0,0 +1,44 @@
+import pytest
+
+from sk_decoder import RxDecoder
+
+
+def test_utf8_split_across_chunks():
+    decoder = RxDecoder("utf-8")
+    data = "°C → 25".encode('utf-8')
+    assert decoder.decode(data[:1]) == ""  # First byte of the 2 byte '°'
+    assert decoder.decode(data[1:5]) == "°C "  # and the first byte of the 3 byte '→'
+    assert decoder.decode(data[5:]) == "→ 25"
+
+
+def test_every_split_point_decodes_the_same():
+    text = "añb€c😀d"
+    data = text.encode('utf-8')
+    for split in range(len(data) + 1):
+        decoder = RxDecoder("utf-8")
+        assert decoder.decode(data[:split]) + decoder.decode(data[split:]) == text
+
+
+def test_one_byte_at_a_time():
+    data = "ü€😀".encode('utf-8')
+    decoder = RxDecoder()
+    assert "".join(decoder.decode(data[i:i + 1]) for i in range(len(data))) == "ü€😀"
+
+
+def test_flush_and_reset_drop_a_held_partial_sequence():
+    decoder = RxDecoder("utf-8")
+    assert decoder.decode(b"ok\xe2\x82") == "ok"
+    assert decoder.flush() == "�"  # Replaced, as the port closed mid-character
+    assert decoder.decode(b"\xe2") == ""
+    decoder.reset()
+    assert decoder.decode(b"\xac") == "�"  # The held byte was forgotten
+
+
+def test_error_policies():
+    assert RxDecoder("ascii").decode(b"a\xffb") == "a\\xffb"
+    assert RxDecoder("utf-8", "ignore").decode(b"a\xffb") == "ab"
+    assert RxDecoder("latin-1").decode(b"\xb0C") == "°C"
+    with pytest.raises(ValueError):
+        RxDecoder("utf-16")
+    with pytest.raises(ValueError):
+        RxDecoder("utf-8", "strict")
@@ -0,0 +1,64 @@
+from sk_hexdump import HEX_BACKLOG, HexDump, hex_rows
+from sk_tools import TYPE_RX, TYPE_TX
+
+
+def test_full_row():
+    assert hex_rows(b"Hello\r\n\x00\xff\x10 0ABCD") == \
+        "00000000  48 65 6c 6c 6f 0d 0a 00 ff 10 20 30 41 42 43 44 |Hello..... 0ABCD|\n"
+
+
+def test_partial_last_row_is_padded_without_line_break():
+    rows = hex_rows(bytes(range(0x41, 0x41 + 20)), offset=0x100, width=8)
+    lines = rows.split("\n")
+    assert lines == [
+        "00000100  41 42 43 44 45 46 47 48 |ABCDEFGH|",
+        "00000108  49 4a 4b 4c 4d 4e 4f 50 |IJKLMNOP|",
+        "00000110  51 52 53 54             |QRST    |",
+    ]
+    assert hex_rows(b"ab", width=4, partial=False).endswith("|\n")
+    assert hex_rows(b"") == ""
+
+
+def test_feed_redraws_the_partial_row():
+    dump = HexDump(width=4)
+    assert dump.feed(b"ab") == (False, "00000000  61 62       |ab  |")
+    erase, text = dump.feed(b"cdef")
+    assert erase
+    assert text == "00000000  61 62 63 64 |abcd|\n00000004  65 66       |ef  |"
+
+
+def test_directions_keep_their_own_offsets():
+    dump = HexDump(width=4)
+    dump.feed(b"rx", TYPE_RX)
+    erase, text = dump.feed(b"tx", TYPE_TX)
+    assert not erase
+    assert text == "\n00000000  74 78       |tx  |"  # The RX row stays as it is
+    erase, text = dump.feed(b"!", TYPE_RX)
+    assert text.startswith("\n00000002  21")
+
+
+def test_skip_moves_the_offset():
+    dump = HexDump(width=4)
+    dump.skip(8)
+    assert dump.feed(b"z")[1].startswith("00000008  7a")
+
+
+def test_hold_and_release():
+    dump = HexDump(width=4)
+    dump.hold(b"ab")
+    dump.hold(b"cd")
+    dump.hold(b"ef", TYPE_TX)
+    assert dump.release() == [
+        (TYPE_RX, False, "00000000  61 62 63 64 |abcd|\n"),
+        (TYPE_TX, False, "00000000  65 66       |ef  |"),
+    ]
+    assert dump.backlog_bytes == 0
+
+
+def test_backlog_keeps_the_newest_chunks():
+    dump = HexDump()
+    chunk = bytes(HEX_BACKLOG // 4)
+    for _ in range(6):
+        dump.hold(chunk)
+    assert dump.backlog_bytes == HEX_BACKLOG
+    assert dump.release()[0][2].startswith("%08x" % (2 * len(chunk)))
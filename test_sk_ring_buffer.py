@@ -0,0 +1,94 @@
+from sk_ring_buffer import RxRingBuffer, shift_stamps, stamp_at
+
+
+def read_all(cursor) -> bytes:
+    return b"".join(bytes(view) for view in cursor.read())
+
+
+def test_read_wraps_around():
+    ring = RxRingBuffer(size=8)
+    cursor = ring.cursor("test")
+    ring.write(b"abcdef")
+    assert read_all(cursor) == b"abcdef"
+    ring.write(b"ghij")  # 2 bytes at the end of the ring, 2 at the start
+    views = cursor.read()
+    assert len(views) == 2
+    assert b"".join(bytes(view) for view in views) == b"ghij"
+    assert cursor.overrun_bytes == 0
+
+
+def test_overrun_counts_lost_bytes():
+    ring = RxRingBuffer(size=8)
+    cursor = ring.cursor("test")
+    ring.write(b"0123456789")  # Bigger than the ring: only the newest 8 bytes fit
+    ring.write(b"ab")
+    assert read_all(cursor) == b"456789ab"
+    assert cursor.overruns == 1
+    assert cursor.overrun_bytes == 4
+    assert cursor.available == 0
+
+
+def test_cursors_are_independent():
+    ring = RxRingBuffer(size=16)
+    fast = ring.cursor("fast")
+    slow = ring.cursor("slow")
+    for chunk in (b"one ", b"two ", b"three ", b"four "):
+        ring.write(chunk)
+        read_all(fast)
+    assert fast.overrun_bytes == 0
+    assert read_all(slow) == b" two three four "  # 19 bytes written, 16 kept
+    assert slow.overrun_bytes == 3
+
+
+def test_drain_counts_bytes_overwritten_by_the_consumer():
+    ring = RxRingBuffer(size=8)
+    cursor = ring.cursor("test")
+    ring.write(b"abcd")
+    seen = []
+
+    def consumer(view):
+        ring.write(b"0123456789"[:8])  # The writer laps the slice while it is consumed
+        seen.append(len(view))
+
+    assert cursor.drain(consumer) == 4
+    assert seen == [4]
+    assert cursor.overrun_bytes == 4
+
+
+def test_drain_at_most_max_bytes():
+    ring = RxRingBuffer(size=8)
+    cursor = ring.cursor("test")
+    ring.write(b"abcdef")
+    seen = []
+    assert cursor.drain(lambda view: seen.append(bytes(view)), max_bytes=4) == 4
+    assert cursor.available == 2
+    ring.write(b"ghijklm")  # Laps the oldest byte left: counted, not stalled on
+    assert cursor.drain(lambda view: seen.append(bytes(view)), max_bytes=4) == 4
+    assert b"".join(seen) == b"abcdfghi"
+    assert cursor.overrun_bytes == 1
+
+
+def test_catch_up_and_skip():
+    ring = RxRingBuffer(size=64)
+    cursor = ring.cursor("test")
+    ring.write(b"x" * 40)
+    assert cursor.catch_up(10) == 30
+    assert cursor.dropped_bytes == 30
+    assert cursor.available == 10
+    ring.write(b"y" * 5)
+    assert cursor.skip() == 15
+    assert read_all(cursor) == b""
+
+
+def test_stamps_follow_chunks():
+    ring = RxRingBuffer(size=64)
+    cursor = ring.cursor("test")
+    ring.write(b"aaa", mono=1.0, wall=101.0)
+    ring.write(b"bbbb", mono=2.0, wall=102.0)
+    stamped = []
+    cursor.drain(lambda view, stamps: stamped.append((bytes(view), stamps)), stamped=True)
+    assert stamped == [(b"aaabbbb", [(0, 1.0, 101.0), (3, 2.0, 102.0)])]
+    stamps = stamped[0][1]
+    assert stamp_at(stamps, 2)[2] == 101.0
+    assert stamp_at(stamps, 3)[2] == 102.0
+    assert shift_stamps(stamps, 5) == [(0, 2.0, 102.0)]